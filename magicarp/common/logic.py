@@ -2,29 +2,56 @@ import collections
 
 from flask import current_app
 
+from magicarp import router
+
 
 def get_pong(version=None):
     return 'pong - {}'.format(version) if version else 'pong'
 
 
-def get_url_map(version=None):
-    func_list = collections.OrderedDict()
+def iter_routes(version=None, app=None):
+    """Yields (rule, endpoint) of every route of given version (version-less
+    routes if version is not given), rule is as client sees it, ie.
+    /1.2/users/<int:uid>/ (even if the rule is shared by versions).
+    """
+    app = current_app if app is None else app
 
     prefix = '/{}'.format(version) if version else ''
 
-    for rule in current_app.url_map.iter_rules():
+    for rule in app.url_map.iter_rules():
         if rule.endpoint == 'static':
             continue
 
-        if not rule.rule.startswith(prefix):
+        endpoint = app.view_functions[rule.endpoint]
+        url = rule.rule
+
+        # with dispatcher (ROUTING_DISPATCHER) rule is shared by versions
+        if isinstance(endpoint, router.VersionDispatcher):
+            if bool(version) != (router.VERSION_ARGUMENT in rule.arguments):
+                continue
+
+            endpoint = endpoint.resolve(version or None)
+
+            if endpoint is None:
+                continue
+
+            # rule starts with version argument, ie. /<api_version:...>/...
+            if version:
+                url = prefix + url.split('>', 1)[1]
+        elif not url.startswith(prefix):
             continue
 
-        endpoint = current_app.view_functions[rule.endpoint]
+        yield url, endpoint
+
+
+def get_url_map(version=None):
+    func_list = collections.OrderedDict()
 
+    for url, endpoint in iter_routes(version):
         methods = endpoint.methods \
             if endpoint.methods else ["GET", "HEAD", "OPTIONS"]
 
-        key = "({}) {}".format(",".join(methods), rule.rule)
+        key = "({}) {}".format(",".join(methods), url)
 
         func_list[key] = endpoint.doc_short
 
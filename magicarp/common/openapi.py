@@ -0,0 +1,257 @@
+"""OpenAPI (3.0) document of api, made of routes (see
+common.logic.iter_routes) and definitions of their input and output schemas.
+
+Schemas are described by their fields: types, descriptions, nullable (fields
+that allow blank), required fields of input schemas and collections as
+arrays. Top-level schemas go to components and are referred to, responses
+are wrapped in envelope the endpoint uses.
+"""
+import collections
+import inspect
+import re
+
+from magicarp import envelope, schema
+
+OPENAPI_VERSION = '3.0.3'
+
+# types of arguments of url rules by name of converter
+_CONVERTERS = {
+    'int': {'type': 'integer'},
+    'float': {'type': 'number'},
+    'uuid': {'type': 'string', 'format': 'uuid'},
+}
+
+# types of leaf fields, checked in order (date-time before date)
+_FIELDS = (
+    (schema.base.BaseBoolField, {'type': 'boolean'}),
+    (schema.base.BaseIntegerField, {'type': 'integer'}),
+    (schema.base.BaseDateTimeField, {'type': 'string', 'format': 'date-time'}),
+    (schema.base.BaseDateField, {'type': 'string', 'format': 'date'}),
+    (schema.base.BaseTimeField, {'type': 'string', 'format': 'time'}),
+    (schema.base.BaseStringField, {'type': 'string'}),
+)
+
+# variable part of url rule, <variable> or <converter(arguments):variable>
+# (same syntax werkzeug.routing parses)
+_RULE_VARIABLE = re.compile(
+    r'<(?:(?P<converter>[a-zA-Z_][a-zA-Z0-9_]*)'
+    r'(?:\((?P<arguments>.*?)\))?:)?'
+    r'(?P<variable>[a-zA-Z_][a-zA-Z0-9_]*)>')
+
+# methods payload of which is sent as query string rather than body
+_QUERY_METHODS = ('GET', 'HEAD', 'DELETE', 'OPTIONS')
+
+
+def _describe(field, dct):
+    # description is a property of some schemas, readable on instances only
+    description = field.description
+
+    if isinstance(description, str) and description:
+        dct['description'] = description
+
+    if not isinstance(field, type) and field.allow_blank:
+        dct['nullable'] = True
+
+    return dct
+
+
+def _get_required(field):
+    # only input schemas know which of their fields are required, nested
+    # ones are named with dots (ie. user.name)
+    cls = field if isinstance(field, type) else type(field)
+
+    if not issubclass(cls, schema.input_field.SchemaField):
+        return []
+
+    return sorted(
+        name for name in field.required or () if '.' not in name and
+        name not in (field.not_required or ()))
+
+
+def field_schema(field, components=None):
+    """Returns schema (dictionary) of field (instance or class), top-level
+    schemas (classes) are added to components (if given) and referred to.
+    """
+    cls = field if isinstance(field, type) else type(field)
+
+    if issubclass(cls, schema.base.BaseSchemaField) and \
+            not issubclass(cls, schema.base.BaseDocumentField):
+        if isinstance(field, type) and components is not None:
+            if cls.__name__ not in components:
+                # placeholder, in case schema refers to itself
+                components[cls.__name__] = {}
+                components[cls.__name__] = _schema_object(cls, components)
+
+            return {'$ref': '#/components/schemas/{}'.format(cls.__name__)}
+
+        return _describe(field, _schema_object(field, components))
+
+    if issubclass(cls, schema.base.BaseCollectionField):
+        return _describe(field, {
+            'type': 'array',
+            'items': field_schema(field.collection_type, components),
+        })
+
+    if issubclass(cls, (
+            schema.base.BaseDocumentField, schema.input_field.DocumentField)):
+        return _describe(field, {
+            'type': 'object', 'additionalProperties': {'type': 'string'}})
+
+    for base, dct in _FIELDS:
+        if issubclass(cls, base):
+            return _describe(field, dict(dct))
+
+    return _describe(field, {})
+
+
+def _schema_object(field, components):
+    properties = collections.OrderedDict(
+        (child.name, field_schema(child, components))
+        for child in field.fields)
+
+    dct = {'type': 'object', 'properties': properties}
+
+    required = _get_required(field)
+
+    if required:
+        dct['required'] = required
+
+    return dct
+
+
+def _wrap(route, content):
+    """Schema of response of route, content wrapped in envelope.
+    """
+    wrapper = route.envelope
+
+    if wrapper is None or isinstance(wrapper, envelope.Raw):
+        return None
+
+    if wrapper.envelope_type is None:
+        return content
+
+    dct = {
+        'type': 'object',
+        'properties': collections.OrderedDict([
+            ('success', {'type': 'boolean'}),
+            ('envelope_type', {
+                'type': 'string', 'enum': [wrapper.envelope_type]}),
+        ]),
+        'required': ['envelope_type', 'success'],
+    }
+
+    if content is not None:
+        dct['properties']['content'] = content
+
+    return dct
+
+
+def _make_path(rule):
+    """Turns url rule into path of OpenAPI and its parameters, ie.
+    /users/<int:uid>/ into /users/{uid}/.
+    """
+    path = []
+    parameters = []
+    position = 0
+
+    for match in _RULE_VARIABLE.finditer(rule):
+        converter, variable = match.group('converter', 'variable')
+
+        path.append(rule[position:match.start()])
+        path.append('{' + variable + '}')
+
+        position = match.end()
+
+        parameters.append({
+            'name': variable,
+            'in': 'path',
+            'required': True,
+            'schema': dict(_CONVERTERS.get(converter, {'type': 'string'})),
+        })
+
+    path.append(rule[position:])
+
+    return ''.join(path), parameters
+
+
+def _make_operation(route, method, parameters, components):
+    operation = collections.OrderedDict([
+        ('operationId', '{}_{}'.format(route.get_name(), method.lower())),
+        ('summary', route.doc_short),
+    ])
+
+    if route.long_description or route.__doc__:
+        description = inspect.cleandoc(route.doc_long)
+
+        if description != route.doc_short:
+            operation['description'] = description
+
+    parameters = list(parameters)
+
+    if route.input_schema:
+        if method in _QUERY_METHODS:
+            definition = field_schema(route.input_schema)
+            required = definition.get('required', [])
+
+            for name, dct in definition['properties'].items():
+                parameters.append({
+                    'name': name,
+                    'in': 'query',
+                    'required': name in required,
+                    'schema': dct,
+                })
+        else:
+            operation['requestBody'] = {
+                'required': True,
+                'content': {'application/json': {
+                    'schema': field_schema(route.input_schema, components),
+                }},
+            }
+
+    if parameters:
+        operation['parameters'] = parameters
+
+    code = route.envelope.code if route.envelope else 200
+
+    response = {'description': route.doc_short}
+
+    content = _wrap(route, field_schema(route.output_schema, components)
+                    if route.output_schema else None)
+
+    if content is not None:
+        response['content'] = {'application/json': {'schema': content}}
+
+    operation['responses'] = {str(code): response}
+
+    return operation
+
+
+def build_document(routes, title, version=None):
+    """Returns OpenAPI document (dictionary) of routes, list of (rule,
+    endpoint), ie. from common.logic.iter_routes.
+    """
+    paths = collections.OrderedDict()
+    components = collections.OrderedDict()
+
+    for rule, route in routes:
+        path, parameters = _make_path(rule)
+
+        operations = paths.setdefault(path, collections.OrderedDict())
+
+        for method in route.methods or ['GET']:
+            if method in ('HEAD', 'OPTIONS'):
+                continue
+
+            operations[method.lower()] = _make_operation(
+                route, method, parameters, components)
+
+    document = collections.OrderedDict([
+        ('openapi', OPENAPI_VERSION),
+        ('info', {'title': title, 'version': version or ''}),
+        ('paths', paths),
+    ])
+
+    if components:
+        document['components'] = {'schemas': components}
+
+    return document
@@ -3,9 +3,33 @@ import base64
 from flask import request, current_app, make_response
 from simple_settings import settings
 
-from magicarp import router, endpoint, signals
+from magicarp import router, endpoint, envelope, signals, tools
 
-from magicarp.common import logic, output_schema
+from magicarp.common import logic, openapi, output_schema
+
+# key of prebuilt documents in app.extensions
+DOCUMENTS = 'magicarp_documents'
+
+
+class PrebuiltDocument(endpoint.BaseEndpoint):
+    """Endpoint response of which depends only on routing, so it's rendered
+    once per version (see build_documents) and served as is, with ETag.
+    """
+    static_response = True
+
+    def respond(self, payload, arguments, *args, **kwargs):
+        entry = current_app.extensions.get(DOCUMENTS, {}).get(
+            (self.name, request.version))
+
+        # not built (ie. version that was not registered, but resolved by
+        # dispatcher) or client asks for binary format
+        if entry is None or (
+                self.envelope and self.envelope.negotiate and
+                tools.serializers.negotiate(
+                    request.accept_mimetypes, self.envelope.binary_formats)):
+            return super().respond(payload, arguments, *args, **kwargs)
+
+        return tools.cache.make_response(entry, conditional=True)
 
 
 class Ping(endpoint.BaseEndpoint):
@@ -22,7 +46,7 @@ class Ping(endpoint.BaseEndpoint):
         return resp
 
 
-class UrlMap(endpoint.BaseEndpoint):
+class UrlMap(PrebuiltDocument):
     """All urls available on api.
     """
     url = '/'
@@ -36,6 +60,37 @@ class UrlMap(endpoint.BaseEndpoint):
         return func_list
 
 
+class OpenApi(PrebuiltDocument):
+    """OpenAPI document of api.
+    """
+    url = '/openapi'
+    name = 'openapi'
+
+    envelope = envelope.RawJson()
+
+    def action(self):  # pylint: disable=arguments-differ
+        return openapi.build_document(
+            logic.iter_routes(request.version), current_app.name,
+            request.version)
+
+
+class Metrics(endpoint.BaseEndpoint):
+    """Metrics of requests, in text format of Prometheus.
+    """
+    url = '/metrics'
+    name = 'metrics'
+
+    envelope = None
+
+    def action(self):  # pylint: disable=arguments-differ
+        resp = make_response(
+            tools.metrics.render(tools.metrics.collect()))
+
+        resp.headers['content-type'] = tools.metrics.CONTENT_TYPE
+
+        return resp, 200
+
+
 class ShutDown(endpoint.BaseEndpoint):
     """ShutDown rouote, that terminates the server, expose it only for
     development and testing environment, unless you like server restarts.
@@ -68,6 +123,8 @@ class FavIcon(endpoint.BaseEndpoint):
 
     envelope = None
 
+    static_response = True
+
     def action(self):  # pylint: disable=arguments-differ
         resp = make_response(base64.b64decode(settings.FAVICON_CONTENT))
 
@@ -83,5 +140,26 @@ routes = [
 ]
 
 
+def build_documents(app, versions):
+    """Renders responses of prebuilt documents (url map and OpenAPI document)
+    of every version (as it appears in url, see Router.get_versions) once
+    routing is final.
+    """
+    documents = app.extensions[DOCUMENTS] = {}
+
+    built = set()
+
+    for version in versions:
+        for url, view in logic.iter_routes(version, app):
+            if not isinstance(view, PrebuiltDocument) or url in built:
+                continue
+
+            built.add(url)
+
+            with app.test_request_context(url):
+                documents[view.name, request.version] = \
+                    tools.cache.make_entry(view.respond(None, {}))
+
+
 blueprint = router.Blueprint(
     __name__, namespace="/", routes=routes)
@@ -1,7 +1,13 @@
-from flask import request
+import functools
+import time
+
+from flask import current_app, request
 
 from . import exceptions, envelope, tools
 
+# methods that never carry body
+_BODYLESS_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
 
 class BaseEndpoint(object):
     short_description = None
@@ -31,10 +37,52 @@ class BaseEndpoint(object):
 
     argument_name = 'input_schema'
 
+    # limits of incoming payload (see tools.limits), None means to follow
+    # settings (ie. PAYLOAD_MAX_DEPTH for max_depth), 0 disables the limit
+    max_body_bytes = None
+    max_depth = None
+    max_keys = None
+    max_collection_elements = None
+
+    # decoder of JSON payloads, name of decoder registered in
+    # tools.serializers (or callable that takes raw body and its charset),
+    # None means to follow setting JSON_DECODER
+    json_decoder = None
+
+    # media types of binary formats accepted as payload (see
+    # tools.serializers), None means to follow setting BINARY_FORMATS
+    binary_formats = None
+
+    # if False, responses are never compressed (see tools.compression)
+    compress = True
+
+    # if True, response is the same for every request (of given version), so
+    # its compressed body is computed once and reused
+    static_response = False
+
+    # cache of responses of GET requests (tools.cache.ResponseCache), None
+    # means responses are not cached
+    cache = None
+
+    # templates of tags (ie. 'user:{uid}', formatted with arguments of url and
+    # payload) of cached responses that are invalidated once action of write
+    # request (other than GET, HEAD and OPTIONS) succeeded
+    invalidates = ()
+
+    # coalescing of identical concurrent GET requests
+    # (tools.coalescing.SingleFlight), None means every request is handled
+    # on its own
+    coalesce = None
+
     @classmethod
     def name(cls):
         return cls.__name__
 
+    def get_name(self):
+        """Returns attribute name (if it's set to a string) or name of class.
+        """
+        return self.name if isinstance(self.name, str) else self.name()
+
     @property
     def doc_short(self):
         if self.short_description:
@@ -63,12 +111,20 @@ class BaseEndpoint(object):
     def request(self):
         return request
 
-    def parse_input(self, payload):
+    def parse_input(self, payload, limits=None):
         # pylint: disable=not-callable
         accepted_instance = self.input_schema(
             self.input_schema.__name__.lower())
         # pylint: enable=not-callable
 
+        if limits is None:
+            limits = self.get_limits()
+
+        # limits are checked while schema is being populated, keys of
+        # decoded payload are counted from scratch
+        limits.keys = 0
+        accepted_instance.limits = limits
+
         accepted_instance.populate(payload)
 
         # if invalidated throw exception that will be automatically handled
@@ -89,11 +145,42 @@ class BaseEndpoint(object):
 
         return expected_output
 
-    def get_payload(self):
-        if self.request.headers.get('Content-Type') == 'application/json':
-            return self.request.get_json()
+    def get_limits(self):
+        """Returns fresh limits (tools.limits.PayloadLimits) for payload of
+        current request.
+        """
+        return tools.limits.PayloadLimits.from_settings(
+            max_body_bytes=self.max_body_bytes, max_depth=self.max_depth,
+            max_keys=self.max_keys,
+            max_collection_elements=self.max_collection_elements)
+
+    def get_payload(self, limits=None):
+        if limits is None:
+            limits = self.get_limits()
 
-        return tools.helpers.to_json(self.request.values)
+        media_type, params = tools.serializers.parse_media_type(
+            self.request.headers.get('Content-Type'))
+
+        if tools.serializers.is_json(media_type):
+            return tools.serializers.decode_json(
+                limits.read_body(self.request), params.get('charset'),
+                self.json_decoder)
+
+        if tools.serializers.is_binary(media_type, self.binary_formats):
+            return tools.serializers.decode_binary(
+                limits.read_body(self.request), media_type)
+
+        # form is parsed by werkzeug straight from the stream, unless size
+        # of body is unknown, then it's read (up to the limit) first, server
+        # gives stream of such body only if it tells it's terminated
+        limits.check_body_bytes(self.request.content_length)
+
+        if self.request.content_length is None and \
+                self.request.method not in _BODYLESS_METHODS and \
+                self.request.environ.get('wsgi.input_terminated'):
+            limits.read_body(self.request)
+
+        return tools.helpers.to_json(self.request.values, limits=limits)
 
     def pre_action(self):
         """Override if you want to manipulate payload before it goes to
@@ -108,15 +195,132 @@ class BaseEndpoint(object):
         return result
 
     def __call__(self, *args, **kwargs):
+        timer = tools.timing.start_timer()
+
+        try:
+            return self.handle(*args, **kwargs)
+        finally:
+            tools.timing.finish_timer(self, timer)
+
+    def handle(self, *args, **kwargs):
+        """Handles request: payload, cache, coalescing and response itself
+        (see respond), arguments are those of url.
+        """
+        timer = tools.timing.get_timer()
+
         self.pre_action()
 
-        payload = self.get_payload()
+        timer.lap('pre_action')
+
+        limits = self.get_limits()
+
+        if limits.collections is not None:
+            # counted while input schema is populated, see log of slow
+            # requests (tools.slow_requests)
+            self.request.payload_collections = limits.collections
+
+        payload = self.get_payload(limits)
+
+        timer.lap('payload')
+
+        # arguments of url, before input schema joins them
+        arguments = dict(kwargs)
+
+        cache = self.cache if self.cache and self.cache.is_active() else None
+        coalesce = self.coalesce \
+            if self.coalesce and self.coalesce.is_active() else None
+
+        if cache is None and coalesce is None:
+            return self.respond(
+                payload, arguments, *args, limits=limits, **kwargs)
 
+        respond = functools.partial(self.respond, limits=limits)
+        normalised = payload
+
+        # key is made of normalised input, so payloads that differ only in
+        # form (ie. "1" and 1) share it, input is parsed once
         if self.input_schema:
-            kwargs.update(self.parse_input(payload))
+            parsed = self.parse_input(payload, limits)
+
+            timer.lap('input')
+
+            normalised = {
+                name: value.as_dictionary()
+                if hasattr(value, 'as_dictionary') else value
+                for name, value in parsed.items()
+            }
+
+            kwargs.update(parsed)
+
+            respond = self.respond_with_input
+
+        # coalesced requests share key of cache, if there is one
+        key = (cache or coalesce).make_key(self, normalised, arguments)
+
+        if cache is not None:
+            response = cache.lookup(key)
+
+            if response is not None:
+                return response
+
+        # response made by this request (rather than by the one it was
+        # coalesced with)
+        made = []
+
+        def make_entry():
+            # invalidation that comes while response is made makes it stale
+            created = time.time()
+
+            response = current_app.make_response(
+                respond(payload, arguments, *args, **kwargs))
+
+            entry = tools.cache.make_entry(
+                response,
+                cache.make_tags(payload, arguments) if cache else (), created)
+
+            if cache is not None:
+                cache.store(key, entry)
+
+            made.append(response)
+
+            return entry
+
+        if coalesce is not None:
+            entry = coalesce.run(key, make_entry)
+        else:
+            entry = make_entry()
+
+        # request that made the response gets it with headers that are not
+        # shared (ie. Set-Cookie), others get copy of the entry
+        response = made[0] if made else None
+
+        if cache is not None:
+            return cache.make_response(entry, response)
+
+        return response or tools.cache.make_response(entry)
+
+    def respond(self, payload, arguments, *args, limits=None, **kwargs):
+        """Makes response to the request: input schema, action, output schema,
+        envelope and post_action, arguments are those of url, limits are the
+        ones payload was read with.
+        """
+        if self.input_schema:
+            kwargs.update(self.parse_input(payload, limits))
+
+            tools.timing.get_timer().lap('input')
+
+        return self.respond_with_input(payload, arguments, *args, **kwargs)
+
+    def respond_with_input(self, payload, arguments, *args, **kwargs):
+        """Makes response to the request, once input is parsed (it's among
+        kwargs): action, output schema, envelope and post_action.
+        """
+        timer = tools.timing.get_timer()
 
         result = self.action(*args, **kwargs)
 
+        timer.lap('action')
+
         # if request.headers.get('X-Docs'):
         #     result = view.__doc__, 200
         # else:
@@ -125,10 +329,21 @@ class BaseEndpoint(object):
         if self.output_schema:
             result = self.parse_output(result)
 
+            timer.lap('output')
+
         # this will trick to run callable as function and not method
         if self.envelope:
             result = self.envelope(result)
 
+            timer.lap('envelope')
+
         result = self.post_action(result)
 
+        timer.lap('post_action')
+
+        if self.invalidates and \
+                request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            tools.invalidation.invalidate(*tools.invalidation.format_tags(
+                self.invalidates, payload, arguments))
+
         return result
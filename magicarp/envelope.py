@@ -1,5 +1,7 @@
 import flask
 
+from . import schema, tools
+
 
 class Undefined(object):
     """Tribute to javascript
@@ -19,57 +21,192 @@ def _base(envelope_type, data, success=True):
     return dct
 
 
+# placeholder of content used to split rendered envelope into constant parts
+_CONTENT_MARKER = '__magicarp_envelope_content__'
+
+# constant parts of envelopes: (prefix, suffix, envelope without content) by
+# type of envelope, success, encoder, whether keys are sorted and terminator
+_frames = {}
+
+
+def _get_frame(envelope_type, success, encoder, terminator=b'\n'):
+    sort_keys = flask.current_app.config['JSON_SORT_KEYS']
+
+    key = (envelope_type, success, encoder, sort_keys, terminator)
+
+    frame = _frames.get(key)
+
+    if frame is None:
+        prefix, suffix = encoder(
+            _base(envelope_type, _CONTENT_MARKER, success)).split(
+                encoder(_CONTENT_MARKER))
+
+        frame = _frames[key] = (
+            prefix, suffix + terminator,
+            encoder(_base(envelope_type, Undefined, success)) + terminator)
+
+    return frame
+
+
 class BaseEnvelope(object):
-    def __init__(self, code=200):
+    # rendered as envelope_type, if None data is rendered without envelope
+    envelope_type = None
+    success = True
+
+    # if True, response might be encoded with binary format (ie. MessagePack)
+    # if client asks for it with header Accept
+    negotiate = True
+
+    def __init__(self, code=200, encoder=None, binary_formats=None):
+        """Arguments:
+
+            code :: http code of response
+
+            encoder :: encoder of JSON, name of encoder registered in
+                tools.serializers or callable, None means to follow setting
+                JSON_ENCODER
+
+            binary_formats :: media types of binary formats offered to
+                clients, None means to follow setting BINARY_FORMATS
+        """
         self.code = code
+        self.encoder = encoder
+        self.binary_formats = binary_formats
 
     def wrap(self, payload, code):
         return flask.jsonify(payload), code
 
+    def render(self, data, code):
+        """Returns ready response (with given code) that holds data wrapped
+        in the envelope. Constant parts of envelope are rendered once per type
+        of envelope, only data is encoded.
+
+        Response is JSON, unless client prefers one of binary formats (header
+        Accept).
+        """
+        media_type = None
+
+        if self.negotiate:
+            media_type = tools.serializers.negotiate(
+                flask.request.accept_mimetypes, self.binary_formats)
+
+        if media_type is not None:
+            response = self.render_binary(data, code, media_type)
+        else:
+            response = self.render_json(data, code)
+
+        # response depends on Accept as long as there is a choice
+        if self.negotiate and tools.serializers.get_binary_formats(
+                self.binary_formats):
+            response.vary.add('Accept')
+
+        return response, code
+
+    def render_json(self, data, code):
+        app = flask.current_app
+
+        # pretty printing is left to flask
+        if app.config['JSONIFY_PRETTYPRINT_REGULAR'] or app.debug:
+            if self.envelope_type is None:
+                return self.wrap(data, code)[0]
+
+            return self.wrap(
+                _base(self.envelope_type, data, self.success), code)[0]
+
+        encoder = tools.serializers.get_json_encoder(self.encoder)
+
+        if self.envelope_type is None:
+            body = self.encode(data, encoder) + b'\n'
+        else:
+            prefix, suffix, empty = _get_frame(
+                self.envelope_type, self.success, encoder)
+
+            body = empty if data is Undefined else b''.join(
+                (prefix, self.encode(data, encoder), suffix))
+
+        return app.response_class(
+            body, status=code, mimetype=app.config['JSONIFY_MIMETYPE'])
+
+    def render_binary(self, data, code, media_type):
+        """Same as JSON, envelope is encoded with binary format of given media
+        type (its constant parts are rendered once as well).
+        """
+        encoder = tools.serializers.BINARY_ENCODERS[media_type]
+
+        # schemas and other objects are turned into primitives first
+        if isinstance(data, schema.base.BaseSchemaField):
+            data = data.as_dictionary(
+                user=getattr(flask.request, 'user', None))
+
+        if self.envelope_type is None:
+            body = encoder(data)
+        else:
+            prefix, suffix, empty = _get_frame(
+                self.envelope_type, self.success, encoder, b'')
+
+            body = empty if data is Undefined else b''.join(
+                (prefix, encoder(data), suffix))
+
+        return flask.current_app.response_class(
+            body, status=code, mimetype=media_type)
+
+    def encode(self, data, encoder):  # pylint: disable=no-self-use
+        # populated schemas are written to JSON straight from their fields
+        if isinstance(data, schema.base.BaseSchemaField):
+            return schema.serializer.serialize(
+                data, user=getattr(flask.request, 'user', None))
+
+        return encoder(data)
+
 
 class Read(BaseEnvelope):
     '''Default read (GET, OPTION) envelope'''
+    envelope_type = 'read'
 
     def __call__(self, data=Undefined):
-        return self.wrap(_base('read', data), self.code)
+        return self.render(data, self.code)
 
 
 class Update(BaseEnvelope):
     '''Default update (PUT, PATCH) envelope'''
+    envelope_type = 'update'
 
-    def __init__(self, code=202):
-        super().__init__(code)
+    def __init__(self, code=202, encoder=None, binary_formats=None):
+        super().__init__(code, encoder, binary_formats)
 
     def __call__(self, data=Undefined):
-        return self.wrap(_base('update', data), self.code)
+        return self.render(data, self.code)
 
 
 class Create(BaseEnvelope):
     '''Default create (POST) envelope'''
+    envelope_type = 'create'
 
-    def __init__(self, code=201):
-        super().__init__(code)
+    def __init__(self, code=201, encoder=None, binary_formats=None):
+        super().__init__(code, encoder, binary_formats)
 
     def __call__(self, data=Undefined):
-        return self.wrap(_base('create', data), self.code)
+        return self.render(data, self.code)
 
 
 class Delete(BaseEnvelope):
     '''Default delete (DELETE) envelope'''
+    envelope_type = 'delete'
 
-    def __init__(self, code=202):
-        super().__init__(code)
+    def __init__(self, code=202, encoder=None, binary_formats=None):
+        super().__init__(code, encoder, binary_formats)
 
     def __call__(self, data=Undefined):
-        return self.wrap(_base('delete', data), self.code)
+        return self.render(data, self.code)
 
 
 class RawJson(BaseEnvelope):
     '''Used to return jsonified data as-is with given http code
     '''
+    negotiate = False
 
     def __call__(self, data=Undefined):
-        return self.wrap(data, self.code)
+        return self.render(data, self.code)
 
 
 class Raw(BaseEnvelope):
@@ -90,15 +227,16 @@ class Error(BaseEnvelope):
     populated with human readable exception message if exception supports it.
     '''
 
-    def __init__(self, code=500):
-        super().__init__(code)
+    envelope_type = 'error'
+    success = False
 
-    def __call__(self, err):
-        payload = _base('error', Undefined, False)
+    def __init__(self, code=500, encoder=None, binary_formats=None):
+        super().__init__(code, encoder, binary_formats)
 
+    def __call__(self, err):
         if hasattr(err, 'get_errors'):
-            payload['content'] = err.get_errors()
+            content = err.get_errors()
         else:
-            payload['content'] = str(err)
+            content = str(err)
 
-        return self.wrap(payload, self.code)
+        return self.render(content, self.code)
@@ -36,6 +36,13 @@ class AccessForbidden(MagicarpApiException):
     pass
 
 
+class CoalescedRequestError(MagicarpApiException):
+    """Raised by requests that waited for other one (see tools.coalescing)
+    instead of its exception if that can't be copied.
+    """
+    pass
+
+
 class BaseDataError(MagicarpApiException):
     """Exception is able to aggregate any number of errors and then display
     them as a dictionary of problems.
@@ -1,8 +1,11 @@
+import bisect
 import collections
 
-from flask import Blueprint as FlaskBlueprint
+from flask import Blueprint as FlaskBlueprint, request
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+from werkzeug.routing import BaseConverter
 
-from magicarp import exceptions, endpoint
+from magicarp import exceptions, endpoint, schema, tools
 
 
 class Blueprint(FlaskBlueprint):
@@ -95,6 +98,113 @@ class Url(object):
         return self.url + '/'
 
 
+def format_version(version):
+    """Turns normalised version into its part of url, ie. (1, 2, -1) into
+    '1.2', version-less (None) is an empty string.
+    """
+    if version is None:
+        return ''
+
+    return '.'.join([str(ver) for ver in version if ver != -1])
+
+
+def parse_version(value):
+    """Turns version from url (ie. '1.2') into normalised tuple, the same as
+    versions registered in router, ie. (1, 2, -1).
+    """
+    parts = [int(part) for part in value.split('.')]
+
+    return tuple(parts + [-1] * (3 - len(parts)))
+
+
+class VersionConverter(BaseConverter):
+    """Matches version part of url (ie. 1, 1.2 or 1.2.3) in rules of
+    dispatchers.
+    """
+    regex = r'\d+(?:\.\d+){0,2}'
+
+
+# name of argument of rule that holds version
+VERSION_ARGUMENT = 'api_version'
+
+
+def get_methods(routes):
+    """Returns methods rule of dispatcher accepts: every method any of routes
+    allows (GET for the ones that do not set methods), flask adds HEAD and
+    OPTIONS the same way it does for rules of single endpoint. Dispatcher
+    itself answers 404 for versions without the path and 405 for methods
+    endpoint of requested version does not allow.
+    """
+    methods = set()
+
+    for route in routes:
+        if route is not None:
+            methods.update(route.methods or ['GET'])
+
+    return sorted(methods)
+
+
+class VersionDispatcher(object):
+    """Single view of a path (namespace and url of endpoint) shared by every
+    version, it resolves endpoint of requested version: the one of the latest
+    registered version that is lower or equal to requested one. Versions that
+    do not have the path (ie. endpoint was excluded) are recorded as None.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.versionless = None
+
+        # versions at which endpoint changes, sorted, and their endpoints
+        self.versions = []
+        self.endpoints = []
+
+    def add(self, version, route):
+        """Records endpoint of version, versions have to be added in
+        ascending order.
+        """
+        if version is None:
+            self.versionless = route
+
+            return
+
+        last = self.endpoints[-1] if self.endpoints else None
+
+        if route is not last:
+            self.versions.append(version)
+            self.endpoints.append(route)
+
+    def resolve(self, version):
+        """Returns endpoint for version as it appears in url (ie. '1.2') or
+        None if requested version does not have it.
+        """
+        if version is None:
+            return self.versionless
+
+        index = bisect.bisect_right(
+            self.versions, parse_version(str(version))) - 1
+
+        return self.endpoints[index] if index >= 0 else None
+
+    def __call__(self, **kwargs):
+        route = self.resolve(kwargs.pop(VERSION_ARGUMENT, None))
+
+        if route is None:
+            raise NotFound()
+
+        allowed = set(route.methods or ['GET'])
+
+        if 'GET' in allowed:
+            allowed.add('HEAD')
+
+        if request.method not in allowed:
+            raise MethodNotAllowed(valid_methods=sorted(allowed))
+
+        # tells hooks (ie. compression) which endpoint handled the request
+        request.api_endpoint = route
+
+        return route(**kwargs)
+
+
 class Router(object):
     def __init__(self):
         self.versions = {}
@@ -134,6 +244,32 @@ class Router(object):
     def lock(self):
         self.locked = True
 
+        self.compile_schemas()
+
+        tools.limits.load_defaults()
+
+    def compile_schemas(self):
+        """Routing is final once locked, so is every schema, compile them
+        upfront rather than on first request.
+        """
+        for blueprints in self.versions.values():
+            for blueprint in blueprints:
+                for route in blueprint:
+                    if route.input_schema:
+                        schema.compiler.compile_schema(route.input_schema)
+
+                    if route.output_schema:
+                        schema.compiler.compile_schema(route.output_schema)
+
+    def get_versions(self):
+        """Returns registered versions as they appear in urls (see
+        format_version), version-less one (empty string) first.
+        """
+        versions = sorted(
+            version for version in self.versions if version is not None)
+
+        return [''] + [format_version(version) for version in versions]
+
     def unlock(self):
         self.locked = False
 
@@ -222,20 +358,9 @@ class Router(object):
 
         return version
 
-    def get_normalised_blueprints(self):
-        """Rules:
-
-         - version-less blueprints are always attached, but can be overridden
-           or excluded
-         - blueprints from previous versions are joined only if there is
-           matching namespace and non-matching name of the endpoint
-         - version-less blueprints never override anything, but can be
-           overridden
-        """
-        versionless_blueprints = \
-            self.versions.pop(None) if None in self.versions else []
-
-        versions = list(self.versions.keys())
+    def _resolve_versions(self, versionless_blueprints):
+        versions = [
+            version for version in self.versions.keys() if version is not None]
         versions.sort()
 
         tree = []
@@ -257,6 +382,23 @@ class Router(object):
                 ),
             })
 
+        return tree
+
+    def get_normalised_blueprints(self):
+        """Rules:
+
+         - version-less blueprints are always attached, but can be overridden
+           or excluded
+         - blueprints from previous versions are joined only if there is
+           matching namespace and non-matching name of the endpoint
+         - version-less blueprints never override anything, but can be
+           overridden
+        """
+        versionless_blueprints = \
+            self.versions.pop(None) if None in self.versions else []
+
+        tree = self._resolve_versions(versionless_blueprints)
+
         # at this stage we should all inheritance resolved and we should be
         # working with semi-complex list of versions with namespaces holding
         # endpoints
@@ -269,8 +411,7 @@ class Router(object):
         for version, blp in [
                 (dct['version'], dct['namespaces']) for dct in tree]:
 
-            version_as_string = '' if version is None else '.'.join(
-                [str(ver) for ver in version if ver != -1])
+            version_as_string = format_version(version)
 
             for namespace, endpoints in blp.items():
                 url = Url()
@@ -295,3 +436,67 @@ class Router(object):
                 normalised_blueprints.append((master_blueprint, url_prefix))
 
         return normalised_blueprints
+
+    def get_dispatchers(self):
+        """Alternative to get_normalised_blueprints (setting
+        ROUTING_DISPATCHER), instead of rule per version, namespace and
+        endpoint, every path gets single VersionDispatcher. Inheritance,
+        overrides and exclusions are resolved the same way.
+
+        Returns list of (rule, name of endpoint, dispatcher, methods), rules
+        of versioned paths start with version argument (see
+        VersionConverter), so app needs the converter registered as
+        'api_version'.
+        """
+        tree = self._resolve_versions(self.versions.get(None, []))
+
+        dispatchers = collections.OrderedDict()
+
+        for dct in tree:
+            version = dct['version']
+            paths = set()
+
+            for namespace, endpoints in dct['namespaces'].items():
+                url = Url()
+                url.add(namespace)
+
+                prefix = url.as_full_url()[:-1]
+
+                for name, route in endpoints.items():
+                    if name == '__master_blueprint__':
+                        continue
+
+                    url = Url()
+                    url.add(route.url)
+
+                    path = prefix + url.as_full_url()
+
+                    if path not in dispatchers:
+                        dispatchers[path] = VersionDispatcher(path)
+
+                    dispatchers[path].add(version, route)
+
+                    paths.add(path)
+
+            # paths that version does not have (ie. excluded)
+            if version is not None:
+                for path, dispatcher in dispatchers.items():
+                    if path not in paths:
+                        dispatcher.add(version, None)
+
+        rules = []
+
+        for path, dispatcher in dispatchers.items():
+            name = 'dispatch:{}'.format(path.replace('.', '_'))
+
+            if dispatcher.versionless is not None:
+                rules.append((
+                    path, name, dispatcher,
+                    get_methods([dispatcher.versionless])))
+
+            if any(route is not None for route in dispatcher.endpoints):
+                rules.append((
+                    '/<{0}:{0}>{1}'.format(VERSION_ARGUMENT, path), name,
+                    dispatcher, get_methods(dispatcher.endpoints)))
+
+        return rules
@@ -1 +1,2 @@
-from . import base, input_field, output_field  # NOQA
+from . import base, codegen, compact, compiler  # NOQA
+from . import input_field, output_field, serializer  # NOQA
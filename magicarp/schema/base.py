@@ -1,15 +1,11 @@
-import copy
 import collections
 
-from magicarp import exceptions, tools
-
+from simple_settings import settings
 
-class NotSet(object):
-    def __str__(self):
-        return "NotSet"
-
-    def __repr__(self):
-        return self.__str__()
+from magicarp import exceptions, tools
+from magicarp.schema.compact import (  # NOQA
+    FieldValue, NotSet, can_be_compact, get_element_field, is_magicarp_method,
+    make_elements, normalise_many)
 
 
 class BaseField(object):
@@ -17,9 +13,29 @@ class BaseField(object):
     parent = None
     is_instance = False
 
+    # False for containers (schemas, collections), see compact.can_be_compact
+    is_leaf = True
+
+    # if True, populated leaf fields of a schema/elements of a collection are
+    # stored as FieldValue (compact node that refers to definition of field)
+    # rather than as copy of the definition, None means to follow setting
+    # SCHEMA_COMPACT_VALUES (schemas resolve it once their plan is compiled,
+    # see schema.compiler)
+    compact_values = None
+
+    # if set, function that takes list of values and returns list of
+    # normalised values, that must be equivalent to normalising them one by
+    # one, it is expected to raise TypeError/ValueError/KeyError on first
+    # invalid value (None values never get here), see normalise_many
+    fast_normalise_many = None
+
+    # limits of payload (tools.limits.PayloadLimits), set only on the root of
+    # the tree, see get_limits
+    limits = None
+
     def __init__(
             self, name, description=None, validators=None, allow_blank=True,
-            parent=None):
+            parent=None, compact_values=None):
         """Short description of what all those arguments stand for:
 
             name :: the only mandatory field, it basically tells how the field
@@ -45,6 +61,8 @@ class BaseField(object):
 
             parent :: if object is part of bigger tree we can set a parent to
             it (helps with traversing)
+
+            compact_values :: overrides attribute compact_values, see above
         """
         self.name = name
         self.validators = [] if validators is None else validators
@@ -56,6 +74,9 @@ class BaseField(object):
         if parent is not None:
             self.parent = parent
 
+        if compact_values is not None:
+            self.compact_values = compact_values
+
         self.data = NotSet()
         self.is_instance = True
 
@@ -73,19 +94,54 @@ class BaseField(object):
         return self.__class__(
             name=self.name, description=self.description,
             validators=self.validators, allow_blank=self.allow_blank,
-            parent=parent)
+            parent=parent, compact_values=self.compact_values)
 
     def populate(self, value):
         self.confirm_argument_is_of_expected_shape(value)
 
         self.data = None if value is None else self.normalise(value)
 
+    def make_value(self, value, index=None):
+        """Populates compact node (instead of copy of the field) with a value.
+        """
+        node = FieldValue(self, index=index)
+
+        node.populate(value)
+
+        return node
+
+    def normalise_many(self, values):
+        """Normalises list of values in one go, if any of values is invalid,
+        exception lists indexes of all of invalid values.
+        """
+        return normalise_many(self, values)
+
+    def uses_compact_values(self):
+        if self.compact_values is None:
+            return settings.SCHEMA_COMPACT_VALUES
+
+        return self.compact_values
+
     def normalise(self, value):
         return value
 
     def is_set(self):
         return not isinstance(self.data, NotSet)
 
+    def get_limits(self):
+        """Returns limits of payload set on the root of the tree (or None) and
+        depth of the field in that tree (root has depth 1).
+        """
+        depth = 1
+        root = self
+
+        while root.parent is not None:
+            depth += 1
+
+            root = root.parent
+
+        return root.limits, depth
+
     def get_canonical_string(self):
         ancestors = []
         parent = self.parent
@@ -108,6 +164,12 @@ class BaseField(object):
 
 class BaseSchemaField(BaseField):
     fields = ()
+    is_leaf = False
+
+    # if True, schema is populated (and validated) by code generated for it,
+    # None means to follow setting SCHEMA_CODEGEN (resolved once plan of
+    # schema is compiled, see schema.compiler)
+    codegen = None
 
     def __init__(self, name, fields=None, **kwargs):
         if fields is not None:
@@ -119,7 +181,14 @@ class BaseSchemaField(BaseField):
         return self.__class__(
             name=self.name, description=self.description,
             validators=self.validators, allow_blank=self.allow_blank,
-            parent=parent, fields=self.fields)
+            parent=parent, compact_values=self.compact_values,
+            fields=self.fields)
+
+    def uses_codegen(self):
+        if self.codegen is None:
+            return settings.SCHEMA_CODEGEN
+
+        return self.codegen
 
     def get_field_by_name(self, name):
         for field in self.fields:
@@ -158,6 +227,7 @@ class BaseSchemaField(BaseField):
 
 class BaseCollectionField(BaseField):
     collection_type = None
+    is_leaf = False
 
     def __init__(self, name, collection_type=None, **kwargs):
         if collection_type is not None:
@@ -169,7 +239,8 @@ class BaseCollectionField(BaseField):
         return self.__class__(
             name=self.name, description=self.description,
             validators=self.validators, allow_blank=self.allow_blank,
-            parent=parent, collection_type=self.collection_type)
+            parent=parent, compact_values=self.compact_values,
+            collection_type=self.collection_type)
 
     def confirm_argument_is_of_expected_shape(self, value):
         super().confirm_argument_is_of_expected_shape(value)
@@ -185,26 +256,78 @@ class BaseCollectionField(BaseField):
                 "attribute collection_type not set. I have no idea how "
                 "to populate your collection")
 
+    def get_element_field(self):
+        """Returns definition shared by all compact elements of collection.
+        """
+        if self.collection_type.is_instance:
+            return self.collection_type
+
+        return get_element_field(
+            self.collection_type, self.name, self.description)
+
     def populate(self, value):
         self.confirm_argument_is_of_expected_shape(value)
 
-        data = []
+        limits, depth = self.get_limits()
 
-        for idx, val in enumerate(value):
-            if self.collection_type.is_instance:
-                instance = self.collection_type.make_new(self)
+        if limits is not None and value is not None:
+            limits.check_depth(depth, self.name)
+
+            if not hasattr(value, '__len__'):
+                value = list(value)
+
+            limits.check_collection_elements(len(value), self.name)
+            limits.count_collection_elements(self, len(value))
+
+        # leaf elements (that do not customise populate) are normalised in
+        # one pass, whether they are stored as compact nodes or not
+        if can_be_compact(self.collection_type):
+            element = self.get_element_field()
+
+            if not isinstance(value, (list, tuple)):
+                value = list(value)
+
+            values = element.normalise_many(value)
+
+            if not self.uses_compact_values():
+                self.data = self.make_elements(values)
+
+            elif self.collection_type.is_instance:
+                self.data = [FieldValue(element, None, val) for val in values]
             else:
-                instance = self.collection_type(
-                    '{} - instance - {}'.format(self.name, idx), parent=self,
-                    description='{} - instance - {}'.format(
-                        self.description, idx))
+                self.data = [
+                    FieldValue(element, idx, val)
+                    for idx, val in enumerate(values)
+                ]
+
+            return
 
+        data = []
+
+        for idx, val in enumerate(value):
+            instance = self.make_element(idx)
             instance.populate(val)
 
             data.append(instance)
 
         self.data = data
 
+    def make_element(self, idx):
+        """Returns new (not populated) instance of element of collection.
+        """
+        if self.collection_type.is_instance:
+            return self.collection_type.make_new(self)
+
+        return self.collection_type(
+            '{} - instance - {}'.format(self.name, idx), parent=self,
+            description='{} - instance - {}'.format(self.description, idx))
+
+    def make_elements(self, values):
+        """Returns populated instances of elements of collection for values
+        that are normalised already.
+        """
+        return make_elements(self, values)
+
     def as_dictionary(self, user=None):
         if not self.is_set():
             return None
@@ -220,7 +343,17 @@ class BaseCollectionField(BaseField):
         return res
 
 
+_BOOLEANS = {
+    '0': False, 'false': False, 'no': False, 'n': False,
+    '1': True, 'true': True, 'yes': True, 'y': True,
+}
+
+
 class BaseBoolField(BaseField):
+    @staticmethod
+    def fast_normalise_many(values):
+        return [_BOOLEANS[str(value).lower()] for value in values]
+
     def normalise(self, value):
         try:
             value = str(value).lower()
@@ -255,11 +388,19 @@ class BaseTimeField(BaseField):
 
 
 class BaseStringField(BaseField):
+    @staticmethod
+    def fast_normalise_many(values):
+        return list(map(str, values))
+
     def normalise(self, value):
         return str(value)
 
 
 class BaseIntegerField(BaseField):
+    @staticmethod
+    def fast_normalise_many(values):
+        return list(map(int, values))
+
     def normalise(self, value):
         try:
             return int(value)
@@ -322,7 +463,7 @@ class BaseDocumentField(BaseSchemaField):
 
         local_data = {}
 
-        payload = self.normalise(copy.deepcopy(value))
+        payload = self.normalise(value)
 
         schema_key = self.fields[0]
         schema_value = self.fields[1]
@@ -0,0 +1,270 @@
+"""Code generation backend for schemas.
+
+For every schema plan it generates source of populate (and validate for input
+schemas) that is specialised for that particular schema: fields are unrolled,
+names are constants, coercions of compact leaf fields and validators are
+inlined. Generated functions are drop-in replacements of SchemaField.populate
+and SchemaField.validate, whenever something goes wrong generated code calls
+the very same methods of field definitions that schema would, so errors are
+identical.
+
+Backend is enabled with setting SCHEMA_CODEGEN or attribute codegen on schema.
+"""
+from magicarp import exceptions
+from magicarp.schema import base, compact
+
+# inlined coercions, used only when normalise was not customised, if inlined
+# coercion fails, normalise of definition is called to raise proper error
+_COERCIONS = (
+    (base.BaseIntegerField, 'int({raw})', '(TypeError, ValueError)'),
+    (base.BaseStringField, 'str({raw})', None),
+    (base.BaseBoolField, '_BOOLEANS[str({raw}).lower()]', '(KeyError, )'),
+)
+
+
+class GeneratedSchema(object):
+    """Holds generated functions and their source (helps with debugging).
+    """
+    def __init__(self, source, populate, validate=None):
+        self.source = source
+        self.populate = populate
+        self.validate = validate
+
+
+class _Writer(object):
+    def __init__(self):
+        self.lines = []
+        self.indent = 0
+
+    def __call__(self, line, *args):
+        self.lines.append('    ' * self.indent + line.format(*args))
+
+    def source(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def _get_coercion(field):
+    if not compact.is_magicarp_method(field.__class__, 'normalise') or \
+            not compact.is_magicarp_method(
+                field.__class__, 'confirm_argument_is_of_expected_shape'):
+        return None, None
+
+    for field_cls, expression, errors in _COERCIONS:
+        if isinstance(field, field_cls):
+            return expression, errors
+
+    return 'n_{idx}({raw})', None
+
+
+def _write_compact(write, idx, entry):
+    expression, errors = _get_coercion(entry.field)
+
+    if expression is None:
+        write('local_fields[{!r}] = f_{}.make_value(raw)', entry.name, idx)
+
+        return
+
+    expression = expression.format(idx=idx, raw='raw')
+
+    # None is verified by definition (it knows whether blank is allowed)
+    write('if raw is None:')
+    write('    c_{}(raw)', idx)
+    write('    local_fields[{!r}] = FieldValue(f_{}, None, None)',
+          entry.name, idx)
+    write('else:')
+
+    if errors is None:
+        write('    local_fields[{!r}] = FieldValue(f_{}, None, {})',
+              entry.name, idx, expression)
+
+        return
+
+    write('    try:')
+    write('        data = {}', expression)
+    write('    except {}:', errors)
+    write('        data = n_{}(raw)', idx)
+    write('    local_fields[{!r}] = FieldValue(f_{}, None, data)',
+          entry.name, idx)
+
+
+def _write_populate(write, plan, catch):
+    write('def populate(self, value):')
+
+    write.indent += 1
+
+    write('self.confirm_argument_is_of_expected_shape(value)')
+
+    if plan.is_input:
+        write('self.check_limits(value)')
+
+    write('error_required_field = []')
+    write('error_invalid_payload = []')
+    write('local_fields = {{}}')
+    write('recognised = 0')
+
+    for idx, entry in enumerate(plan.entries):
+        write('# field: {}', entry.name)
+        write('if {!r} in value:', entry.name)
+
+        write.indent += 1
+
+        write('recognised += 1')
+        write('raw = value[{!r}]', entry.name)
+        write('try:')
+
+        write.indent += 1
+
+        if entry.compact:
+            _write_compact(write, idx, entry)
+        else:
+            write('local_field = f_{}.make_new(self)', idx)
+            write('local_fields[{!r}] = local_field', entry.name)
+            write('local_field.populate(raw)')
+
+        write.indent -= 1
+
+        write('except {} as err:', catch)
+        write('    error_invalid_payload.append(({!r}, str(err)))', entry.name)
+
+        # on error field might be missing, same as plan, keep it unpopulated
+        if entry.compact:
+            write('    if {!r} not in local_fields:', entry.name)
+            write('        local_fields[{!r}] = FieldValue(f_{})',
+                  entry.name, idx)
+
+        write.indent -= 1
+
+        write('else:')
+
+        write.indent += 1
+
+        if entry.is_required:
+            write('error_required_field.append(')
+            write('    ({!r}, "Missing required field"))', entry.canonical)
+
+        if entry.compact:
+            write('local_fields[{!r}] = FieldValue(f_{})', entry.name, idx)
+        else:
+            write('local_fields[{!r}] = f_{}.make_new(self)', entry.name, idx)
+
+        write.indent -= 1
+
+    if plan.is_input:
+        write('if len(value) > recognised and '
+              'settings.EXCEPTION_ON_UNRECOGNISED_INPUT:')
+        write('    unrecognised = [key for key in value if key not in names]')
+        write('    error_invalid_payload.append((')
+        write('        "payload",')
+        write('        "Payload specifies fields that do not exist: "')
+        write('        "{{}}".format(", ".join(unrecognised))))')
+        write('if error_required_field or error_invalid_payload:')
+        write('    raise exceptions.PayloadError(')
+        write('        error_required_field=error_required_field,')
+        write('        error_invalid_payload=error_invalid_payload)')
+    else:
+        write('if error_invalid_payload:')
+        write('    raise exceptions.ResponseError(')
+        write('        error_invalid_payload=error_invalid_payload)')
+
+    write('self.data = local_fields')
+
+    write.indent -= 1
+
+
+def _can_inline_validators(entry):
+    # validator that is a type is an error, leave it to the field to complain
+    return entry.compact and \
+        compact.is_magicarp_method(entry.field.__class__, 'validate') and \
+        not any(isinstance(validator, type)
+                for validator in entry.field.validators)
+
+
+def _write_validate(write, plan):
+    write('def validate(self):')
+
+    write.indent += 1
+
+    write('errors = {{}}')
+    write('data = self.data')
+
+    for idx, entry in enumerate(plan.entries):
+        if not entry.validate:
+            continue
+
+        write('# field: {}', entry.name)
+        write('field = data[{!r}]', entry.name)
+        write('if field.is_set():')
+
+        write.indent += 1
+
+        write('try:')
+
+        if _can_inline_validators(entry):
+            for vidx in range(len(entry.field.validators)):
+                write('    v_{}_{}(field.data)', idx, vidx)
+        else:
+            write('    field.validate()')
+
+        write('except exceptions.BaseValidationError as err:')
+        write('    errors.setdefault({!r}, []).append(str(err))', entry.name)
+
+        write.indent -= 1
+
+    write('for field_names, validator, message in self.schema_validators:')
+    write('    fields = [data[name] for name in field_names]')
+    write('    if not validator(*fields):')
+    write('        errors.setdefault(",".join(field_names), []).append(')
+    write('            "Invalid value" if message is None else message)')
+    write('if errors:')
+    write('    raise exceptions.MultipleValidationError(self.name, errors)')
+
+    write.indent -= 1
+
+
+def generate(plan, schema):
+    """Generates populate (and validate for input schemas) for given plan.
+    """
+    # this import is on purpose, settings are read when generated code runs
+    from simple_settings import settings
+
+    namespace = {
+        'exceptions': exceptions,
+        'settings': settings,
+        'FieldValue': compact.FieldValue,
+        '_BOOLEANS': base._BOOLEANS,  # pylint: disable=protected-access
+        'names': plan.names,
+    }
+
+    for idx, entry in enumerate(plan.entries):
+        field = entry.field
+
+        namespace['f_{}'.format(idx)] = field
+        namespace['c_{}'.format(idx)] = \
+            field.confirm_argument_is_of_expected_shape
+        namespace['n_{}'.format(idx)] = field.normalise
+
+        for vidx, validator in enumerate(field.validators):
+            namespace['v_{}_{}'.format(idx, vidx)] = validator
+
+    if plan.is_input:
+        catch = 'exceptions.InvalidPayloadError'
+    else:
+        catch = '(exceptions.InvalidPayloadError, exceptions.ResponseError)'
+
+    write = _Writer()
+
+    _write_populate(write, plan, catch)
+
+    if plan.is_input:
+        _write_validate(write, plan)
+
+    source = write.source()
+
+    code = compile(
+        source, '<magicarp codegen: {}>'.format(schema.__class__.__name__),
+        'exec')
+
+    exec(code, namespace)  # pylint: disable=exec-used
+
+    return GeneratedSchema(
+        source, namespace['populate'], namespace.get('validate'))
@@ -0,0 +1,232 @@
+"""Compact nodes of populated value trees (setting SCHEMA_COMPACT_VALUES).
+
+Populated leaf field used to be a copy of its definition, compact node
+(FieldValue) holds only a value and reference to the definition that is
+shared by all nodes of the field. Only leaf fields that do not customise
+methods FieldValue re-implements can be represented by it (see
+can_be_compact).
+"""
+from magicarp import exceptions
+
+
+class NotSet(object):
+    def __str__(self):
+        return "NotSet"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+_NOT_SET = NotSet()
+
+
+class FieldValue(object):
+    """Compact node of populated value tree.
+
+    Node holds a value and reference to definition of the field (shared by all
+    nodes), anything that is not a value is read from the definition. Nodes
+    quack like populated fields, but weight fraction of them.
+
+    index :: position on the collection, set only if collection_type was a
+        class, in which case name and description are suffixed with it
+    """
+    __slots__ = ('field', 'data', 'index')
+
+    is_instance = True
+
+    def __init__(self, field, index=None, data=_NOT_SET):
+        self.field = field
+        self.data = data
+        self.index = index
+
+    def __getattr__(self, name):
+        # called only for attributes that are not on the node itself
+        if name == 'field':
+            raise AttributeError(name)
+
+        return getattr(self.field, name)
+
+    def __repr__(self):
+        return '<FieldValue({}={!r})>'.format(self.name, self.data)
+
+    @property
+    def name(self):
+        if self.index is None:
+            return self.field.name
+
+        return '{} - {}'.format(self.field.name, self.index)
+
+    @property
+    def description(self):
+        if self.index is None:
+            return self.field.description
+
+        return '{} - {}'.format(self.field.description, self.index)
+
+    def populate(self, value):
+        self.field.confirm_argument_is_of_expected_shape(value)
+
+        self.data = None if value is None else self.field.normalise(value)
+
+    def is_set(self):
+        return self.data is not _NOT_SET
+
+    def as_dictionary(self, user=None):
+        if self.data is _NOT_SET:
+            return None
+
+        return self.data
+
+    def validate(self):
+        self.field.__class__.validate(self)
+
+
+# methods re-implemented by FieldValue, if field customises any of them outside
+# of magicarp, it has to be populated as full instance
+_COMPACT_METHODS = ('populate', 'is_set', 'as_dictionary', 'validate')
+
+_compact_fields = {}
+
+
+def can_be_compact(field):
+    """Whether populated field can be represented by FieldValue, only leaf
+    fields (as opposed to containers like schema or collection) can.
+    """
+    field_cls = field if isinstance(field, type) else field.__class__
+
+    result = _compact_fields.get(field_cls)
+
+    if result is not None:
+        return result
+
+    # containers (schemas, collections) are not leaves, neither is anything
+    # that is not a field at all
+    result = getattr(field_cls, 'is_leaf', False)
+
+    for name in _COMPACT_METHODS:
+        if not is_magicarp_method(field_cls, name):
+            result = False
+
+    _compact_fields[field_cls] = result
+
+    return result
+
+
+def is_magicarp_method(field_cls, name):
+    """Whether method is either missing or was not customised outside of
+    magicarp.
+    """
+    method = getattr(field_cls, name, None)
+
+    return method is None or method.__module__.startswith('magicarp.schema')
+
+
+_element_fields = {}
+
+
+def get_element_field(collection_type, name, description):
+    """Returns definition shared by all compact elements of collection (of
+    given name and description) of class collection_type.
+    """
+    key = (collection_type, name, description)
+
+    element = _element_fields.get(key)
+
+    if element is None:
+        # each node appends its index to name and description
+        element = _element_fields[key] = collection_type(
+            '{} - instance'.format(name),
+            description='{} - instance'.format(description))
+
+    return element
+
+
+def normalise_many(field, values):
+    """Normalises list of values with field in one go, if any of values is
+    invalid, exception lists indexes of all of invalid values (see
+    BaseField.normalise_many).
+    """
+    # fast path is equivalent only to normalise defined by magicarp
+    if field.fast_normalise_many is not None and \
+            is_magicarp_method(field.__class__, 'normalise') and \
+            is_magicarp_method(
+                field.__class__, 'confirm_argument_is_of_expected_shape') \
+            and None not in values:
+        try:
+            return field.fast_normalise_many(values)
+        except (TypeError, ValueError, KeyError):
+            # one of values is invalid, find out which one
+            pass
+
+    result = []
+    invalid = []
+    first_error = None
+
+    for idx, value in enumerate(values):
+        try:
+            field.confirm_argument_is_of_expected_shape(value)
+
+            result.append(None if value is None else field.normalise(value))
+        except (
+                exceptions.InvalidPayloadError,
+                exceptions.ResponseError) as err:
+            invalid.append(str(idx))
+
+            if first_error is None:
+                first_error = err
+
+    if invalid:
+        if len(invalid) > 10:
+            invalid[10:] = ['and {} more'.format(len(invalid) - 10)]
+
+        raise first_error.__class__(
+            "Invalid elements at indexes: {}, first error: {}".format(
+                ", ".join(invalid), first_error))
+
+    return result
+
+
+def make_elements(collection, values):
+    """Returns populated instances of elements of collection for values that
+    are normalised already (see BaseCollectionField.make_elements).
+    """
+    template = collection.make_element(0)
+    field_cls = template.__class__
+
+    # fields that customise __init__ are constructed one by one
+    if not is_magicarp_method(field_cls, '__init__'):
+        elements = []
+
+        for idx, val in enumerate(values):
+            instance = collection.make_element(idx)
+            instance.data = val
+
+            elements.append(instance)
+
+        return elements
+
+    # instances of fields that do not customise __init__ differ only in
+    # name, description and data, they are copied from the first one
+    copy_state = template.__dict__.copy
+    indexed = not collection.collection_type.is_instance
+
+    # same as names and descriptions given by make_element
+    name = '{} - instance - '.format(collection.name)
+    description = '{} - instance - '.format(collection.description)
+
+    elements = []
+
+    for idx, val in enumerate(values):
+        state = copy_state()
+        state['data'] = val
+
+        if indexed:
+            state['name'] = name + str(idx)
+            state['description'] = description + str(idx)
+
+        instance = field_cls.__new__(field_cls)
+        instance.__dict__ = state
+
+        elements.append(instance)
+
+    return elements
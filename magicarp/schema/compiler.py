@@ -0,0 +1,160 @@
+"""Schema compiler turns schema definition into a flat plan.
+
+Schema definitions do not change once application is running, yet populating
+schema used to walk through definition and re-calculate everything that can be
+derived from it (required fields, canonical names and etc.) on each request.
+Plan is calculated once per schema class (and its fields) and then re-used.
+"""
+import collections
+
+from simple_settings import settings
+
+from magicarp.schema import base, codegen, compact
+
+# single field as seen by a plan:
+#
+#   name :: key under which field is looked up in a payload
+#   field :: definition of the field (shared, never populated)
+#   canonical :: canonical string of the field used in error messages
+#   is_required :: whether field has to be present in a payload
+#   validate :: False if validation of populated field would be a no-op
+#   compact :: if True field is populated into FieldValue, so is missing
+#       field (each schema gets fresh node, nodes are mutable)
+PlanEntry = collections.namedtuple(
+    'PlanEntry', (
+        'name', 'field', 'canonical', 'is_required', 'validate', 'compact'))
+
+_plans = {}
+_required_fields = {}
+
+
+class SchemaPlan(object):
+    def __init__(self, schema, compact_values):
+        self.fields = schema.fields
+        self.compact_values = compact_values
+
+        # output schemas have no notion of required fields
+        self.is_input = hasattr(schema, 'collect_required_fields')
+
+        required = schema.collect_required_fields() if self.is_input else {}
+
+        entries = []
+
+        for field in schema.fields:
+            is_compact = compact_values and compact.can_be_compact(field)
+
+            entries.append(PlanEntry(
+                name=field.name,
+                field=field,
+                canonical=field.get_canonical_string(),
+                is_required=field.name in required,
+                validate=_needs_validation(field),
+                compact=is_compact,
+            ))
+
+        self.entries = tuple(entries)
+        self.names = frozenset(entry.name for entry in self.entries)
+        self.required = frozenset(
+            entry.name for entry in self.entries if entry.is_required)
+
+        # generated populate/validate, see magicarp.schema.codegen
+        self.generated = codegen.generate(self, schema) \
+            if schema.uses_codegen() else None
+
+    def __iter__(self):
+        return iter(self.entries)
+
+
+def _needs_validation(field):
+    if isinstance(field, (base.BaseSchemaField, base.BaseCollectionField)):
+        return True
+
+    return bool(field.validators)
+
+
+def get_plan(schema):
+    """Returns plan for given schema instance, plan is compiled on first use
+    (see compile_schema). Compact values and code generation are resolved
+    (from class of schema and settings) once plan is compiled, instance that
+    overrides compact values (ie. one nested in schema that does) gets plan
+    of its own.
+    """
+    key = (schema.__class__, id(schema.fields))
+
+    plan = _plans.get(key)
+
+    # plan keeps reference to fields, so their id cannot be recycled for as
+    # long as plan is cached, if fields on schema are replaced, new plan is
+    # compiled
+    if plan is None:
+        compact_values = schema.__class__.compact_values
+
+        if compact_values is None:
+            compact_values = settings.SCHEMA_COMPACT_VALUES
+
+        plan = _plans[key] = SchemaPlan(schema, compact_values)
+
+    compact_values = schema.__dict__.get('compact_values')
+
+    if compact_values is None or compact_values == plan.compact_values:
+        return plan
+
+    key += (compact_values, )
+
+    plan = _plans.get(key)
+
+    if plan is None:
+        plan = _plans[key] = SchemaPlan(schema, compact_values)
+
+    return plan
+
+
+def get_required_fields(schema):
+    """Returns tree of required fields for given schema instance, tree is built
+    once per schema class (and its fields).
+    """
+    key = (schema.__class__, id(schema.fields))
+
+    cached = _required_fields.get(key)
+
+    if cached is None:
+        # same as with plans, fields are kept to keep their id reserved
+        cached = _required_fields[key] = (
+            schema.fields, schema.build_required_fields())
+
+    return cached[1]
+
+
+def compile_schema(schema):
+    """Compiles plans for schema and every schema nested in it. Accepts either
+    class or an instance of schema (or collection of them).
+    """
+    if isinstance(schema, type):
+        if not issubclass(schema, (
+                base.BaseSchemaField, base.BaseCollectionField)):
+            return None
+
+        schema = schema(schema.__name__.lower())
+
+    if isinstance(schema, base.BaseCollectionField):
+        if schema.collection_type is not None:
+            compile_schema(schema.collection_type)
+
+        return None
+
+    # document field has fixed pair of fields that are populated differently
+    if not isinstance(schema, base.BaseSchemaField) or \
+            isinstance(schema, base.BaseDocumentField):
+        return None
+
+    plan = get_plan(schema)
+
+    for entry in plan:
+        compile_schema(entry.field)
+
+    return plan
+
+
+def clear_cache():
+    _plans.clear()
+    _required_fields.clear()
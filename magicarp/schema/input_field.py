@@ -1,10 +1,9 @@
 import collections
-import copy
 
 from simple_settings import settings
 
 from magicarp import exceptions, tools
-from magicarp.schema import base
+from magicarp.schema import base, compact, compiler
 
 
 class BaseInputField(object):
@@ -63,10 +62,19 @@ class SchemaField(base.BaseSchemaField, BaseInputField):
         return ["{}.{}".format(prefix, value) for value in values]
 
     def collect_required_fields(self):
+        """Returns tree of required fields, tree depends only on definition of
+        the schema and as such is calculated once per schema class.
+
+        NOTE: returned tree is shared, treat it as read-only
+        """
+        return compiler.get_required_fields(self)
+
+    def build_required_fields(self):
         if self.fields is None:
             return []
 
-        required = self._get_required()
+        # copy, as otherwise list defined on a class would be extended
+        required = list(self._get_required())
 
         for field in self.fields:
             if isinstance(field, base.BaseSchemaField):
@@ -115,14 +123,33 @@ class SchemaField(base.BaseSchemaField, BaseInputField):
 
         return required
 
+    def check_limits(self, value):
+        """Checks limits of payload (if any were set on the root of the tree)
+        before schema is populated with value.
+        """
+        limits, depth = self.get_limits()
+
+        if limits is None or value is None:
+            return
+
+        limits.check_depth(depth, self.name)
+        limits.add_keys(len(value), self.name)
+
     def populate(self, value):
+        plan = compiler.get_plan(self)
+
+        if plan.generated is not None:
+            plan.generated.populate(self, value)
+
+            return
+
         self.confirm_argument_is_of_expected_shape(value)
 
+        self.check_limits(value)
+
         error_required_field = []
         error_invalid_payload = []
 
-        required = self.collect_required_fields()
-
         # TODO: if error happens FW needs to return more detailed exceptions,
         # for example we can say not only that given field is missing but that
         # it's the schema with 3 required sub-field, same with collections, not
@@ -131,30 +158,39 @@ class SchemaField(base.BaseSchemaField, BaseInputField):
 
         local_fields = {}
 
-        payload = copy.deepcopy(value)
+        # payload is never modified (nor copied), instead we count keys that
+        # were recognised, whatever is left is not known to the plan
+        recognised = 0
 
-        for field in self.fields:
-            if field.name not in payload and field.name in required:
-                error_required_field.append((
-                    field.get_canonical_string(), "Missing required field"))
+        for entry in plan:
+            local_field = compact.FieldValue(entry.field) if entry.compact \
+                else entry.field.make_new(self)
 
-            local_field = field.make_new(self)
-
-            if field.name in payload:
-                subpayload = payload.pop(field.name)
+            if entry.name in value:
+                recognised += 1
 
                 try:
-                    local_field.populate(subpayload)
+                    if entry.compact:
+                        local_field = entry.field.make_value(value[entry.name])
+                    else:
+                        local_field.populate(value[entry.name])
                 except exceptions.InvalidPayloadError as err:
-                    error_invalid_payload.append((field.name, str(err)))
+                    error_invalid_payload.append((entry.name, str(err)))
 
-            local_fields[local_field.name] = local_field
+            elif entry.is_required:
+                error_required_field.append((
+                    entry.canonical, "Missing required field"))
+
+            local_fields[entry.name] = local_field
+
+        if len(value) > recognised and \
+                settings.EXCEPTION_ON_UNRECOGNISED_INPUT:
+            unrecognised = [key for key in value if key not in plan.names]
 
-        if payload and settings.EXCEPTION_ON_UNRECOGNISED_INPUT:
             error_invalid_payload.append((
                 "payload",
                 "Payload specifies fields that do not exist: {}".format(
-                    ", ".join(payload.keys()))))
+                    ", ".join(unrecognised))))
 
         if error_required_field or error_invalid_payload:
             raise exceptions.PayloadError(
@@ -165,19 +201,33 @@ class SchemaField(base.BaseSchemaField, BaseInputField):
         self.data = local_fields
 
     def validate(self):
+        plan = compiler.get_plan(self)
+
+        if plan.generated is not None:
+            plan.generated.validate(self)
+
+            return
+
         errors = {}
 
-        for name, field in self.data.items():
+        for entry in plan:
+            # fields without validators (that are not containers) have nothing
+            # to validate
+            if not entry.validate:
+                continue
+
+            field = self.data[entry.name]
+
             if not field.is_set():
                 continue
 
             try:
                 field.validate()
             except exceptions.BaseValidationError as err:
-                if field.name not in errors:
-                    errors[name] = []
+                if entry.name not in errors:
+                    errors[entry.name] = []
 
-                errors[name].append(str(err))
+                errors[entry.name].append(str(err))
 
         for field_names, validator, message in self.schema_validators:
             fields = [
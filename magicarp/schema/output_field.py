@@ -1,5 +1,5 @@
 from magicarp import exceptions
-from magicarp.schema import base
+from magicarp.schema import base, compact, compiler
 
 
 class BaseOutputField(object):
@@ -18,24 +18,35 @@ class BaseOutputField(object):
 
 class SchemaField(base.BaseSchemaField, BaseOutputField):
     def populate(self, value):
+        plan = compiler.get_plan(self)
+
+        if plan.generated is not None:
+            plan.generated.populate(self, value)
+
+            return
+
         self.confirm_argument_is_of_expected_shape(value)
 
         error_invalid_payload = []
 
         local_fields = {}
 
-        for field in self.fields:
-            local_field = field.make_new(self)
+        for entry in plan:
+            local_field = compact.FieldValue(entry.field) if entry.compact \
+                else entry.field.make_new(self)
 
-            if field.name in value:
+            if entry.name in value:
                 try:
-                    local_field.populate(value[field.name])
+                    if entry.compact:
+                        local_field = entry.field.make_value(value[entry.name])
+                    else:
+                        local_field.populate(value[entry.name])
                 except (
                         exceptions.InvalidPayloadError,
                         exceptions.ResponseError) as err:
-                    error_invalid_payload.append((field.name, str(err)))
+                    error_invalid_payload.append((entry.name, str(err)))
 
-            local_fields[field.name] = local_field
+            local_fields[entry.name] = local_field
 
         if error_invalid_payload:
             raise exceptions.ResponseError(
@@ -0,0 +1,239 @@
+"""Serializer of populated schemas, writes JSON straight from the tree of
+fields (no intermediate dictionaries as with as_dictionary).
+
+Leaf fields of known types (strings, integers, booleans) are written
+directly, anything else (dates, documents, fields that customise
+as_dictionary) goes through as_dictionary and flask's json, so output is the
+same as if whole tree was converted with as_dictionary and encoded by flask.
+"""
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+from flask import current_app, json as flask_json
+
+from magicarp.schema import base, compact, compiler
+
+# writer by class of field
+_writers = {}
+
+# layout of schema by plan, whether keys are sorted and whether they are
+# encoded as ASCII, list of name of field, its pre-encoded key (prefixed with
+# a comma) and its writer
+_layouts = {}
+
+
+class _Serializer(object):
+    def __init__(self, user):
+        self.user = user
+        self.sort_keys = current_app.config['JSON_SORT_KEYS']
+        self.as_ascii = current_app.config['JSON_AS_ASCII']
+        self.encode_string = encode_basestring_ascii \
+            if self.as_ascii else encode_basestring
+        self.parts = []
+
+    def write(self, field):
+        # compact nodes are written as their definition would be
+        field_cls = field.field.__class__ \
+            if field.__class__ is compact.FieldValue else field.__class__
+
+        _get_writer(field_cls)(self, field)
+
+    def get_layout(self, field):
+        plan = compiler.get_plan(field)
+
+        key = (plan, self.sort_keys, self.as_ascii)
+
+        layout = _layouts.get(key)
+
+        if layout is None:
+            entries = list(plan)
+
+            if self.sort_keys:
+                entries.sort(key=lambda entry: entry.name)
+
+            layout = _layouts[key] = [(
+                entry.name, ',' + self.encode_string(entry.name) + ':',
+                _get_writer(entry.field.__class__)) for entry in entries]
+
+        return layout
+
+
+def _write_generic(serializer, field):
+    serializer.parts.append(flask_json.dumps(
+        field.as_dictionary(user=serializer.user), separators=(',', ':')))
+
+
+def _write_leaf(serializer, field):
+    data = field.data
+
+    if data is None:
+        serializer.parts.append('null')
+    else:
+        _write_generic(serializer, field)
+
+
+def _write_string(serializer, field):
+    data = field.data
+
+    if data.__class__ is str:
+        serializer.parts.append(serializer.encode_string(data))
+    else:
+        _write_leaf(serializer, field)
+
+
+def _write_integer(serializer, field):
+    data = field.data
+
+    if data.__class__ is int:
+        serializer.parts.append(int.__repr__(data))
+    else:
+        _write_leaf(serializer, field)
+
+
+def _write_bool(serializer, field):
+    data = field.data
+
+    if data.__class__ is bool:
+        serializer.parts.append('true' if data else 'false')
+    else:
+        _write_leaf(serializer, field)
+
+
+def _write_schema(serializer, field):
+    data = field.data
+
+    if data is None:
+        serializer.parts.append('null')
+
+        return
+
+    parts = serializer.parts
+    append = parts.append
+    encode_string = serializer.encode_string
+
+    append('{')
+
+    start = len(parts)
+
+    # each key is prefixed with a comma, first of them is stripped at the end
+    for name, key, writer in serializer.get_layout(field):
+        sub_field = data.get(name)
+
+        if sub_field is None:
+            continue
+
+        sub_data = sub_field.data
+
+        # is_set was not customised, otherwise writer would be generic
+        if writer is _write_generic:
+            if not sub_field.is_set():
+                continue
+        elif sub_data.__class__ is base.NotSet:
+            continue
+
+        append(key)
+
+        if writer is _write_string and sub_data.__class__ is str:
+            append(encode_string(sub_data))
+        elif writer is _write_integer and sub_data.__class__ is int:
+            append(int.__repr__(sub_data))
+        elif writer is _write_bool and sub_data.__class__ is bool:
+            append('true' if sub_data else 'false')
+        else:
+            writer(serializer, sub_field)
+
+    if len(parts) > start:
+        parts[start] = parts[start][1:]
+
+    append('}')
+
+
+def _write_collection(serializer, field):
+    data = field.data
+
+    if data is None:
+        serializer.parts.append('null')
+
+        return
+
+    parts = serializer.parts
+    append = parts.append
+    encode_string = serializer.encode_string
+
+    # all elements are of the same type
+    collection_type = field.collection_type
+
+    writer = _get_writer(
+        collection_type.__class__ if collection_type.is_instance else
+        collection_type)
+
+    append('[')
+
+    start = len(parts)
+
+    # each element is prefixed with a comma, first of them is stripped below
+    for element in data:
+        element_data = element.data
+
+        if writer is _write_generic:
+            if not element.is_set():
+                continue
+        elif element_data.__class__ is base.NotSet:
+            continue
+
+        if writer is _write_string and element_data.__class__ is str:
+            append(',' + encode_string(element_data))
+        elif writer is _write_integer and element_data.__class__ is int:
+            append(',' + int.__repr__(element_data))
+        else:
+            append(',')
+
+            writer(serializer, element)
+
+    if len(parts) > start:
+        parts[start] = parts[start][1:]
+
+    append(']')
+
+
+def _find_writer(field_cls):
+    if not compact.is_magicarp_method(field_cls, 'as_dictionary') or \
+            not compact.is_magicarp_method(field_cls, 'is_set'):
+        return _write_generic
+
+    # document is a schema, but its data is not laid out by a plan
+    if issubclass(field_cls, base.BaseDocumentField):
+        return _write_generic
+
+    for parent_cls, writer in (
+            (base.BaseSchemaField, _write_schema),
+            (base.BaseCollectionField, _write_collection),
+            (base.BaseStringField, _write_string),
+            (base.BaseIntegerField, _write_integer),
+            (base.BaseBoolField, _write_bool)):
+        if issubclass(field_cls, parent_cls):
+            return writer
+
+    return _write_leaf
+
+
+def _get_writer(field_cls):
+    writer = _writers.get(field_cls)
+
+    if writer is None:
+        writer = _writers[field_cls] = _find_writer(field_cls)
+
+    return writer
+
+
+def serialize(field, user=None):
+    """Returns JSON (bytes) of populated field (usually output schema), same
+    as JSON of field.as_dictionary(user=user) encoded by flask.
+    """
+    if not field.is_set():
+        return b'null'
+
+    serializer = _Serializer(user)
+
+    serializer.write(field)
+
+    return ''.join(serializer.parts).encode('utf-8')
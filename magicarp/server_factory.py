@@ -6,7 +6,7 @@ from flask.logging import default_handler
 
 from simple_settings import settings
 
-from . import exceptions, tools, envelope, plugins
+from . import exceptions, tools, envelope, plugins, router, signals
 
 
 # pylint: disable=too-many-branches
@@ -58,6 +58,14 @@ def create_app(
     if final_setup:
         final_setup(app)
 
+    # url map and OpenAPI document depend only on routing (and settings of
+    # app), so they are rendered once
+    if settings.ROUTING_ADD_COMMON:
+        from magicarp import routing
+        from magicarp.common import routes
+
+        routes.build_documents(app, routing.get_versions())
+
     return app
 # pylint: enable=too-many-branches
 
@@ -182,6 +190,35 @@ def _setup(app):
     # def example_preprocessor():  # pylint: disable=unused-variable
     #     pass
 
+    # hooks run in reverse order of registration, so compression is the very
+    # last step, after every other hook is done with the response
+    app.after_request(tools.compression.compress_response)
+
+    # profiler starts before auth (see _register_auth) and stops before
+    # compression is done, after metrics are recorded (with response of
+    # endpoint rather than report of profiler)
+    if settings.PROFILING:
+        app.before_request(tools.profiling.start_profiling)
+        app.after_request(tools.profiling.finish_profiling)
+        app.teardown_request(tools.profiling.teardown_profiling)
+
+    if settings.ROUTING_ADD_METRICS:
+        app.before_request(tools.metrics.start_request)
+        app.after_request(tools.metrics.record_response)
+
+    # timing is off by default, but metrics and log of slow requests need it
+    if settings.ROUTING_ADD_METRICS or \
+            settings.SLOW_REQUEST_THRESHOLD is not None:
+        tools.timing.enable()
+
+    # slow requests are logged with response that was made by endpoint, not
+    # report of profiler
+    if settings.SLOW_REQUEST_THRESHOLD is not None:
+        tools.limits.enable_collection_counts()
+
+        signals.endpoint_timed.connect(tools.slow_requests.capture)
+        app.after_request(tools.slow_requests.log_response)
+
     @app.after_request
     def after_request(resp):  # pylint: disable=unused-variable
         """If there is anything that api should do before ending request, add
@@ -214,6 +251,12 @@ def _register_routes(app):
         if settings.ROUTING_ADD_SHUTDOWN_ROUTE:
             routes.blueprint.add_route(routes.ShutDown)
 
+        if settings.ROUTING_ADD_OPENAPI_ROUTE:
+            routes.blueprint.add_route(routes.OpenApi)
+
+        if settings.ROUTING_ADD_METRICS:
+            routes.blueprint.add_route(routes.Metrics)
+
         common_blueprints.append(routes.blueprint)
 
     if common_blueprints:
@@ -223,5 +266,14 @@ def _register_routes(app):
     # exception
     routing.lock()
 
+    if settings.ROUTING_DISPATCHER:
+        app.url_map.converters[router.VERSION_ARGUMENT] = \
+            router.VersionConverter
+
+        for rule, name, dispatcher, methods in routing.get_dispatchers():
+            app.add_url_rule(rule, name, dispatcher, methods=methods)
+
+        return
+
     for (blueprint, url_prefix) in routing.get_normalised_blueprints():
         app.register_blueprint(blueprint, url_prefix=url_prefix)
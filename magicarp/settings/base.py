@@ -16,6 +16,19 @@ SECRET_KEY = None
 
 ROUTING_ADD_COMMON = True
 ROUTING_ADD_SHUTDOWN_ROUTE = False
+ROUTING_ADD_OPENAPI_ROUTE = False
+
+# if True, metrics of requests are recorded and served (route /metrics/) in
+# text format of Prometheus, with METRICS_DIRECTORY (writable directory) they
+# are shared by all processes of the server, ie. pre-forked workers, see
+# magicarp.tools.metrics
+ROUTING_ADD_METRICS = False
+METRICS_DIRECTORY = None
+
+# if True, every path is registered once and version of request is resolved
+# by dispatcher (the latest version that is lower or equal to requested one),
+# instead of registering every endpoint for every version it is inherited by
+ROUTING_DISPATCHER = False
 
 # if you have one backend for multiple api's, change namespace to avoid user
 # session collision
@@ -49,11 +62,21 @@ LOGGING = {
             'level': 'INFO',
             'formatter': 'standard',
         },
+        # records are written to console by listener in own thread, see
+        # SLOW_REQUEST_THRESHOLD
+        'slow_requests': {
+            'class': 'magicarp.tools.slow_requests.QueueHandler',
+            'target_handlers': ['cfg://handlers.console'],
+        },
     },
     'loggers': {
         'magicarp': {
             'handlers': ['console'],
         },
+        'magicarp.slow_requests': {
+            'handlers': ['slow_requests'],
+            'propagate': False,
+        },
     },
     'root': {
         'level': 'DEBUG',
@@ -77,6 +100,105 @@ LOGGING_ADDITIONAL_LOGGERS = (
     'app.logger',
 )
 
+# if payload contains keys that are not defined on input schema, reject it with
+# PayloadError
+EXCEPTION_ON_UNRECOGNISED_INPUT = True
+
+# if True, populated leaf fields of schemas and elements of collections are
+# stored as compact nodes (magicarp.schema.compact.FieldValue) that refer to
+# definition of the field instead of being full copies of it, it can be
+# overridden per schema or collection with attribute compact_values
+SCHEMA_COMPACT_VALUES = False
+
+# if True, schemas are populated (and validated) by code generated for each of
+# them (see magicarp.schema.codegen), it can be overridden per schema with
+# attribute codegen
+SCHEMA_CODEGEN = False
+
+# limits of incoming payloads (see magicarp.tools.limits), every endpoint can
+# override them with attributes of the same name (lowercase, without prefix
+# PAYLOAD_), 0 or None disables the limit
+PAYLOAD_MAX_BODY_BYTES = 10 * 1024 * 1024
+PAYLOAD_MAX_DEPTH = 32
+PAYLOAD_MAX_KEYS = 100000
+PAYLOAD_MAX_COLLECTION_ELEMENTS = 100000
+
+# decoder of JSON payloads, name of decoder registered in
+# magicarp.tools.serializers (ie. 'json', 'orjson', 'ujson'), None means the
+# fastest one that is installed, every endpoint can override it with
+# attribute json_decoder
+JSON_DECODER = None
+
+# encoder of JSON responses (envelopes), name of encoder registered in
+# magicarp.tools.serializers (ie. 'json', 'orjson'), None means flask's
+# encoder, envelope can override it with argument encoder, note: orjson is
+# much faster, but it encodes NaN and infinity as null (flask as NaN and
+# Infinity) and integers above 64 bits are left to flask's encoder
+JSON_ENCODER = None
+
+# media types of binary formats (see magicarp.tools.serializers) offered to
+# clients (header Accept) and accepted as request bodies, ie.
+# ['application/msgpack'], None means all of them that are installed, empty
+# list disables binary formats, endpoints and envelopes can override it with
+# attribute (argument) binary_formats
+BINARY_FORMATS = None
+
+# compression of responses (opt-in, see magicarp.tools.compression), content
+# codings in order of preference (None means zstd, br and gzip, those that
+# are installed), levels by coding (missing ones use defaults of magicarp),
+# responses smaller than COMPRESSION_MIN_SIZE (bytes) are not compressed and
+# neither are media types other than JSON, text and COMPRESSION_MIMETYPES,
+# endpoints can opt-out with attribute compress
+COMPRESSION = False
+COMPRESSION_CODINGS = None
+COMPRESSION_LEVELS = {}
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_MIMETYPES = [
+    'application/msgpack',
+    'application/cbor',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'image/vnd.microsoft.icon',
+]
+
+# if False, caches of responses (attribute cache of endpoints, see
+# magicarp.tools.cache) are bypassed
+RESPONSE_CACHE = True
+
+# file that invalidations of tags of cached responses are appended to, it's
+# read by every process on the host (see magicarp.tools.invalidation), None
+# means invalidations are known only to process that made them
+CACHE_INVALIDATION_LOG = None
+
+# if False, coalescing of identical concurrent requests (attribute coalesce of
+# endpoints, see magicarp.tools.coalescing) is bypassed
+REQUEST_COALESCING = True
+
+# if True, phases of requests handled by endpoints are timed and recorded
+# into histograms (see magicarp.tools.timing), it's turned on by create_app
+# anyway if ROUTING_ADD_METRICS or SLOW_REQUEST_THRESHOLD is set
+ENDPOINT_TIMING = False
+
+# if True, request with header PROFILING_HEADER equal to PROFILING_SECRET (has
+# to be set) is profiled with cProfile (or pyinstrument if PROFILING_SAMPLER
+# and it's installed), report (PROFILING_LIMIT entries sorted by
+# PROFILING_SORT) is sent instead of response or saved in PROFILING_DIRECTORY
+# by name of endpoint, see magicarp.tools.profiling
+PROFILING = False
+PROFILING_SECRET = None
+PROFILING_HEADER = 'X-Magicarp-Profile'
+PROFILING_DIRECTORY = None
+PROFILING_SAMPLER = False
+PROFILING_SORT = 'cumulative'
+PROFILING_LIMIT = 50
+
+# if set (seconds), requests handled by endpoints that took at least that long
+# are logged (logger magicarp.slow_requests) with sizes of payload and
+# response, numbers of elements of collections of payload and timings of
+# phases (timing is turned on), see magicarp.tools.slow_requests
+SLOW_REQUEST_THRESHOLD = None
+
 FLASK_SERVER_HOST = '0.0.0.0'
 FLASK_SERVER_PORT = 5000
 
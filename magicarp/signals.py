@@ -3,3 +3,11 @@ from flask import signals
 namespace = signals.Namespace()
 
 app_shutdown = namespace.signal('app_shutdown')
+
+# sent with tags (keyword argument tags) that are no longer valid, cached
+# responses tagged with any of them are dropped (see tools.invalidation)
+cache_invalidated = namespace.signal('cache_invalidated')
+
+# sent by endpoint (sender) once request is handled, with name of endpoint,
+# version and timings (seconds by phase, see tools.timing)
+endpoint_timed = namespace.signal('endpoint_timed')
@@ -8,8 +8,17 @@ be separated to own namespace.
 """
 
 # first import all the modules that do not have any other dependency
-from . import datetime_helpers, api_request, auth_model  # NOQA
+from . import datetime_helpers, api_request, auth_model, limits  # NOQA
 
 # then all others that are actually dependening on other modules
 from . import helpers  # NOQA
+from . import timing  # NOQA
+from . import serializers  # NOQA
+from . import compression  # NOQA
+from . import invalidation  # NOQA
+from . import cache  # NOQA
+from . import coalescing  # NOQA
+from . import metrics  # NOQA
+from . import profiling  # NOQA
+from . import slow_requests  # NOQA
 from . import validators  # NOQA
@@ -1,16 +1,46 @@
+import collections
+import functools
+
 import url2vapi
 
 from flask import Request
+from werkzeug.utils import cached_property
+
+# version is the first segment of the path and there are only a few of them,
+# so results of parsing are remembered by that segment
+PREFIX_CACHE_SIZE = 256
+
+VersionedPath = collections.namedtuple(
+    'VersionedPath', ('version', 'remainder'))
+
+
+@functools.lru_cache(maxsize=PREFIX_CACHE_SIZE)
+def _parse_prefix(prefix):
+    return url2vapi.split(prefix + '/', pattern="<version:double>").version
+
+
+def parse_path(path):
+    """Splits path into version (None if path is not versioned) and the rest
+    of the path, ie. '/1.0/users/' into version 1.0 and '/users/'.
+    """
+    segment, _, remainder = path[1:].partition('/')
+
+    version = _parse_prefix('/' + segment)
+
+    if version is None:
+        return VersionedPath(None, path)
+
+    return VersionedPath(version, '/' + remainder)
 
 
 class ApiRequest(Request):
     '''Extended flask request, notable change: it is version aware.
-    '''
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
 
-        self.api_request = url2vapi.split(
-            self.url, pattern="<version:double>")
+    Version is parsed from path (not from the whole url) on first access.
+    '''
+    @cached_property
+    def api_request(self):
+        return parse_path(self.path)
 
     @property
     def version(self):
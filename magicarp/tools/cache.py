@@ -0,0 +1,372 @@
+"""Cache of responses of endpoints.
+
+Endpoint opts in with attribute cache, ie.
+
+    class Products(endpoint.BaseEndpoint):
+        cache = tools.cache.ResponseCache(ttl=300, vary_headers=['Accept'])
+
+then responses of GET (and HEAD) requests are kept as final bytes (after
+envelope) by key made of version of api, url rule, arguments of url and
+normalised payload (plus values of headers and user the response varies on),
+cached response skips action, parse_output and envelope. Responses carry
+strong ETag, If-None-Match is answered with 304.
+
+Entries live in process (LocalBackend, LRU with at most max_entries), unless
+cache is given other backend, ie. RedisBackend that is shared by processes.
+
+Entries can be tagged (argument tags), entry is dropped once any of its tags
+is invalidated (see tools.invalidation), RedisBackend keeps times of
+invalidations as well, so they reach every host.
+"""
+import collections
+import hashlib
+import json
+import threading
+import time
+
+from flask import current_app, request
+from simple_settings import settings
+from werkzeug.http import generate_etag
+
+from magicarp.tools import compression, invalidation, serializers
+
+# cached response, headers are a list of (name, value) pairs, created is time
+# (time.time) its making started at
+CachedResponse = collections.namedtuple(
+    'CachedResponse', ('status', 'headers', 'body', 'etag', 'tags', 'created'))
+
+
+def dump_entry(entry):
+    """Serializes entry into bytes, for backends that keep bytes only.
+    """
+    head = json.dumps([
+        entry.status, entry.headers, entry.etag, entry.tags, entry.created])
+
+    return head.encode('utf-8') + b'\n' + entry.body
+
+
+def load_entry(data):
+    head, body = data.split(b'\n', 1)
+
+    status, headers, etag, tags, created = json.loads(head.decode('utf-8'))
+
+    return CachedResponse(
+        status, [tuple(header) for header in headers], body, etag, tags,
+        created)
+
+
+class BaseBackend(object):
+    """Storage of cached responses, backend has to be safe to use from many
+    threads.
+    """
+    def get(self, key):
+        """Returns CachedResponse or None if it's missing or expired.
+        """
+        raise NotImplementedError
+
+    def set(self, key, entry, ttl):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def invalidate(self, tags, when, ttl):
+        """Remembers for ttl seconds that tags were invalidated at when, only
+        backends shared by hosts need to (processes of one host share
+        tools.invalidation).
+        """
+        pass
+
+    def get_invalidated(self, tags):
+        """Returns the last time any of tags was invalidated at (as
+        remembered by invalidate), 0 if none was.
+        """
+        return 0
+
+
+class LocalBackend(BaseBackend):
+    """In-process backend, least recently used entries are dropped once there
+    are more than max_entries of them.
+    """
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+
+            if item is None:
+                return None
+
+            expires, entry = item
+
+            if expires < time.monotonic():
+                del self.entries[key]
+
+                return None
+
+            self.entries.move_to_end(key)
+
+            return entry
+
+    def set(self, key, entry, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, entry)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class RedisBackend(BaseBackend):
+    """Backend shared by processes (and hosts), client is redis.Redis (or
+    anything with the same get, set, delete and scan_iter).
+    """
+    def __init__(self, client, prefix='magicarp:cache:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+
+        return None if data is None else load_entry(data)
+
+    def set(self, key, entry, ttl):
+        self.client.set(
+            self.prefix + key, dump_entry(entry), ex=max(int(ttl), 1))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+    def invalidate(self, tags, when, ttl):
+        for tag in tags:
+            self.client.set(
+                self.prefix + 'tag:' + tag, repr(when), ex=max(int(ttl), 1))
+
+    def get_invalidated(self, tags):
+        invalidated = 0
+
+        for tag in tags:
+            data = self.client.get(self.prefix + 'tag:' + tag)
+
+            if data is not None:
+                invalidated = max(invalidated, float(data))
+
+        return invalidated
+
+
+def _normalise(value):
+    # payload is JSON-like, keys are sorted so order does not matter
+    return json.dumps(
+        value, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def make_key(endpoint, payload, arguments, vary_headers=(), vary_user=False):
+    """Key of current request: version of api, url rule, arguments of url and
+    payload (normalised by input schema of endpoint, if it has one), together
+    with values of everything response varies on (headers, user, binary
+    format negotiated by envelope of endpoint).
+    """
+    parts = [
+        getattr(request, 'version', None),
+        request.url_rule.rule if request.url_rule else request.path,
+        arguments,
+        payload,
+        [request.headers.get(name) for name in vary_headers],
+    ]
+
+    if vary_user:
+        parts.append(getattr(getattr(request, 'user', None), 'uid', None))
+
+    envelope = getattr(endpoint, 'envelope', None)
+
+    if getattr(envelope, 'negotiate', False):
+        parts.append(serializers.negotiate(
+            request.accept_mimetypes, envelope.binary_formats))
+
+    return hashlib.sha1(_normalise(parts).encode('utf-8')).hexdigest()
+
+
+# headers that belong to single response rather than to its entry (response
+# entry was made of keeps them)
+_SKIPPED_HEADERS = frozenset(['Content-Length', 'ETag', 'Set-Cookie'])
+
+
+def make_entry(result, tags=(), created=None):
+    """Returns CachedResponse of result of endpoint (anything flask can turn
+    into response), tagged with tags, created is the time its making started
+    at (so invalidation that happened meanwhile makes it stale).
+    """
+    response = current_app.make_response(result)
+
+    # body is kept in memory anyway
+    response.direct_passthrough = False
+
+    body = response.get_data()
+
+    return CachedResponse(
+        response.status_code,
+        [(name, value) for name, value in response.headers
+         if name not in _SKIPPED_HEADERS],
+        body, generate_etag(body), list(tags),
+        time.time() if created is None else created)
+
+
+def make_response(entry, conditional=False, vary_headers=(), response=None):
+    """Returns new response of entry (or response it was made of, if given),
+    if conditional it carries ETag of entry and is 304 if client has it
+    already (If-None-Match).
+    """
+    if response is None:
+        response = current_app.response_class(
+            entry.body, status=entry.status, headers=entry.headers)
+
+    for name in vary_headers:
+        response.vary.add(name)
+
+    if not conditional:
+        return response
+
+    response.set_etag(entry.etag)
+
+    etag = _matching_etag(entry.etag)
+
+    if etag is not None:
+        response.set_etag(etag)
+        response.status_code = 304
+        response.set_data(b'')
+
+    return response
+
+
+class ResponseCache(object):
+    """Settings of cache of single endpoint, arguments:
+
+        ttl :: seconds entry is fresh for
+
+        max_entries :: limit of entries of in-process backend
+
+        vary_headers :: names of headers response depends on (on top of
+            Accept, if envelope of endpoint negotiates binary formats)
+
+        vary_user :: if True, every user has own entries (uid of
+            request.user)
+
+        backend :: BaseBackend, None means in-process LocalBackend
+
+        tags :: templates of tags of entries, ie. 'user:{uid}', formatted
+            with arguments of url and payload
+    """
+    def __init__(  # pylint: disable=too-many-arguments
+            self, ttl=60, max_entries=1024, vary_headers=(), vary_user=False,
+            backend=None, tags=()):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.vary_headers = tuple(vary_headers)
+        self.vary_user = vary_user
+        self.backend = backend
+        self.tags = tuple(tags)
+
+        self.lock = threading.Lock()
+
+        invalidation.retain(ttl)
+
+        if backend is not None:
+            invalidation.share(backend)
+
+    def get_backend(self):
+        if self.backend is None:
+            with self.lock:
+                if self.backend is None:
+                    self.backend = LocalBackend(self.max_entries)
+
+        return self.backend
+
+    def is_active(self):
+        return settings.RESPONSE_CACHE and request.method in ('GET', 'HEAD')
+
+    def make_key(self, endpoint, payload, arguments):
+        return make_key(
+            endpoint, payload, arguments, self.vary_headers, self.vary_user)
+
+    def make_tags(self, payload, arguments):
+        return invalidation.format_tags(self.tags, payload, arguments)
+
+    def lookup(self, key):
+        """Returns response for cached entry (304 if client has it already)
+        or None.
+        """
+        backend = self.get_backend()
+
+        entry = backend.get(key)
+
+        if entry is None:
+            return None
+
+        if self.is_stale(backend, entry):
+            backend.delete(key)
+
+            return None
+
+        return self.make_response(entry)
+
+    def is_stale(self, backend, entry):
+        if not entry.tags:
+            return False
+
+        return invalidation.get_log().is_stale(entry.tags, entry.created) or \
+            backend.get_invalidated(entry.tags) >= entry.created
+
+    def store(self, key, entry):
+        """Stores entry (see make_entry) if it's 200 and none of its tags was
+        invalidated while it was made (so it's not kept longer than
+        invalidations are remembered).
+        """
+        if entry.status != 200:
+            return
+
+        backend = self.get_backend()
+
+        if not self.is_stale(backend, entry):
+            backend.set(key, entry, self.ttl)
+
+    def make_response(self, entry, response=None):
+        return make_response(entry, True, self.vary_headers, response)
+
+
+def _matching_etag(etag):
+    """Returns ETag client has (If-None-Match), representation might have
+    been compressed, so its ETag has suffix of content coding.
+    """
+    if_none_match = request.if_none_match
+
+    if not if_none_match:
+        return None
+
+    if if_none_match.star_tag or if_none_match.contains(etag):
+        return etag
+
+    for coding in compression.CODINGS:
+        candidate = '{}-{}'.format(etag, coding)
+
+        if if_none_match.contains(candidate):
+            return candidate
+
+    return None
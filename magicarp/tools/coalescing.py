@@ -0,0 +1,167 @@
+"""Coalescing of identical concurrent requests (single-flight).
+
+Endpoint opts in with attribute coalesce, ie.
+
+    class Products(endpoint.BaseEndpoint):
+        coalesce = tools.coalescing.SingleFlight()
+
+then GET (and HEAD) requests with the same key (made the same way as key of
+cache, see tools.cache.make_key, endpoint that is cached uses key of its
+cache) that come while the first of them is being handled wait for it, its
+response is shared by all of them, so action runs once. Exception is shared
+as well, every request that waited raises own copy of it (traceback of
+exception is set by every raise, so one instance can't be raised by many
+threads at once).
+
+Waiting is done with primitives of module threading, so it works for threaded
+workers and for async ones (gevent, eventlet) once threading is monkey
+patched.
+
+Counters (see get_metrics) tell how many requests of each endpoint were
+executed, coalesced (served by response of other request) and how many gave
+up waiting (timeout) and were executed on their own.
+"""
+import collections
+import threading
+
+from flask import request
+from simple_settings import settings
+
+from magicarp import exceptions
+from magicarp.tools import cache
+
+_metrics = collections.defaultdict(collections.Counter)
+_metrics_lock = threading.Lock()
+
+
+def _count(name, kind):
+    with _metrics_lock:
+        _metrics[name][kind] += 1
+
+
+def get_metrics():
+    """Returns counters by name of endpoint (flask's, request.endpoint), ie.
+
+        {'v1.products': {'executed': 3, 'coalesced': 40, 'timeouts': 0}}
+    """
+    with _metrics_lock:
+        return {
+            name: {
+                kind: counter[kind]
+                for kind in ('executed', 'coalesced', 'timeouts')
+            } for name, counter in _metrics.items()
+        }
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def _copy_error(error):
+    """Returns copy of exception (without traceback, __init__ is skipped as
+    its arguments might not be known), exception that can't be copied is
+    wrapped in CoalescedRequestError.
+    """
+    error_cls = error.__class__
+
+    try:
+        copied = error_cls.__new__(error_cls, *error.args)
+        copied.args = error.args
+        copied.__dict__.update(error.__dict__)
+    except Exception:  # pylint: disable=broad-except
+        copied = exceptions.CoalescedRequestError(
+            "Coalesced request failed: {!r}".format(error))
+        copied.__cause__ = error
+
+    return copied
+
+
+class _Flight(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Settings of coalescing of single endpoint, arguments:
+
+        vary_headers :: names of headers response depends on
+
+        vary_user :: if True (default), requests of different users are never
+            coalesced
+
+        timeout :: seconds request waits for response of other request, then
+            it's handled on its own, None means no limit
+    """
+    def __init__(self, vary_headers=(), vary_user=True, timeout=30):
+        self.vary_headers = tuple(vary_headers)
+        self.vary_user = vary_user
+        self.timeout = timeout
+
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    def is_active(self):  # pylint: disable=no-self-use
+        return settings.REQUEST_COALESCING and \
+            request.method in ('GET', 'HEAD')
+
+    def make_key(self, endpoint, payload, arguments):
+        return cache.make_key(
+            endpoint, payload, arguments, self.vary_headers, self.vary_user)
+
+    def run(self, key, func):
+        """Returns result of func, it's called once for all concurrent calls
+        with the same key.
+        """
+        name = request.endpoint
+
+        with self.lock:
+            flight = self.flights.get(key)
+
+            leader = flight is None
+
+            if leader:
+                flight = self.flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+
+        if not leader:
+            if flight.done.wait(self.timeout):
+                _count(name, 'coalesced')
+
+                if flight.error is not None:
+                    raise _copy_error(flight.error)
+
+                return flight.result
+
+            _count(name, 'timeouts')
+
+            return func()
+
+        _count(name, 'executed')
+
+        result = error = None
+
+        try:
+            result = func()
+        except Exception as err:
+            error = err
+
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+
+            # nobody joins flight once it's removed, result (or error, that
+            # holds frames of this request) is handed over only if there are
+            # requests waiting for it
+            if flight.waiters:
+                flight.result = result
+                flight.error = error
+
+                flight.done.set()
+
+        return result
@@ -0,0 +1,169 @@
+"""Compression of responses, negotiated by header Accept-Encoding.
+
+gzip is always available, brotli (br) and zstandard (zstd) if their libraries
+are installed, when client accepts more of them, server prefers zstd, br and
+gzip in that order (see setting COMPRESSION_CODINGS). Responses smaller than
+COMPRESSION_MIN_SIZE and media types that do not compress well are sent as
+they are, so are responses of endpoints with attribute compress set to False.
+
+Responses of endpoints that are static (attribute static_response) are
+compressed once, compressed body is reused as long as the body is the same.
+"""
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from flask import request
+from simple_settings import settings
+
+from magicarp.tools import helpers, serializers
+
+
+def _compress_gzip(data, level):
+    # wbits 31 stands for gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    return compressor.compress(data) + compressor.flush()
+
+
+def _compress_brotli(data, level):
+    return brotli.compress(data, quality=level)
+
+
+def _compress_zstd(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+# compressors by content coding, each of them takes data (bytes) and level
+CODINGS = {
+    'gzip': _compress_gzip,
+}
+
+if brotli is not None:
+    CODINGS['br'] = _compress_brotli
+
+if zstandard is not None:
+    CODINGS['zstd'] = _compress_zstd
+
+# if codings are not configured, server prefers them in this order
+_PREFERRED_CODINGS = ('zstd', 'br', 'gzip')
+
+# levels that are used if setting COMPRESSION_LEVELS does not mention coding
+_DEFAULT_LEVELS = {
+    'gzip': 6,
+    'br': 4,
+    'zstd': 3,
+}
+
+# compressed bodies of static responses by endpoint, coding and level, each of
+# them as (body, compressed body)
+_static = {}
+
+
+def register_coding(name, compressor, level=None):
+    """Makes content coding available under given name (as it appears in
+    Accept-Encoding), compressor is a callable that takes data and level.
+    Coding is the least preferred one, unless COMPRESSION_CODINGS says
+    otherwise.
+    """
+    CODINGS[name] = compressor
+    _DEFAULT_LEVELS[name] = level
+
+
+def get_codings():
+    """Returns available content codings in order of preference of server.
+    """
+    codings = settings.COMPRESSION_CODINGS
+
+    if codings is None:
+        codings = list(_PREFERRED_CODINGS) + sorted(
+            set(CODINGS) - set(_PREFERRED_CODINGS))
+
+    return [coding for coding in codings if coding in CODINGS]
+
+
+def get_level(coding):
+    return settings.COMPRESSION_LEVELS.get(
+        coding, _DEFAULT_LEVELS.get(coding))
+
+
+def negotiate(accept):
+    """Returns content coding that client accepts (accept is werkzeug's
+    Accept, ie. request.accept_encodings) and server prefers, or None.
+    """
+    if not accept:
+        return None
+
+    return accept.best_match(get_codings())
+
+
+def compress(data, coding, level=None):
+    return CODINGS[coding](data, get_level(coding) if level is None else level)
+
+
+def is_compressible(mimetype):
+    return mimetype in settings.COMPRESSION_MIMETYPES or \
+        mimetype.startswith('text/') or serializers.is_json(mimetype)
+
+
+def compress_response(response):
+    """Compresses body of response if it's worth it and client accepts any of
+    available codings, meant to be used as after_request hook.
+    """
+    if not settings.COMPRESSION or response.direct_passthrough or \
+            response.is_streamed or response.status_code < 200 or \
+            response.status_code in (204, 304) or \
+            'Content-Encoding' in response.headers or \
+            not is_compressible(response.mimetype or ''):
+        return response
+
+    endpoint = helpers.get_endpoint()
+
+    if not getattr(endpoint, 'compress', True):
+        return response
+
+    data = response.get_data()
+
+    if len(data) < settings.COMPRESSION_MIN_SIZE:
+        return response
+
+    # response depends on Accept-Encoding from now on
+    response.vary.add('Accept-Encoding')
+
+    coding = negotiate(request.accept_encodings)
+
+    if coding is None:
+        return response
+
+    level = get_level(coding)
+
+    if getattr(endpoint, 'static_response', False):
+        key = (request.endpoint, coding, level)
+
+        cached = _static.get(key)
+
+        if cached is None or cached[0] != data:
+            cached = _static[key] = (data, compress(data, coding, level))
+
+        compressed = cached[1]
+    else:
+        compressed = compress(data, coding, level)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = coding
+
+    # representations differ, so should their strong validators
+    etag, weak = response.get_etag()
+
+    if etag and not weak:
+        response.set_etag('{}-{}'.format(etag, coding))
+
+    return response
@@ -1,4 +1,5 @@
 import datetime
+import functools
 import re
 
 import pytz
@@ -28,13 +29,115 @@ def add_timezone(date_obj, timezone):
     """Changes timezone to already non-naive dateobject (basically moves by
     offset as needed)
     """
-    zone = pytz.timezone(timezone)
+    zone = get_timezone(timezone)
 
     date_obj = date_obj.astimezone(zone)
 
     return date_obj
 
 
+@functools.lru_cache(maxsize=64)
+def get_timezone(timezone):
+    """Same as pytz.timezone, but lookup is done only once per name.
+    """
+    return pytz.timezone(timezone)
+
+
+# strict RFC 3339 (profile of ISO 8601), fallback for interpreters without
+# datetime.fromisoformat (or one that does not understand 'Z' suffix)
+_RFC_3339 = re.compile(
+    r'^(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})'
+    r'(?:[Tt ](?P<hour>\d{2}):(?P<minute>\d{2}):(?P<second>\d{2})'
+    r'(?:\.(?P<fraction>\d+))?'
+    r'(?P<zone>[Zz]|'
+    r'(?P<sign>[+-])(?P<zone_hour>\d{2}):(?P<zone_minute>\d{2}))?'
+    r')?$'
+)
+
+_from_iso_format = getattr(datetime.datetime, 'fromisoformat', None)
+
+# how many distinct strings are remembered by parse_into_datetime and
+# parse_into_date
+PARSE_CACHE_SIZE = 4096
+
+
+def _parse_rfc_3339(value):
+    match = _RFC_3339.match(value)
+
+    if match is None:
+        return None
+
+    parts = match.groupdict()
+
+    zone = None
+
+    if parts['zone'] in ('Z', 'z'):
+        zone = datetime.timezone.utc
+    elif parts['zone']:
+        offset = datetime.timedelta(
+            hours=int(parts['zone_hour']), minutes=int(parts['zone_minute']))
+
+        zone = datetime.timezone(-offset if parts['sign'] == '-' else offset)
+
+    fraction = parts['fraction'] or '0'
+
+    return datetime.datetime(
+        int(parts['year']), int(parts['month']), int(parts['day']),
+        int(parts['hour'] or 0), int(parts['minute'] or 0),
+        int(parts['second'] or 0), int(fraction[:6].ljust(6, '0')),
+        tzinfo=zone)
+
+
+def _parse_string(value):
+    """Tiered parsing, cheap strict parsers first, dateutil (that understands
+    almost anything) as the last resort.
+    """
+    if _from_iso_format is not None:
+        try:
+            return _from_iso_format(value)
+        except ValueError:
+            pass
+
+    try:
+        date_obj = _parse_rfc_3339(value)
+    except ValueError:
+        # ie. month 13, let dateutil have a go at it (and complain)
+        date_obj = None
+
+    if date_obj is not None:
+        return date_obj
+
+    return date_parser.parse(value)
+
+
+# today is part of the key, dateutil fills missing parts of the date with
+# current date, so ie. '10:00' cannot be remembered forever
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_datetime_string(value, timezone, today):
+    # pylint: disable=unused-argument
+    date_obj = _parse_string(value)
+
+    if date_obj.tzinfo is None:
+        date_obj = add_timezone(date_obj.replace(tzinfo=pytz.utc), timezone)
+
+    return date_obj
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_date_string(value, today):
+    # pylint: disable=unused-argument
+    date_obj = _parse_string(value)
+
+    return datetime.date(date_obj.year, date_obj.month, date_obj.day)
+
+
+def clear_cache():
+    """Forgets all of remembered results of parsing.
+    """
+    _parse_datetime_string.cache_clear()
+    _parse_date_string.cache_clear()
+
+
 def parse_into_datetime(value):
     '''Parse a string or datetime object into a datetime
     '''
@@ -42,15 +145,21 @@ def parse_into_datetime(value):
         raise ValueError(
             "Object needs to be non-empty in order to parse it as a datetime")
 
-    value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            return value
 
-    date_obj = date_parser.parse(value)
+        return add_timezone(
+            value.replace(tzinfo=pytz.utc), settings.DEFAULT_TIMEZONE)
 
-    if date_obj.tzinfo is None:
-        date_obj = add_timezone(
-            date_obj.replace(tzinfo=pytz.utc), settings.DEFAULT_TIMEZONE)
+    if isinstance(value, datetime.date):
+        return add_timezone(
+            datetime.datetime(
+                value.year, value.month, value.day, tzinfo=pytz.utc),
+            settings.DEFAULT_TIMEZONE)
 
-    return date_obj
+    return _parse_datetime_string(
+        str(value), settings.DEFAULT_TIMEZONE, datetime.date.today())
 
 
 def parse_into_date(value):
@@ -60,11 +169,51 @@ def parse_into_date(value):
         raise ValueError(
             "Object needs to be non-empty in order to parse it as a date")
 
-    value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+    # datetime is a date as well
+    if isinstance(value, datetime.date):
+        return datetime.date(value.year, value.month, value.day)
+
+    return _parse_date_string(str(value), datetime.date.today())
+
+
+_TIME_WITH_COLONS = re.compile(
+    r'^(?P<hours>\d{2})'
+    r'(:(?P<minutes>\d{2}))'
+    r'(:(?P<seconds>\d{2}))?'
+    r'(:(?P<milliseconds>\d{2}))?$'
+)
 
-    date_obj = date_parser.parse(str(value))
+_TIME_VERBOSE = re.compile(
+    r'((?=.*?(?P<minutes>\d+)\s*(m(\s|\d|:|$)+|minute(s)*)))?'
+    r'((?=.*?(?P<milliseconds>\d+)\s*(ms(\s|\d|:|$)+|millisecond(s)*)))?'
+    r'((?=.*?(?P<hours>\d+)\s*(h(\s|\d|:|$)+|hour(s)*)))?'
+    r'((?=.*?(?P<seconds>\d+)\s*(s(\s|\d|:|$)+|second(s)*)))?'
+)
+
+
+def _parse_time_with_colons(value):
+    """Fast path for strict HH:MM[:SS[:MS]], returns None if value has any
+    other form.
+    """
+    parts = value.split(':')
 
-    return datetime.date(*date_obj.timetuple()[:3])
+    if not 2 <= len(parts) <= 4:
+        return None
+
+    for part in parts:
+        if len(part) != 2 or not part.isdecimal():
+            return None
+
+    parts.extend(('0', ) * (4 - len(parts)))
+
+    return _make_timedelta(*parts)
+
+
+def _make_timedelta(hours, minutes, seconds, milliseconds):
+    # positional days, seconds and microseconds are much cheaper than keywords
+    return datetime.timedelta(
+        0, int(hours or 0) * 3600 + int(minutes or 0) * 60 + int(seconds or 0),
+        int(milliseconds or 0) * 1000)
 
 
 def parse_into_time(value):
@@ -75,42 +224,24 @@ def parse_into_time(value):
             "Object needs to be non-empty in order to parse it "
             "as a time object")
 
-    pattern_with_colons = (
-        r'^(?P<hours>\d{2})'
-        r'(:(?P<minutes>\d{2}))'
-        r'(:(?P<seconds>\d{2}))?'
-        r'(:(?P<milliseconds>\d{2}))?$'
-    )
-
-    pattern_verbose = (
-        r'((?=.*?(?P<minutes>\d+)\s*(m(\s|\d|:|$)+|minute(s)*)))?'
-        r'((?=.*?(?P<milliseconds>\d+)\s*(ms(\s|\d|:|$)+|millisecond(s)*)))?'
-        r'((?=.*?(?P<hours>\d+)\s*(h(\s|\d|:|$)+|hour(s)*)))?'
-        r'((?=.*?(?P<seconds>\d+)\s*(s(\s|\d|:|$)+|second(s)*)))?'
-    )
-
-    for pattern in [pattern_with_colons, pattern_verbose]:
-        regexp = re.search(pattern, value)
+    if isinstance(value, datetime.timedelta):
+        return value
 
-        if regexp:
-            break
-
-    if not regexp:
+    # both tiers work on strings only
+    if not isinstance(value, str):
         raise exceptions.PayloadError(
             "Unable to recognise time value, got: {}".format(value))
 
-    dct = {}
-
-    if regexp.group('hours'):
-        dct['hours'] = int(regexp.group('hours'))
+    time_obj = _parse_time_with_colons(value)
 
-    if regexp.group('minutes'):
-        dct['minutes'] = int(regexp.group('minutes'))
+    if time_obj is not None:
+        return time_obj
 
-    if regexp.group('seconds'):
-        dct['seconds'] = int(regexp.group('seconds'))
+    regexp = _TIME_WITH_COLONS.search(value) or _TIME_VERBOSE.search(value)
 
-    if regexp.group('milliseconds'):
-        dct['milliseconds'] = int(regexp.group('milliseconds'))
+    if not regexp:
+        raise exceptions.PayloadError(
+            "Unable to recognise time value, got: {}".format(value))
 
-    return datetime.timedelta(**dct)
+    return _make_timedelta(
+        *regexp.group('hours', 'minutes', 'seconds', 'milliseconds'))
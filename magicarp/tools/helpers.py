@@ -1,3 +1,4 @@
+import functools
 import re
 
 from flask import json, current_app, request
@@ -17,6 +18,23 @@ class JsonEncoder(json.JSONEncoder):
             return super().default(obj)
 
 
+def get_endpoint():
+    """Returns endpoint (view) that handles current request, None if no url
+    rule matched.
+    """
+    # proxy is resolved once, it's used on every request
+    current = request._get_current_object()  # pylint: disable=protected-access
+
+    # set by dispatcher of versions (ROUTING_DISPATCHER)
+    if getattr(current, 'api_endpoint', None) is not None:
+        return current.api_endpoint
+
+    if current.endpoint is None:
+        return None
+
+    return current_app.view_functions.get(current.endpoint)
+
+
 def generate_session_key(uid):
     """Generate unique session_key per user, per api instance.
 
@@ -27,157 +45,158 @@ def generate_session_key(uid):
         session_namespace=settings.SESSION_NAMESPACE, uid=uid)
 
 
-def _add_key(key):
-    line = []
-    pattern = r'(\w+)\[(\d)*\]'
+# name of the key, optionally followed by an index (ie. user[12]) or empty
+# brackets (legacy append, ie. user[])
+_KEY_BIT = re.compile(r'(\w+)\[(\d*)\]')
 
-    match = re.match(pattern, key)
+# index used in tokens for legacy append (empty brackets)
+_APPEND = -1
 
-    key, idx = match.groups() if match else (key, 'NoMatch')
 
-    line.append(key)
+@functools.lru_cache(maxsize=4096)
+def _tokenise_key(key):
+    """Splits key of form-encoded payload into a path, ie. user[0].name
+    becomes ('user', 0, 'name') and user.name[] becomes ('user', 'name', -1).
 
-    if idx != 'NoMatch':
-        line.append(-1 if idx is None else int(idx))
-
-    return line
-
-
-def _flatten_payload(payload):
-    flat_tree = []
-
-    for key, value in payload.lists():
-        line = []
-
-        if '.' in key and '[]' in key and not key.endswith('[]'):
+    Keys repeat from request to request, so tokens are remembered.
+    """
+    if '.' in key:
+        if '[]' in key and not key.endswith('[]'):
             raise exceptions.InvalidPayloadError(
                 'It is impossible to mix append with objects, '
                 'please use explicit index. '
                 'Instead of user[].name do user[1].name')
 
-        if '.' in key:
-            bits = key.split('.')
+        bits = key.split('.')
+
+        if '' in bits:
+            raise exceptions.InvalidPayloadError(
+                'Dot . is used to distinguish between object '
+                'and simple key, and has to be followed by '
+                'non-empty string. For example user.name means '
+                'object user with attribute name')
+    else:
+        bits = (key, )
 
-            for bit in bits:
-                if bit[-1] == '':
-                    raise exceptions.InvalidPayloadError(
-                        'Dot . is used to distinguish between object '
-                        'and simple key, and has to be followed by '
-                        'non-empty string. For example user.name means '
-                        'object user with attribute name')
+    tokens = []
 
-                line += _add_key(bit)
-        else:
-            line += _add_key(key)
+    for bit in bits:
+        match = _KEY_BIT.match(bit)
 
-        if line[-1] == 1:
-            for current_val in value:
-                flat_tree.append(
-                    (tuple(line), current_val))
+        if match is None:
+            tokens.append(bit)
         else:
-            flat_tree.append(
-                (tuple(line), value[0] if len(value) == 1 else value))
+            name, idx = match.groups()
 
-    # at this point all lists should be converted into flat list, if we sort
-    # them end effect will be safe to build a tree from
+            tokens.append(name)
+            tokens.append(int(idx) if idx else _APPEND)
 
-    try:
-        flat_tree.sort()
-    except TypeError:
-        raise exceptions.InvalidPayloadError(
-            'Unable to parse payload, looks like object is a mix of an array '
-            'and attributes. Ie. user.name=Dan&user[0].name=Stef')
+    return tuple(tokens)
 
-    return flat_tree
 
+class _Array(dict):
+    """Sparse list, indexes can come in any order (and with gaps), once whole
+    payload is decoded it becomes a list ordered by index.
+    """
+    __slots__ = ('next_index', )
 
-def _array_to_list(some_value):
-    if isinstance(some_value, Array):
-        return [
-            _array_to_list(sub_elm) for sub_elm in some_value.to_list()
-        ]
+    def __init__(self):
+        super().__init__()
 
-    elif isinstance(some_value, dict):
-        for key, value in some_value.items():
-            some_value[key] = _array_to_list(value)
+        self.next_index = 0
 
-    return some_value
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
 
+        if key >= self.next_index:
+            self.next_index = key + 1
 
-class Array(object):
-    def __init__(self):
-        self.container = {}
+    def append(self, value):
+        self[self.next_index] = value
 
-    def __setitem__(self, key, value):
-        if not isinstance(key, int):
-            raise ValueError("Only number can be used as an index of Array")
 
-        self.container[key] = value
+def _get_container(node, token, next_token):
+    container_type = _Array if isinstance(next_token, int) else dict
 
-    def __getitem__(self, key):
-        return self.container[key]
+    container = node.get(token)
 
-    def __contains__(self, key):
-        return key in self.container
+    if container is None and token not in node:
+        container = node[token] = container_type()
+    elif container.__class__ is list and container_type is _Array:
+        # repeated values of the same key (ie. b=1&b=2&b[]=3), array starts
+        # with them
+        values = container
+        container = node[token] = _Array()
 
-    def __len__(self):
-        return len(list(self.container.keys()))
+        for value in values:
+            container.append(value)
+    elif container.__class__ is not container_type:
+        if node.__class__ is not _Array or isinstance(container, dict):
+            _raise_conflict(container, container_type)
 
-    def get_last_key(self):
-        keys = list(self.container.keys())
-        keys.sort()
+        # explicit index replaces value of an array, as it does when it's a
+        # value itself (ie. b=8&b=5&b[1].c=0 ends up as ['8', {'c': '0'}])
+        container = node[token] = container_type()
 
-        return keys[-1] if keys else None
+    return container
 
-    def to_list(self):
-        keys = list(self.container.keys())
-        keys.sort()
 
-        result = [self.container[key] for key in keys]
+def _set_value(node, token, value):
+    if token == _APPEND:
+        for sub_value in value if isinstance(value, list) else (value, ):
+            node.append(sub_value)
 
-        return result
+        return
+
+    if isinstance(node.get(token), dict):
+        _raise_conflict(node[token], None)
+
+    node[token] = value
 
-    def append(self, value):
-        last_key = self.get_last_key()
 
-        key = 0 if last_key is None else last_key + 1
+def _raise_conflict(existing, container_type):
+    if isinstance(existing, dict) and container_type is not None:
+        raise exceptions.InvalidPayloadError(
+            'Unable to parse payload, looks like object is a mix of an array '
+            'and attributes. Ie. user.name=Dan&user[0].name=Stef')
 
-        self[key] = value
+    raise exceptions.InvalidPayloadError(
+        'Unable to parse payload, looks like key is used both as a value and '
+        'an object (or an array). Ie. user=Dan&user.name=Stef')
 
 
-def _build_tree(construct, structure, value):
-    # ie. we have:
-    # ('user', 0, 'address', 2) => 'e16'
-    # ('user', 0, 'address', 1) => 'w1'
+def _key_order(item):
+    # keys are ordered by number of indexes (explicit or appends) anywhere in
+    # them, so repeated values of a key (ie. user[0].tags=a&user[0].tags=b)
+    # start array before it's indexed (user[0].tags[1]=c), legacy append is
+    # always the last index of a key and goes before explicit indexes of the
+    # same depth, so they win over appended values
+    tokens, key, _ = item
 
-    # ('name',) => 'zbig'
+    if '[' not in key:
+        return 0, True
 
-    # ('user', 'name') => 'zbig'
-    # ('user', 'age') => '10'
+    indexes = 0
 
-    if len(structure) == 1:
-        if structure[0] == -1:
-            if isinstance(value, list):
-                for sub_val in value:
-                    construct.append(sub_val)
-            else:
-                construct.append(value)
-        else:
-            construct[structure[0]] = value
+    for token in tokens:
+        if token.__class__ is int:
+            indexes += 1
 
-    else:
-        if structure[0] not in construct:
-            next_construct = Array() if isinstance(structure[1], int) else {}
-        else:
-            next_construct = construct[structure[0]]
+    return indexes, tokens[-1] != _APPEND
 
-        construct[structure[0]] = _build_tree(
-            next_construct, structure[1:], value)
 
-    return construct
+def _to_primitives(value):
+    if isinstance(value, _Array):
+        return [_to_primitives(value[idx]) for idx in sorted(value)]
 
+    if isinstance(value, dict):
+        for key, sub_value in value.items():
+            value[key] = _to_primitives(sub_value)
 
-def to_json(payload):
+    return value
+
+
+def to_json(payload, limits=None):
     """Function converts any form-encoded payload (as served by flask's
     request.values) to dictionary using set of additional rules.
 
@@ -189,6 +208,14 @@ def to_json(payload):
         - if given value appears to be legacy array format, it's assumed it's a
           list:
             ie. name[]=john will end up as name: ['john']
+        - if given value appears several times and in array format as well,
+          it's a list that starts with repeated values:
+            ie. name=john&name=gwen&name[]=emma will end up as
+                ['john', 'gwen', 'emma']
+        - explicit index (see below) replaces repeated value at its position,
+          even if it's a path to an object:
+            ie. name=john&name=gwen&name[1].first=emma will end up as
+                ['john', {'first': 'emma'}]
         - if given value appears in custom array format, it's assumed it's a
           list in that order:
             ie. name[0]=john&name[1]=emma will end up as ['john', 'emma']
@@ -214,20 +241,46 @@ def to_json(payload):
 
             but will cause exception in any other case
 
+        If limits (tools.limits.PayloadLimits) are given, they are checked
+        while payload is being decoded.
+
         TODO: change the name of this function to be less misleading
     """
-    flat_tree = _flatten_payload(payload)
-
     baobab = {}
 
-    for structure, value in flat_tree:
-        _build_tree(baobab, structure, value)
+    # single pass, every key is tokenised into a path and its value is put
+    # straight into the tree, keys of arrays go last (see _key_order), so
+    # repeated values of the same key without brackets are merged into them
+    items = [
+        (_tokenise_key(key), key, values) for key, values in payload.lists()]
+
+    items.sort(key=_key_order)
+
+    for tokens, key, values in items:
+        if limits is not None:
+            limits.add_keys(1)
+            limits.check_depth(len(tokens), key)
+            limits.check_collection_elements(len(values), key)
+
+        node = baobab
+
+        for idx in range(len(tokens) - 1):
+            parent = node
+
+            node = _get_container(parent, tokens[idx], tokens[idx + 1])
+
+            if limits is not None and parent.__class__ is _Array:
+                limits.check_collection_elements(len(parent), key)
+
+        _set_value(
+            node, tokens[-1], values[0] if len(values) == 1 else values)
 
-    # while building lists, we use custom class Array, we need to convert them
-    # back to standard python primitve
-    baobab = _array_to_list(baobab)
+        if limits is not None and node.__class__ is _Array:
+            limits.check_collection_elements(len(node), key)
 
-    return baobab
+    # while building lists, we use sparse arrays, we need to convert them
+    # back to standard python primitive
+    return _to_primitives(baobab)
 
 
 def make_error_code(attribute, schema):
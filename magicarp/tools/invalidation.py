@@ -0,0 +1,302 @@
+"""Tag based invalidation of cached responses (see tools.cache).
+
+Cached entries are tagged (argument tags of ResponseCache, ie. 'user:{uid}'
+formatted with arguments of url and payload), endpoints that write (methods
+other than GET, HEAD and OPTIONS) invalidate tags listed in their attribute
+invalidates once action succeeded. Invalidation is sent as signal
+cache_invalidated (magicarp.signals), so anything else can listen to it or
+send it (see invalidate).
+
+Every process remembers when each tag was invalidated last, entry that was
+created before that is stale. With setting CACHE_INVALIDATION_LOG
+invalidations are appended to that file as well and every process on the
+host reads what others have appended, so they drop stale entries too, without
+any central service. Invalidations are remembered only as long as the largest
+ttl of caches (see retain), entries created before that are expired anyway,
+and once the file grows past COMPACT_SIZE it is rewritten with what is still
+remembered (appending processes wait for that, needs fcntl, ie. unix).
+
+The file is local to the host, backends shared by hosts (RedisBackend of
+tools.cache) keep times of invalidation of tags themselves, so entries
+invalidated on one host are stale on every other one.
+"""
+import json
+import os
+import threading
+import time
+import weakref
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from flask import current_app, has_app_context
+from simple_settings import settings
+
+from magicarp import signals
+
+
+def format_tags(templates, payload, arguments):
+    """Returns tags made of templates (ie. 'user:{uid}'), values come from
+    arguments of url and payload (if it's a dictionary), templates that
+    refer to missing values are skipped.
+    """
+    values = dict(payload) if isinstance(payload, dict) else {}
+    values.update(arguments)
+
+    tags = []
+
+    for template in templates:
+        try:
+            tags.append(template.format(**values))
+        except (KeyError, IndexError):
+            continue
+
+    return tags
+
+
+# size of log file it's compacted at (or at twice its size after the last
+# compaction, if that is more)
+COMPACT_SIZE = 1024 * 1024
+
+# seconds between drops of invalidations that are not needed anymore
+PRUNE_INTERVAL = 60
+
+_retention = 1
+_backends = weakref.WeakSet()
+
+
+def retain(seconds):
+    """Makes invalidations be remembered for at least seconds (caches call it
+    with their ttl).
+    """
+    global _retention  # pylint: disable=global-statement
+
+    _retention = max(_retention, seconds)
+
+
+def share(backend):
+    """Makes invalidations be handed over to backend of cache (see
+    BaseBackend.invalidate of tools.cache).
+    """
+    _backends.add(backend)
+
+
+def _is_same_file(descriptor, path):
+    try:
+        return os.fstat(descriptor).st_ino == os.stat(path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+class InvalidationLog(object):
+    """Times of last invalidation of tags, if path is given they are shared
+    (through append-only file) with other processes that use the same path.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.invalidated = {}
+        self.inode = None
+        self.offset = 0
+        self.compacted_size = 0
+        self.pruned = time.time()
+        self.lock = threading.Lock()
+
+    def invalidate(self, tags, when=None):
+        if when is None:
+            when = time.time()
+
+        with self.lock:
+            self._update(tags, when)
+
+            now = time.time()
+
+            if now - self.pruned >= PRUNE_INTERVAL:
+                self._prune(now)
+
+        if self.path is None:
+            return
+
+        lines = ''.join(
+            json.dumps([when, tag]) + '\n' for tag in tags).encode('utf-8')
+
+        while True:
+            # single write to file opened for appending does not interleave
+            # with writes of other processes
+            descriptor = os.open(
+                self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+            try:
+                if fcntl is not None:
+                    fcntl.flock(descriptor, fcntl.LOCK_SH)
+
+                    # file was compacted meanwhile, append to the new one
+                    if not _is_same_file(descriptor, self.path):
+                        continue
+
+                os.write(descriptor, lines)
+
+                return
+            finally:
+                os.close(descriptor)
+
+    def _update(self, tags, when):
+        for tag in tags:
+            if self.invalidated.get(tag, 0) < when:
+                self.invalidated[tag] = when
+
+    def _prune(self, now):
+        # entry created before invalidation that is older than retention is
+        # expired already
+        since = now - _retention
+
+        self.invalidated = {
+            tag: when for tag, when in self.invalidated.items()
+            if when >= since}
+        self.pruned = now
+
+    def _read(self, handle, size):
+        handle.seek(self.offset)
+
+        data = handle.read(size - self.offset)
+
+        # last line might be still being written
+        end = data.rfind(b'\n') + 1
+
+        self.offset += end
+
+        for line in data[:end].splitlines():
+            try:
+                when, tag = json.loads(line.decode('utf-8'))
+            except ValueError:
+                continue
+
+            self._update((tag, ), when)
+
+    def _compact(self):
+        with open(self.path, 'rb') as handle:
+            # waits for processes that are appending to the file
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+
+            # other process compacted it already
+            if os.fstat(handle.fileno()).st_ino != self.inode or \
+                    not _is_same_file(handle.fileno(), self.path):
+                return
+
+            self._read(handle, os.fstat(handle.fileno()).st_size)
+            self._prune(time.time())
+
+            data = ''.join(
+                json.dumps([when, tag]) + '\n'
+                for tag, when in self.invalidated.items()).encode('utf-8')
+
+            temporary = '{}.{}'.format(self.path, os.getpid())
+
+            with open(temporary, 'wb') as output:
+                output.write(data)
+
+                self.inode = os.fstat(output.fileno()).st_ino
+
+            os.replace(temporary, self.path)
+
+        self.offset = self.compacted_size = len(data)
+
+    def sync(self):
+        """Reads invalidations other processes appended since last sync,
+        drops the ones that are not needed anymore and compacts the file once
+        it's too big.
+        """
+        if self.path is None:
+            return
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+
+        now = time.time()
+
+        if stat.st_ino == self.inode and stat.st_size == self.offset and \
+                now - self.pruned < PRUNE_INTERVAL:
+            return
+
+        with self.lock:
+            try:
+                handle = open(self.path, 'rb')
+            except FileNotFoundError:
+                return
+
+            with handle:
+                stat = os.fstat(handle.fileno())
+
+                # file was replaced (compacted) or truncated (ie. rotated),
+                # read it again
+                if stat.st_ino != self.inode or stat.st_size < self.offset:
+                    self.inode = stat.st_ino
+                    self.offset = 0
+
+                if stat.st_size != self.offset:
+                    self._read(handle, stat.st_size)
+
+            if now - self.pruned >= PRUNE_INTERVAL:
+                self._prune(now)
+
+            if fcntl is not None and \
+                    stat.st_size > max(COMPACT_SIZE, 2 * self.compacted_size):
+                self._compact()
+
+    def is_stale(self, tags, created):
+        """True if any of tags was invalidated at (or after) created.
+        """
+        if not tags:
+            return False
+
+        self.sync()
+
+        invalidated = self.invalidated
+
+        return any(invalidated.get(tag, 0) >= created for tag in tags)
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_log():
+    """Returns log of this process (path is taken from setting
+    CACHE_INVALIDATION_LOG).
+    """
+    global _log  # pylint: disable=global-statement
+
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = InvalidationLog(settings.CACHE_INVALIDATION_LOG)
+
+    return _log
+
+
+def invalidate(*tags):
+    """Invalidates given tags in every process (sends cache_invalidated).
+    """
+    # pylint: disable=protected-access
+    sender = current_app._get_current_object() if has_app_context() else None
+    # pylint: enable=protected-access
+
+    signals.cache_invalidated.send(sender, tags=tags)
+
+
+def _on_invalidated(sender, tags):  # pylint: disable=unused-argument
+    if not tags:
+        return
+
+    when = time.time()
+
+    get_log().invalidate(tags, when)
+
+    for backend in list(_backends):
+        backend.invalidate(tags, when, _retention)
+
+
+signals.cache_invalidated.connect(_on_invalidated)
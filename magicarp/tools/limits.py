@@ -0,0 +1,198 @@
+"""Limits of incoming payloads, they cap how much work (and memory) single
+request can demand. Limits are checked while payload is being parsed (form
+decoding, population of input schema), so request is rejected as soon as any
+of them is crossed.
+
+Size of body is checked while body is read (see read_body), so even bodies
+of unknown size (ie. chunked) are never read past the limit. JSON and binary
+formats are decoded as a whole by their libraries (size of the result is
+bounded by size of the body), their depth and number of keys are checked
+once input schema is populated.
+
+Elements of collections can be counted as well (by path of collection in
+payload, see PayloadLimits.collections), log of slow requests turns it on.
+"""
+from simple_settings import settings
+
+from magicarp import exceptions
+
+
+# body of unknown size is read in chunks of that many bytes
+READ_CHUNK_SIZE = 64 * 1024
+
+LIMITS = (
+    'max_body_bytes', 'max_depth', 'max_keys', 'max_collection_elements')
+
+# limits of settings (by name of limit) once they are final, see load_defaults
+_defaults = None
+
+# turned on by tools that need numbers of elements of collections
+_count_collections = False
+
+
+def read_defaults():
+    """Returns limits of settings by name of limit, ie. max_depth from
+    PAYLOAD_MAX_DEPTH.
+    """
+    return {
+        name: getattr(settings, 'PAYLOAD_{}'.format(name.upper()))
+        for name in LIMITS}
+
+
+def load_defaults():
+    """Reads limits of settings once for every following payload (routing
+    calls it once it's locked), they are read for every payload otherwise.
+    """
+    global _defaults  # pylint: disable=global-statement
+
+    _defaults = read_defaults()
+
+
+def enable_collection_counts():
+    """Turns counting of elements of collections on for the rest of the
+    process (see PayloadLimits.collections).
+    """
+    global _count_collections  # pylint: disable=global-statement
+
+    _count_collections = True
+
+
+def _get_path(field):
+    # path of field in payload, elements of collections are marked with
+    # brackets (ie. items[].tags), root is not part of it
+    segments = []
+
+    while field.parent is not None:
+        parent = field.parent
+
+        if getattr(parent, 'collection_type', None) is not None:
+            segments.append('[]')
+        else:
+            segments.append('.' + field.name)
+
+        field = parent
+
+    return ''.join(reversed(segments)).lstrip('.')
+
+
+class PayloadLimits(object):
+    """Limits of a single payload, counters (ie. number of keys seen so far)
+    are kept on the instance, so every payload needs its own instance.
+
+    Limit that evaluates to False (0 or None) is disabled.
+
+    collections :: numbers of elements of collections of input schema by path
+        (ie. 'items[].tags' sums tags of all items), None unless counting is
+        turned on (see enable_collection_counts)
+    """
+    def __init__(
+            self, max_body_bytes=None, max_depth=None, max_keys=None,
+            max_collection_elements=None):
+        self.max_body_bytes = max_body_bytes
+        self.max_depth = max_depth
+        self.max_keys = max_keys
+        self.max_collection_elements = max_collection_elements
+
+        self.keys = 0
+        self.collections = {} if _count_collections else None
+
+    @classmethod
+    def from_settings(cls, **kwargs):
+        """Limits that are not given (or are None) are taken from settings,
+        ie. max_depth from PAYLOAD_MAX_DEPTH (see load_defaults).
+        """
+        defaults = read_defaults() if _defaults is None else _defaults
+
+        for name in LIMITS:
+            if kwargs.get(name) is None:
+                kwargs[name] = defaults[name]
+
+        return cls(**kwargs)
+
+    def check_body_bytes(self, size):
+        if self.max_body_bytes and size and size > self.max_body_bytes:
+            _exceeded(
+                "Payload is too large, got {} bytes, limit is {}".format(
+                    size, self.max_body_bytes))
+
+    def read_body(self, request):
+        """Returns body of request (bytes), body larger than max_body_bytes is
+        rejected, if request does not tell its size upfront (Content-Length),
+        it's read up to the limit.
+        """
+        self.check_body_bytes(request.content_length)
+
+        # pylint: disable=protected-access
+        cached = getattr(request, '_cached_data', None)
+        # pylint: enable=protected-access
+
+        if cached is not None or not self.max_body_bytes or \
+                request.content_length is not None:
+            data = request.get_data() if cached is None else cached
+
+            self.check_body_bytes(len(data))
+
+            return data
+
+        chunks = []
+        size = 0
+
+        while True:
+            chunk = request.stream.read(
+                min(READ_CHUNK_SIZE, self.max_body_bytes + 1 - size))
+
+            if not chunk:
+                break
+
+            chunks.append(chunk)
+            size += len(chunk)
+
+            self.check_body_bytes(size)
+
+        data = b''.join(chunks)
+
+        # get_data and parsing of forms (werkzeug) read cached body
+        request._cached_data = data  # pylint: disable=protected-access
+
+        return data
+
+    def check_depth(self, depth, name=None):
+        if self.max_depth and depth > self.max_depth:
+            _exceeded(
+                "Payload is nested too deep{}, limit is {} levels".format(
+                    _where(name), self.max_depth))
+
+    def add_keys(self, count, name=None):
+        self.keys += count
+
+        if self.max_keys and self.keys > self.max_keys:
+            _exceeded(
+                "Payload has too many keys{}, limit is {}".format(
+                    _where(name), self.max_keys))
+
+    def check_collection_elements(self, count, name=None):
+        if self.max_collection_elements and \
+                count > self.max_collection_elements:
+            _exceeded(
+                "Collection has too many elements{}, limit is {}".format(
+                    _where(name), self.max_collection_elements))
+
+    def count_collection_elements(self, field, count):
+        """Adds count to number of elements of collection field (if counting
+        is turned on).
+        """
+        if self.collections is None:
+            return
+
+        path = _get_path(field)
+
+        self.collections[path] = self.collections.get(path, 0) + count
+
+
+def _where(name):
+    return '' if name is None else ' (at {})'.format(name)
+
+
+def _exceeded(message):
+    raise exceptions.PayloadError(
+        error_invalid_payload=[('payload', message)])
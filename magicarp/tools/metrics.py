@@ -0,0 +1,406 @@
+"""Metrics of requests in text format of Prometheus, served by common route
+Metrics (setting ROUTING_ADD_METRICS).
+
+Every request that got a response (see record_response) is recorded as:
+
+    magicarp_requests_total :: counter by endpoint, version and status
+
+    magicarp_request_errors_total :: counter of responses with status 400
+        and above, by endpoint, version and status
+
+    magicarp_request_duration_seconds :: histogram by endpoint and version
+
+    magicarp_request_size_bytes, magicarp_response_size_bytes :: histograms
+        of sizes of bodies (response before it's compressed) by endpoint and
+        version
+
+Every process keeps its values in own store, with setting METRICS_DIRECTORY
+the store is a file mapped into memory (mmap) in that directory, named after
+id of the process, so it has single writer, and Metrics sums files of all
+processes, workers of pre-forking server (ie. gunicorn) are reported
+together without any external service. Files are never removed (counters of
+workers that exited still count), clean the directory when server starts.
+"""
+import bisect
+import collections
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+from flask import request
+from simple_settings import settings
+
+from magicarp.tools import helpers, timing
+
+PREFIX = 'magicarp_'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# upper bounds of buckets of histograms of sizes of bodies (bytes)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# name, type, help and labels of every metric
+METRICS = (
+    ('requests_total', 'counter',
+     "Requests by endpoint, version and status.",
+     ('endpoint', 'version', 'status')),
+    ('request_errors_total', 'counter',
+     "Responses with status 400 and above by endpoint, version and status.",
+     ('endpoint', 'version', 'status')),
+    ('request_duration_seconds', 'histogram',
+     "Time of handling of requests by endpoint and version.",
+     ('endpoint', 'version')),
+    ('request_size_bytes', 'histogram',
+     "Size of bodies of requests by endpoint and version.",
+     ('endpoint', 'version')),
+    ('response_size_bytes', 'histogram',
+     "Size of bodies of responses by endpoint and version.",
+     ('endpoint', 'version')),
+)
+
+# buckets of histograms by name
+_BUCKETS = {
+    'request_duration_seconds': timing.BUCKETS,
+    'request_size_bytes': SIZE_BUCKETS,
+    'response_size_bytes': SIZE_BUCKETS,
+}
+
+# keys of buckets (upper bound as string) by name of histogram, the last one
+# holds values above all buckets
+_BUCKET_KEYS = {
+    name: [str(bound) for bound in buckets] + ['+Inf']
+    for name, buckets in _BUCKETS.items()
+}
+
+
+class LocalStore(object):
+    """Values of metrics of this process, by key (tuple of strings: name of
+    metric and values of its labels).
+    """
+    def __init__(self):
+        self.values = collections.defaultdict(float)
+        self.lock = threading.Lock()
+
+    def update(self, increments):
+        """Adds amounts to values, increments is a list of (key, amount).
+        """
+        with self.lock:
+            for key, amount in increments:
+                self.values[key] += amount
+
+    def read(self):
+        with self.lock:
+            return dict(self.values)
+
+
+# layout of file of FileStore: number of used bytes, then entries, each is
+# length of key, key (JSON) padded to 8 bytes and the value (double)
+_USED = struct.Struct('<Q')
+_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+
+INITIAL_FILE_SIZE = 64 * 1024
+
+
+def _iter_entries(data, used):
+    """Yields (key, offset of value) of entries of file of FileStore.
+    """
+    offset = _USED.size
+
+    while offset < used:
+        length, = _LENGTH.unpack_from(data, offset)
+
+        start = offset + _LENGTH.size
+        end = start + length
+
+        key = tuple(json.loads(bytes(data[start:end]).decode('utf-8')))
+
+        offset = end + (-end % 8)
+
+        yield key, offset
+
+        offset += _VALUE.size
+
+
+class FileStore(LocalStore):
+    """Values of metrics of this process kept in file mapped into memory,
+    process is the only writer, but anyone can read the file (see read_file).
+    """
+    def __init__(self, path):
+        super().__init__()
+
+        self.path = path
+        self.positions = {}
+
+        self.handle = open(path, 'a+b')
+
+        size = os.fstat(self.handle.fileno()).st_size
+
+        if size == 0:
+            size = INITIAL_FILE_SIZE
+
+            self.handle.truncate(size)
+
+        self.map = mmap.mmap(self.handle.fileno(), size)
+
+        self.used, = _USED.unpack_from(self.map, 0)
+
+        if self.used == 0:
+            self.used = _USED.size
+
+            _USED.pack_into(self.map, 0, self.used)
+
+        # file of this process existed already (ie. id of process was reused)
+        for key, offset in _iter_entries(self.map, self.used):
+            self.positions[key] = offset
+
+    def _grow(self, size):
+        self.map.close()
+
+        self.handle.truncate(size)
+
+        self.map = mmap.mmap(self.handle.fileno(), size)
+
+    def _append(self, key):
+        encoded = json.dumps(key).encode('utf-8')
+
+        start = self.used + _LENGTH.size
+        offset = start + len(encoded)
+        offset += -offset % 8
+
+        end = offset + _VALUE.size
+
+        if end > len(self.map):
+            self._grow(max(end, len(self.map) * 2))
+
+        _LENGTH.pack_into(self.map, self.used, len(encoded))
+        self.map[start:start + len(encoded)] = encoded
+        _VALUE.pack_into(self.map, offset, 0.0)
+
+        # readers see the entry once it's complete
+        self.used = end
+
+        _USED.pack_into(self.map, 0, self.used)
+
+        self.positions[key] = offset
+
+        return offset
+
+    def update(self, increments):
+        with self.lock:
+            for key, amount in increments:
+                offset = self.positions.get(key)
+
+                if offset is None:
+                    offset = self._append(key)
+
+                value, = _VALUE.unpack_from(self.map, offset)
+
+                _VALUE.pack_into(self.map, offset, value + amount)
+
+    def read(self):
+        with self.lock:
+            return {
+                key: _VALUE.unpack_from(self.map, offset)[0]
+                for key, offset in self.positions.items()
+            }
+
+
+def read_file(path):
+    """Returns values of file of FileStore (of any process).
+    """
+    with open(path, 'rb') as handle:
+        data = handle.read()
+
+    if len(data) < _USED.size:
+        return {}
+
+    used, = _USED.unpack_from(data, 0)
+
+    return {
+        key: _VALUE.unpack_from(data, offset)[0]
+        for key, offset in _iter_entries(data, min(used, len(data)))
+    }
+
+
+def read_directory(directory):
+    """Returns values of all processes that keep their stores in directory.
+    """
+    values = collections.defaultdict(float)
+
+    for path in glob.glob(os.path.join(directory, 'metrics_*.db')):
+        for key, value in read_file(path).items():
+            values[key] += value
+
+    return dict(values)
+
+
+_store = None
+_store_key = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Returns store of this process (new one once process was forked or
+    METRICS_DIRECTORY changed).
+    """
+    global _store, _store_key  # pylint: disable=global-statement
+
+    key = (os.getpid(), settings.METRICS_DIRECTORY)
+
+    if _store_key != key:
+        with _store_lock:
+            if _store_key != key:
+                pid, directory = key
+
+                if directory:
+                    _store = FileStore(os.path.join(
+                        directory, 'metrics_{}.db'.format(pid)))
+                else:
+                    _store = LocalStore()
+
+                _store_key = key
+
+    return _store
+
+
+def collect():
+    """Returns values of metrics of all processes (or of this process only,
+    if METRICS_DIRECTORY is not set).
+    """
+    if settings.METRICS_DIRECTORY:
+        return read_directory(settings.METRICS_DIRECTORY)
+
+    return get_store().read()
+
+
+def _observe(increments, name, labels, value):
+    bound = _BUCKET_KEYS[name][bisect.bisect_left(_BUCKETS[name], value)]
+
+    increments.append(((name + '_bucket', ) + labels + (bound, ), 1.0))
+    increments.append(((name + '_sum', ) + labels, value))
+    increments.append(((name + '_count', ) + labels, 1.0))
+
+
+def start_request():
+    """Remembers when request started, meant to be used as before_request
+    hook.
+    """
+    request.metrics_started = time.monotonic()
+
+
+def record_response(response):
+    """Records metrics of response, meant to be used as after_request hook
+    (responses of unhandled exceptions never get there).
+    """
+    # proxy is resolved once, it's used on every request
+    current = request._get_current_object()  # pylint: disable=protected-access
+
+    started = getattr(current, 'metrics_started', None)
+
+    endpoint = helpers.get_endpoint()
+
+    if hasattr(endpoint, 'get_name'):
+        name = endpoint.get_name()
+    else:
+        name = current.endpoint or ''
+
+    version = getattr(current, 'version', None)
+    version = '' if version is None else str(version)
+
+    labels = (name, version)
+    status = str(response.status_code)
+
+    increments = [(('requests_total', name, version, status), 1.0)]
+
+    if response.status_code >= 400:
+        increments.append(
+            (('request_errors_total', name, version, status), 1.0))
+
+    if started is not None:
+        _observe(
+            increments, 'request_duration_seconds', labels,
+            time.monotonic() - started)
+
+    _observe(
+        increments, 'request_size_bytes', labels,
+        current.content_length or 0)
+
+    # streamed bodies are not consumed
+    size = response.calculate_content_length()
+
+    if size is not None:
+        _observe(increments, 'response_size_bytes', labels, size)
+
+    get_store().update(increments)
+
+    return response
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+def _format_labels(names, values):
+    return ','.join(
+        '{}="{}"'.format(name, _escape(value))
+        for name, value in zip(names, values))
+
+
+def _format_value(value):
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def render(values):
+    """Returns values (see collect) in text format of Prometheus.
+    """
+    series = collections.defaultdict(list)
+
+    for key, value in values.items():
+        series[key[0]].append((key[1:], value))
+
+    lines = []
+
+    for name, kind, description, labels in METRICS:
+        lines.append('# HELP {}{} {}'.format(PREFIX, name, description))
+        lines.append('# TYPE {}{} {}'.format(PREFIX, name, kind))
+
+        if kind == 'counter':
+            for key, value in sorted(series[name]):
+                lines.append('{}{}{{{}}} {}'.format(
+                    PREFIX, name, _format_labels(labels, key),
+                    _format_value(value)))
+
+            continue
+
+        # buckets are kept apart, they are cumulative in the output
+        buckets = collections.defaultdict(dict)
+
+        for key, value in series[name + '_bucket']:
+            buckets[key[:-1]][key[-1]] = value
+
+        sums = dict(series[name + '_sum'])
+        counts = dict(series[name + '_count'])
+
+        for key in sorted(counts):
+            total = 0
+
+            for bound in _BUCKETS[name] + ('+Inf', ):
+                total += buckets[key].get(str(bound), 0)
+
+                lines.append('{}{}_bucket{{{},le="{}"}} {}'.format(
+                    PREFIX, name, _format_labels(labels, key), bound,
+                    _format_value(total)))
+
+            for suffix, value in (('sum', sums.get(key, 0)),
+                                  ('count', counts[key])):
+                lines.append('{}{}_{}{{{}}} {}'.format(
+                    PREFIX, name, suffix, _format_labels(labels, key),
+                    _format_value(value)))
+
+    return '\n'.join(lines) + '\n'
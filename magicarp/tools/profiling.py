@@ -0,0 +1,165 @@
+"""Profiling of single requests on demand (setting PROFILING).
+
+Request that carries header PROFILING_HEADER with value of PROFILING_SECRET
+is handled under profiler, cProfile, or sampling profiler pyinstrument if
+setting PROFILING_SAMPLER is on and pyinstrument is installed. Without
+PROFILING_DIRECTORY response of profiled request is replaced with the
+report (text, status of the request is kept), with it report is saved into
+sub-directory named after endpoint:
+
+    <PROFILING_DIRECTORY>/<name of endpoint>/<time>_<id of process>.prof
+
+(.html for pyinstrument) and response is sent as it is, profiles of cProfile
+are read with pstats (or snakeviz and alike).
+
+Only thread of the request is profiled and only one request at a time,
+request that asks for profile while other one is profiled is handled as
+usual.
+"""
+import cProfile
+import datetime
+import hmac
+import io
+import os
+import pstats
+import re
+import threading
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+from flask import current_app, request
+from simple_settings import settings
+
+from magicarp.tools import helpers
+
+# every profiler (cProfile since python 3.12) is one per process
+_lock = threading.Lock()
+
+
+class CProfiler(object):
+    extension = 'prof'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def render(self):
+        stream = io.StringIO()
+
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.sort_stats(settings.PROFILING_SORT)
+        stats.print_stats(settings.PROFILING_LIMIT)
+
+        return stream.getvalue()
+
+    def save(self, path):
+        self.profile.dump_stats(path)
+
+
+class SamplingProfiler(object):
+    extension = 'html'
+
+    def __init__(self):
+        self.profiler = pyinstrument.Profiler()
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+
+    def render(self):
+        return self.profiler.output_text(unicode=True, color=False)
+
+    def save(self, path):
+        with open(path, 'w') as handle:
+            handle.write(self.profiler.output_html())
+
+
+def _is_requested():
+    secret = settings.PROFILING_SECRET
+    value = request.headers.get(settings.PROFILING_HEADER)
+
+    if not secret or not value:
+        return False
+
+    return hmac.compare_digest(value.encode('utf-8'), secret.encode('utf-8'))
+
+
+def start_profiling():
+    """Starts profiler if request asks for it, meant to be used as
+    before_request hook.
+    """
+    if not _is_requested() or not _lock.acquire(blocking=False):
+        return
+
+    if settings.PROFILING_SAMPLER and pyinstrument is not None:
+        profiler = SamplingProfiler()
+    else:
+        profiler = CProfiler()
+
+    request.profiler = profiler
+
+    profiler.start()
+
+
+def _stop():
+    profiler = request.__dict__.pop('profiler', None)
+
+    if profiler is not None:
+        profiler.stop()
+
+        _lock.release()
+
+    return profiler
+
+
+def _get_path(profiler):
+    endpoint = helpers.get_endpoint()
+
+    if hasattr(endpoint, 'get_name'):
+        name = endpoint.get_name()
+    else:
+        name = request.endpoint or 'unmatched'
+
+    directory = os.path.join(
+        settings.PROFILING_DIRECTORY, re.sub(r'[^\w.-]', '_', name))
+
+    os.makedirs(directory, exist_ok=True)
+
+    return os.path.join(directory, '{:%Y%m%dT%H%M%S.%f}_{}.{}'.format(
+        datetime.datetime.utcnow(), os.getpid(), profiler.extension))
+
+
+def finish_profiling(response):
+    """Stops profiler and saves its report or sends it instead of response,
+    meant to be used as after_request hook.
+    """
+    profiler = _stop()
+
+    if profiler is None:
+        return response
+
+    if settings.PROFILING_DIRECTORY:
+        profiler.save(_get_path(profiler))
+
+        return response
+
+    return current_app.response_class(
+        profiler.render(), status=response.status_code,
+        mimetype='text/plain')
+
+
+def teardown_profiling(exc=None):  # pylint: disable=unused-argument
+    """Stops profiler of request that ended with unhandled exception (there
+    is no after_request then), meant to be used as teardown_request hook.
+    """
+    _stop()
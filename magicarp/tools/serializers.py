@@ -0,0 +1,336 @@
+"""Decoders of request bodies, picked by media type of the request, and
+encoders of responses.
+
+JSON is decoded straight from raw body (bytes) with the fastest decoder that
+is installed (orjson, ujson, standard library json in that order), unless
+setting JSON_DECODER (or attribute json_decoder of an endpoint) says
+otherwise. More decoders can be added with register_json_decoder.
+
+Responses are encoded to JSON (bytes) by flask's json, or by orjson if
+setting JSON_ENCODER asks for it (it's not a drop-in replacement, see the
+setting), both honour flask's configuration (JSON_SORT_KEYS) and
+app.json_encoder (objects it does not know, including dates, are passed to
+its method default).
+
+Binary formats, MessagePack (msgpack) and CBOR (cbor2), are available when
+their libraries are installed, responses are encoded with them if client asks
+for them (header Accept) and request bodies of their media types are decoded
+(see setting BINARY_FORMATS). More of them can be added with
+register_binary_format.
+"""
+import datetime
+import json
+import sys
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+from flask import current_app, json as flask_json
+from simple_settings import settings
+from werkzeug.http import parse_options_header
+
+from magicarp import exceptions
+
+_UTF_8 = ('utf-8', 'utf8')
+
+
+def _decode_json(data, charset):
+    # json understands bytes (utf-8, utf-16 or utf-32) since python 3.6
+    if charset not in _UTF_8 or sys.version_info < (3, 6):
+        data = data.decode(charset)
+
+    return json.loads(data)
+
+
+def _decode_orjson(data, charset):
+    if charset not in _UTF_8:
+        data = data.decode(charset)
+
+    return orjson.loads(data)
+
+
+def _decode_ujson(data, charset):
+    if charset not in _UTF_8:
+        data = data.decode(charset)
+
+    return ujson.loads(data)
+
+
+# decoders of JSON by name, each of them takes raw body (bytes) and its charset
+JSON_DECODERS = {
+    'json': _decode_json,
+}
+
+if ujson is not None:
+    JSON_DECODERS['ujson'] = _decode_ujson
+
+if orjson is not None:
+    JSON_DECODERS['orjson'] = _decode_orjson
+
+# if decoder is not configured, first one that is installed is used
+_PREFERRED_JSON_DECODERS = ('orjson', 'ujson', 'json')
+
+
+def register_json_decoder(name, decoder):
+    """Makes decoder (callable that takes raw body and charset) available
+    under given name, so it can be used in settings and on endpoints.
+    """
+    JSON_DECODERS[name] = decoder
+
+
+def get_json_decoder(decoder=None):
+    """Returns decoder of JSON, decoder might be a name of registered decoder,
+    callable or None (setting JSON_DECODER and if it's not set either, the
+    fastest decoder installed).
+    """
+    if decoder is None:
+        decoder = settings.JSON_DECODER
+
+    if decoder is None:
+        for name in _PREFERRED_JSON_DECODERS:
+            if name in JSON_DECODERS:
+                return JSON_DECODERS[name]
+
+    if callable(decoder):
+        return decoder
+
+    try:
+        return JSON_DECODERS[decoder]
+    except KeyError:
+        raise ValueError(
+            "JSON decoder {} is unknown (is it installed?), available: "
+            "{}".format(decoder, ", ".join(sorted(JSON_DECODERS))))
+
+
+def parse_media_type(value):
+    """Splits value of header (ie. Content-Type) into lowercase media type
+    and dictionary of its parameters, ie.
+
+    'application/json; charset=UTF-8' => 'application/json',
+                                         {'charset': 'UTF-8'}
+    """
+    media_type, params = parse_options_header(value or '')
+
+    return media_type.lower(), params
+
+
+def is_json(media_type):
+    """True for application/json and any other JSON based media type (with
+    suffix +json, ie. application/vnd.api+json).
+    """
+    return media_type == 'application/json' or (
+        media_type.startswith('application/') and
+        media_type.endswith('+json'))
+
+
+def decode_json(data, charset=None, decoder=None):
+    """Decodes raw body (bytes) with JSON decoder (see get_json_decoder),
+    empty body is not a valid JSON (same as with flask's get_json).
+    """
+    decoder = get_json_decoder(decoder)
+
+    if not data:
+        raise exceptions.InvalidPayloadError(
+            "Payload is not a valid JSON: body is empty")
+
+    try:
+        return decoder(data, (charset or 'utf-8').lower())
+    except (ValueError, LookupError) as err:
+        raise exceptions.InvalidPayloadError(
+            "Payload is not a valid JSON: {}".format(err))
+    except RecursionError:
+        # json of standard library is recursive
+        raise exceptions.InvalidPayloadError(
+            "Payload is not a valid JSON: it's nested too deep")
+
+
+def _encode_json(obj):
+    # same as flask.jsonify, minus pretty printing
+    return flask_json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _encode_orjson(obj):
+    # dates are left to encoder of the app, so they look the same as when
+    # encoded by flask
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    if current_app.config['JSON_SORT_KEYS']:
+        option |= orjson.OPT_SORT_KEYS
+
+    try:
+        return orjson.dumps(
+            obj, default=current_app.json_encoder().default, option=option)
+    except TypeError:
+        # ie. integers above 64 bits, flask's encoder has no such limits
+        return _encode_json(obj)
+
+
+# encoders of JSON by name, each of them takes an object and returns bytes
+JSON_ENCODERS = {
+    'json': _encode_json,
+}
+
+if orjson is not None:
+    JSON_ENCODERS['orjson'] = _encode_orjson
+
+
+def register_json_encoder(name, encoder):
+    """Makes encoder (callable that takes an object and returns bytes)
+    available under given name, so it can be used in settings and envelopes.
+    """
+    JSON_ENCODERS[name] = encoder
+
+
+def get_json_encoder(encoder=None):
+    """Returns encoder of JSON, encoder might be a name of registered encoder,
+    callable or None (setting JSON_ENCODER and if it's not set either,
+    encoder of flask).
+    """
+    if encoder is None:
+        encoder = settings.JSON_ENCODER or 'json'
+
+    if callable(encoder):
+        return encoder
+
+    try:
+        return JSON_ENCODERS[encoder]
+    except KeyError:
+        raise ValueError(
+            "JSON encoder {} is unknown (is it installed?), available: "
+            "{}".format(encoder, ", ".join(sorted(JSON_ENCODERS))))
+
+
+MSGPACK = 'application/msgpack'
+CBOR = 'application/cbor'
+
+
+def _to_primitive(obj):
+    # same as for JSON, encoder of the app knows how to deal with objects
+    return current_app.json_encoder().default(obj)
+
+
+def _encode_msgpack(obj):
+    return msgpack.packb(obj, default=_to_primitive, use_bin_type=True)
+
+
+def _decode_msgpack(data):
+    try:
+        return msgpack.unpackb(data, raw=False)
+    except (ValueError, msgpack.UnpackException) as err:
+        raise ValueError(str(err) or err.__class__.__name__)
+
+
+def _encode_cbor(obj):
+    # dates are native to CBOR, naive ones are taken as UTC
+    return cbor2.dumps(
+        obj, timezone=datetime.timezone.utc,
+        default=lambda encoder, value: encoder.encode(_to_primitive(value)))
+
+
+def _decode_cbor(data):
+    try:
+        return cbor2.loads(data)
+    except (ValueError, cbor2.CBORError) as err:
+        raise ValueError(str(err) or err.__class__.__name__)
+
+
+# encoders of binary formats by media type, each of them takes an object and
+# returns bytes
+BINARY_ENCODERS = {}
+
+# decoders of binary formats by media type, each of them takes raw body and
+# raises ValueError if it's not valid
+BINARY_DECODERS = {}
+
+
+def register_binary_format(media_types, encoder, decoder):
+    """Makes binary format available under given media types (first of them
+    is the canonical one, rest are aliases), encoder is a callable that takes
+    an object and returns bytes, decoder takes bytes and returns an object
+    (ValueError if bytes are not valid).
+    """
+    for media_type in media_types:
+        BINARY_ENCODERS[media_type] = encoder
+        BINARY_DECODERS[media_type] = decoder
+
+
+if msgpack is not None:
+    register_binary_format(
+        (MSGPACK, 'application/x-msgpack', 'application/vnd.msgpack'),
+        _encode_msgpack, _decode_msgpack)
+
+if cbor2 is not None:
+    register_binary_format((CBOR, ), _encode_cbor, _decode_cbor)
+
+
+def get_binary_formats(binary_formats=None):
+    """Returns media types of binary formats that are enabled (and
+    installed), binary_formats is a list of them or None (setting
+    BINARY_FORMATS and if it's not set either, all registered formats).
+    """
+    if binary_formats is None:
+        binary_formats = settings.BINARY_FORMATS
+
+    if binary_formats is None:
+        return sorted(BINARY_ENCODERS)
+
+    return [
+        media_type for media_type in binary_formats
+        if media_type in BINARY_ENCODERS]
+
+
+def negotiate(accept, binary_formats=None):
+    """Returns media type of binary format that client prefers (accept is
+    werkzeug's MIMEAccept, ie. request.accept_mimetypes) or None if response
+    should be JSON. JSON wins the ties, so wildcards (*/*) or missing Accept
+    end with JSON.
+    """
+    if not accept:
+        return None
+
+    binary_formats = get_binary_formats(binary_formats)
+
+    if not binary_formats:
+        return None
+
+    media_type = accept.best_match(
+        ['application/json'] + binary_formats, default='application/json')
+
+    return None if media_type == 'application/json' else media_type
+
+
+def is_binary(media_type, binary_formats=None):
+    """True if media type is one of enabled binary formats.
+    """
+    return media_type in get_binary_formats(binary_formats)
+
+
+def decode_binary(data, media_type):
+    """Decodes raw body (bytes) of given binary media type, empty body is an
+    empty payload.
+    """
+    if not data:
+        return {}
+
+    try:
+        return BINARY_DECODERS[media_type](data)
+    except ValueError as err:
+        raise exceptions.InvalidPayloadError(
+            "Payload is not a valid {}: {}".format(media_type, err))
@@ -0,0 +1,145 @@
+"""Log of slow requests (setting SLOW_REQUEST_THRESHOLD).
+
+Request handled by endpoint that took at least SLOW_REQUEST_THRESHOLD
+seconds (phase total, see tools.timing, create_app turns timing on) is
+logged as single record of logger magicarp.slow_requests, message is JSON
+and the same dictionary is attribute slow_request of the record:
+
+    endpoint, version :: name of endpoint and version of api
+
+    payload_bytes :: size of body of request
+
+    collections :: number of elements of every CollectionField of input
+        schema that was given in payload, by path (ie. 'items[].tags' sums
+        tags of all items), None if endpoint has no input schema
+
+    timings :: seconds by phase
+
+    response_bytes :: size of body of response (before it's compressed),
+        None for streamed responses
+
+Elements are counted while input schema is populated (see
+tools.limits.PayloadLimits.collections), create_app turns counting on,
+payloads rejected by input schema have those counted until then.
+
+Records should be handed over to QueueHandler (see LOGGING), so they are
+written by its listener in own thread and request never waits for them.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+from flask import request
+from simple_settings import settings
+
+logger = logging.getLogger('magicarp.slow_requests')
+
+
+def capture(endpoint, name, version, timings):
+    """Keeps details of slow request until its response is made, meant to be
+    connected to signal endpoint_timed.
+    """
+    if timings['total'] < settings.SLOW_REQUEST_THRESHOLD:
+        return
+
+    collections = None
+
+    if endpoint.input_schema:
+        collections = getattr(request, 'payload_collections', None)
+
+    request.slow_request = {
+        'endpoint': name,
+        'version': version,
+        'payload_bytes': request.content_length or 0,
+        'collections': collections,
+        'timings': dict(timings),
+    }
+
+
+def log_response(response):
+    """Logs slow request along with size of its response, meant to be used as
+    after_request hook.
+    """
+    record = request.__dict__.pop('slow_request', None)
+
+    if record is None:
+        return response
+
+    record['response_bytes'] = response.calculate_content_length()
+
+    logger.warning(
+        "Slow request %s", json.dumps(record, sort_keys=True),
+        extra={'slow_request': record})
+
+    return response
+
+
+class QueueHandler(logging.Handler):
+    """Hands records over to target handlers that are run by QueueListener
+    in own thread, targets are handlers or, in LOGGING, references to other
+    handlers that dictConfig resolves, ie.
+
+        'slow_requests': {
+            'class': 'magicarp.tools.slow_requests.QueueHandler',
+            'target_handlers': ['cfg://handlers.console'],
+        }
+
+    listener is started by the first record of every process (workers of
+    pre-forking server get own one) and stopped once handler is closed.
+
+    It's not subclass of logging.handlers.QueueHandler (records are prepared
+    the same way), dictConfig of python 3.12+ builds subclasses of it on its
+    own (requires handlers, passes queue and sets listener that never
+    starts).
+    """
+    prepare = logging.handlers.QueueHandler.prepare
+    emit = logging.handlers.QueueHandler.emit
+
+    def __init__(self, target_handlers=(), respect_handler_level=True):
+        super().__init__()
+
+        self.queue = queue.Queue(-1)
+        self.target_handlers = target_handlers
+        self.respect_handler_level = respect_handler_level
+        self.listener = None
+        self.pid = None
+        self.start_lock = threading.Lock()
+
+    def start(self):
+        # references of dictConfig are resolved once items are accessed (by
+        # index), by now every handler of LOGGING is configured
+        handlers = [
+            self.target_handlers[idx]
+            for idx in range(len(self.target_handlers))]
+
+        for handler in handlers:
+            if not isinstance(handler, logging.Handler):
+                raise ValueError(
+                    "Target of QueueHandler has to be a handler (or "
+                    "'cfg://handlers.<name>'), got: {!r}".format(handler))
+
+        self.listener = logging.handlers.QueueListener(
+            self.queue, *handlers,
+            respect_handler_level=self.respect_handler_level)
+        self.listener.start()
+
+        self.pid = os.getpid()
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            with self.start_lock:
+                if self.pid != os.getpid():
+                    self.start()
+
+        self.queue.put_nowait(record)
+
+    def close(self):
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+
+        self.listener = None
+
+        super().close()
@@ -0,0 +1,204 @@
+"""Timing of phases of requests handled by endpoints.
+
+Every request (setting ENDPOINT_TIMING, or app made by create_app with
+metrics or log of slow requests, see enable) gets PhaseTimer that takes a lap
+once each phase of BaseEndpoint.__call__ is done:
+
+    pre_action, payload (get_payload), input (parse_input: populate and
+    validate), action, output (parse_output), envelope, post_action
+
+requests served from cache skip most of them (see tools.cache), then time of
+the whole request is recorded as phase total. Timings are recorded into
+in-process histograms by name of endpoint, version of api and phase.
+
+Histograms are read with get_histograms, timings of every request are sent
+as signal endpoint_timed (magicarp.signals) as well, so they can be exported
+anywhere else.
+"""
+import bisect
+import collections
+import threading
+import time
+
+from flask import request
+from simple_settings import settings
+from werkzeug.local import Local, release_local
+
+from magicarp import signals
+
+# upper bounds (seconds) of buckets of histograms, the last bucket (above
+# them) is implicit
+BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PHASES = (
+    'pre_action', 'payload', 'input', 'action', 'output', 'envelope',
+    'post_action', 'total')
+
+
+class Histogram(object):
+    """Counts of observed values by bucket (counts[i] is number of values
+    that are not greater than buckets[i], but greater than buckets[i - 1],
+    the last one holds values above all buckets), sum and count of them.
+    """
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def copy(self):
+        histogram = Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        histogram.count = self.count
+
+        return histogram
+
+    def cumulative(self):
+        """Yields (upper bound, number of values not greater than it), the
+        last bound is infinity.
+        """
+        total = 0
+
+        bounds = self.buckets + (float('inf'), )
+
+        for bound, count in zip(bounds, self.counts):
+            total += count
+
+            yield bound, total
+
+
+# histograms by phase by (name of endpoint, version)
+_histograms = collections.defaultdict(dict)
+_histograms_lock = threading.Lock()
+
+
+def get_histograms():
+    """Returns copies of histograms by (name of endpoint, version, phase),
+    version is a string (empty for version-less routes).
+    """
+    with _histograms_lock:
+        return {
+            (name, version, phase): histogram.copy()
+            for (name, version), phases in _histograms.items()
+            for phase, histogram in phases.items()
+        }
+
+
+def reset_histograms():
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def record(name, version, timings):
+    """Records timings (seconds by phase) of single request.
+    """
+    with _histograms_lock:
+        phases = _histograms[name, version]
+
+        for phase, seconds in timings.items():
+            histogram = phases.get(phase)
+
+            if histogram is None:
+                histogram = phases[phase] = Histogram()
+
+            histogram.observe(seconds)
+
+
+class PhaseTimer(object):
+    """Times phases of single request, lap closes the phase that lasted since
+    the previous one (or start).
+    """
+    __slots__ = ('started', 'last', 'timings')
+
+    def __init__(self):
+        self.started = self.last = time.monotonic()
+        self.timings = collections.OrderedDict()
+
+    def lap(self, phase):
+        now = time.monotonic()
+
+        self.timings[phase] = self.timings.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def stop(self):
+        self.timings['total'] = time.monotonic() - self.started
+
+        return self.timings
+
+
+class _NoTimer(object):
+    """Stands for timer when timing is off.
+    """
+    timings = None
+
+    def lap(self, phase):  # pylint: disable=no-self-use,unused-argument
+        pass
+
+    def stop(self):  # pylint: disable=no-self-use
+        pass
+
+
+NO_TIMER = _NoTimer()
+
+
+# timer of request that is being handled (by thread or greenlet), it's
+# cheaper to get than attribute of flask's request
+_local = Local()
+
+# turned on by tools that need timings (regardless of ENDPOINT_TIMING)
+_enabled = False
+
+
+def enable():
+    """Turns timing on for the rest of the process.
+    """
+    global _enabled  # pylint: disable=global-statement
+
+    _enabled = True
+
+
+def start_timer():
+    """Returns timer of current request, new one if timing is on.
+    """
+    if not _enabled and not settings.ENDPOINT_TIMING:
+        return NO_TIMER
+
+    timer = _local.timer = PhaseTimer()
+
+    return timer
+
+
+def get_timer():
+    """Returns timer of current request (see start_timer).
+    """
+    return getattr(_local, 'timer', NO_TIMER)
+
+
+def finish_timer(endpoint, timer):
+    """Stops timer of request handled by endpoint, records its timings and
+    sends them (signal endpoint_timed).
+    """
+    timings = timer.stop()
+
+    if timings is None:
+        return
+
+    release_local(_local)
+
+    name = endpoint.get_name()
+    version = getattr(request, 'version', None)
+    version = '' if version is None else str(version)
+
+    record(name, version, timings)
+
+    if signals.endpoint_timed.receivers:
+        signals.endpoint_timed.send(
+            endpoint, name=name, version=version, timings=timings)
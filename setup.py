@@ -37,6 +37,14 @@ setup(
         'url2vapi>=1.2',
         'validators>=0.12',
     ],
+    # optional, used if installed (see magicarp.tools)
+    extras_require={
+        'orjson': ['orjson>=3.0'],
+        'ujson': ['ujson>=2.0'],
+        'formats': ['msgpack>=1.0', 'cbor2>=5.0'],
+        'compression': ['brotli>=1.0', 'zstandard>=0.13'],
+        'profiling': ['pyinstrument>=3.0'],
+    },
     include_package_data=False,
     packages=find_packages(),
     zip_safe=False
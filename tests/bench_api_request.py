@@ -0,0 +1,51 @@
+"""Benchmark of construction of ApiRequest, version parsed eagerly from the
+whole url (as it used to be) against parsed lazily from path (and remembered
+by prefix), both for endpoints that never look at version and for those that
+do.
+"""
+import url2vapi
+
+from werkzeug.test import EnvironBuilder
+
+from magicarp.tools import api_request
+
+from . import benchmark
+
+ENVIRON = EnvironBuilder(
+    path='/1.0/users/12/orders/', query_string='page=2&per_page=50',
+    headers={'Accept': 'application/json'}).get_environ()
+
+
+class EagerRequest(api_request.ApiRequest):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.__dict__['api_request'] = url2vapi.split(
+            self.url, pattern="<version:double>")
+
+
+def run():
+    for label, request_class, read_version in [
+            ("eager, version not read", EagerRequest, False),
+            ("lazy, version not read", api_request.ApiRequest, False),
+            ("eager, version read", EagerRequest, True),
+            ("lazy, version read", api_request.ApiRequest, True)]:
+        def construct():
+            # pylint: disable=cell-var-from-loop
+            request = request_class(dict(ENVIRON))
+
+            if read_version:
+                return request.version
+
+            return request
+
+        elapsed = benchmark.measure(label, construct, number=20000)
+
+        if request_class is EagerRequest:
+            baseline = elapsed
+        else:
+            benchmark.compare("speed-up", baseline, elapsed)
+
+
+if __name__ == '__main__':
+    run()
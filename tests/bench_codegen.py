@@ -0,0 +1,72 @@
+"""Benchmark of code generated populate/validate (magicarp.schema.codegen)
+versus generic, plan driven, populate/validate of schemas. Coercions are
+inlined for compact values only (SCHEMA_COMPACT_VALUES), without them both
+run at about the same speed.
+"""
+from magicarp import exceptions
+from magicarp.schema import input_field as field
+
+from . import benchmark
+
+
+def make_schema(codegen, compact_values):
+    class Row(field.SchemaField):
+        required = ['uid', 'name']
+
+        fields = (
+            field.IntegerField("uid"),
+            field.StringField("name"),
+            field.BoolField("active"),
+            field.IntegerField("age"),
+            field.StringField("email"),
+            field.StringField("city"),
+        )
+
+    Row.codegen = codegen
+    Row.compact_values = compact_values
+
+    return Row
+
+
+def populate(schema_cls, payload):
+    schema = schema_cls('row')
+
+    try:
+        schema.populate(payload)
+        schema.validate()
+    except exceptions.PayloadError as err:
+        return err.get_errors()
+    except exceptions.MultipleValidationError as err:
+        return err.errors
+
+    return schema.as_dictionary()
+
+
+def run():
+    valid = {
+        'uid': '1', 'name': 'john', 'active': 'yes', 'age': 23,
+        'email': 'john@example.com', 'city': 'London',
+    }
+    invalid = {'uid': 'one', 'active': 'maybe', 'unknown': True}
+
+    for compact_values in (False, True):
+        plain = make_schema(False, compact_values)
+        generated = make_schema(True, compact_values)
+
+        print("Compact values: {}".format(compact_values))
+
+        for label, payload in [('valid', valid), ('invalid', invalid)]:
+            # generated code has to give exactly the same outcome
+            assert populate(plain, payload) == populate(generated, payload)
+
+            baseline = benchmark.measure(
+                "{} payload, plan".format(label),
+                lambda: populate(plain, payload), number=10000)
+            candidate = benchmark.measure(
+                "{} payload, generated".format(label),
+                lambda: populate(generated, payload), number=10000)
+            benchmark.compare("speed-up", baseline, candidate)
+
+
+if __name__ == '__main__':
+    run()
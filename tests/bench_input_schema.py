@@ -0,0 +1,81 @@
+"""Benchmark of tree of required fields of deeply nested schemas, built on
+every call versus cached per schema class, and time of populate it was part
+of.
+"""
+from magicarp.schema import compiler, input_field as field
+
+from . import benchmark
+
+
+def make_schema(depth):
+    """Builds schema that nests itself depth times, each level has few plain
+    fields, a nested schema and collection of nested schemas.
+    """
+    schema_cls = None
+
+    for level in range(depth):
+        fields = [
+            field.StringField("name"),
+            field.IntegerField("age"),
+        ]
+
+        if schema_cls is not None:
+            fields.append(schema_cls("child"))
+            fields.append(field.CollectionField("children", schema_cls))
+
+        schema_cls = type(
+            'Level{}'.format(level), (field.SchemaField,), {
+                'fields': tuple(fields),
+                'required': ['name'],
+            })
+
+    return schema_cls
+
+
+def make_payload(depth):
+    payload = None
+
+    for _ in range(depth):
+        dct = {'name': 'john', 'age': '23'}
+
+        if payload is not None:
+            dct['child'] = payload
+            dct['children'] = [payload, payload]
+
+        payload = dct
+
+    return payload
+
+
+def run(depth=4):
+    schema_cls = make_schema(depth)
+    payload = make_payload(depth)
+
+    def cold_required():
+        compiler.clear_cache()
+        schema_cls('schema').collect_required_fields()
+
+    def warm_required():
+        schema_cls('schema').collect_required_fields()
+
+    def populate():
+        schema_cls('schema').populate(payload)
+
+    print("Nested schema, depth: {}".format(depth))
+
+    cold = benchmark.measure(
+        "collect_required_fields (not cached)", cold_required)
+    warm = benchmark.measure(
+        "collect_required_fields (cached)", warm_required)
+    benchmark.compare("collect_required_fields speed-up", cold, warm)
+
+    # populate is dominated by normalisation of values, building the tree
+    # on every call would add this much to it
+    total = benchmark.measure("populate", populate, number=100)
+
+    print("{:<50} {:>12.2f} %".format(
+        "populate, tree built on every call", (cold - warm) / total * 100))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,59 @@
+"""Benchmark of decoding JSON payloads by BaseEndpoint.get_payload, decoders
+registered in tools.serializers versus flask's request.get_json. Standard
+json decoder is about as fast as flask's, gains come from orjson (or ujson)
+if installed.
+"""
+import json
+
+import flask
+
+from magicarp import endpoint
+from magicarp.tools import serializers
+
+from . import benchmark
+
+
+def make_body(size):
+    return json.dumps([
+        {'uid': idx, 'name': 'user {}'.format(idx), 'active': True,
+         'tags': ['a', 'b'], 'score': idx / 3}
+        for idx in range(size)
+    ]).encode('utf-8')
+
+
+def run():
+    app = flask.Flask('bench')
+
+    for size in (10, 1000, 10000):
+        body = make_body(size)
+
+        print("Payload of {} objects, {} bytes".format(size, len(body)))
+
+        with app.test_request_context(
+                method='POST', data=body,
+                content_type='application/json; charset=utf-8'):
+            request = flask.request
+
+            # body is read once and cached, only decoding is measured
+            request.get_data()
+
+            baseline = benchmark.measure(
+                "flask get_json",
+                lambda: request.get_json(cache=False), number=10)
+
+            for name in sorted(serializers.JSON_DECODERS):
+                class Create(endpoint.BaseEndpoint):
+                    json_decoder = name
+
+                view = Create()
+
+                assert view.get_payload() == request.get_json(cache=False)
+
+                candidate = benchmark.measure(
+                    "get_payload, {}".format(name), view.get_payload,
+                    number=10)
+                benchmark.compare("speed-up", baseline, candidate)
+
+
+if __name__ == '__main__':
+    run()
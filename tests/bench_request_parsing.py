@@ -0,0 +1,43 @@
+"""Benchmark of decoding form-encoded payloads (tools.helpers.to_json) on large
+forms, time per key should stay flat as form grows.
+"""
+from werkzeug.datastructures import CombinedMultiDict, MultiDict
+
+from magicarp import tools
+
+from . import benchmark
+
+
+def make_forms(size):
+    # objects with explicit (multi-digit) indexes, ie. user[123].name
+    objects = MultiDict([
+        ('user[{}].{}'.format(idx // 2, 'name' if idx % 2 else 'age'), 'v')
+        for idx in range(size)
+    ])
+
+    # one key repeated in legacy format, ie. tag[]=a&tag[]=b
+    legacy = MultiDict([('tag[]', str(idx)) for idx in range(size)])
+
+    # flat keys, ie. field_123=v
+    flat = MultiDict([('field_{}'.format(idx), 'v') for idx in range(size)])
+
+    return [
+        ('objects', objects), ('legacy append', legacy), ('flat', flat)]
+
+
+def run():
+    for size in (1000, 10000):
+        print("Form with {} keys".format(size))
+
+        for label, form in make_forms(size):
+            payload = CombinedMultiDict([MultiDict(), form])
+
+            taken = benchmark.measure(
+                label, lambda: tools.helpers.to_json(payload), number=10)
+
+            print("{:<50} {:>12.2f} us".format(
+                "{}, per key".format(label), taken / size * 1e6))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,102 @@
+"""Benchmark of formats of responses (and payloads), JSON (encoders of
+tools.serializers) versus binary formats that are installed (MessagePack,
+CBOR), envelope of populated output schema is rendered and then decoded, as
+the client would do. Sizes of bodies are compared as well, binary formats
+are smaller, round trips are not faster than JSON (JSON is written straight
+from fields, binary formats go through as_dictionary), times are printed
+as they are.
+"""
+import flask
+
+from magicarp import envelope, tools
+from magicarp.schema import output_field as field
+
+from . import benchmark
+
+
+class Row(field.SchemaField):
+    fields = (
+        field.IntegerField("uid"),
+        field.StringField("name"),
+        field.BoolField("active"),
+        field.StringField("email"),
+        field.CollectionField("tags", field.StringField),
+    )
+
+
+class Page(field.SchemaField):
+    fields = (
+        field.IntegerField("total"),
+        field.CollectionField("rows", Row),
+    )
+
+
+def make_page(size):
+    page = Page('page')
+    page.populate({
+        'total': size,
+        'rows': [{
+            'uid': idx, 'name': 'user {}'.format(idx), 'active': True,
+            'email': 'user{}@example.com'.format(idx), 'tags': ['a', 'b'],
+        } for idx in range(size)],
+    })
+
+    return page
+
+
+def run():
+    app = flask.Flask('bench')
+    app.json_encoder = tools.helpers.JsonEncoder
+
+    serializers = tools.serializers
+
+    formats = [
+        (encoder, 'application/json', encoder,
+         lambda data: serializers.decode_json(data, 'utf-8'))
+        for encoder in sorted(serializers.JSON_ENCODERS)]
+
+    formats.extend(
+        (media_type, media_type, None,
+         lambda data, media_type=media_type: serializers.decode_binary(
+             data, media_type))
+        for media_type in (serializers.MSGPACK, serializers.CBOR)
+        if serializers.is_binary(media_type))
+
+    for size, number in [(1, 1000), (1000, 20)]:
+        page = make_page(size)
+
+        print("Page of {} rows".format(size))
+
+        baseline = None
+
+        for label, media_type, encoder, decode in formats:
+            with app.test_request_context(headers={'Accept': media_type}):
+                flask.request.user = None
+
+                wrapper = envelope.Read(encoder=encoder)
+
+                body = wrapper(page)[0].get_data()
+
+                encoding = benchmark.measure(
+                    "{}, encode".format(label),
+                    lambda: wrapper(page), number=number)
+                decoding = benchmark.measure(
+                    "{}, decode".format(label),
+                    lambda: decode(body), number=number)
+
+                print("{:<50} {:>12.2f} us".format(
+                    "{}, round trip".format(label),
+                    (encoding + decoding) * 1e6))
+                print("{:<50} {:>12} B".format(
+                    "{}, size".format(label), len(body)))
+
+                if baseline is None:
+                    baseline = len(body)
+                else:
+                    print("{:<50} {:>12.2f} x".format(
+                        "{}, size against {}".format(label, formats[0][0]),
+                        len(body) / baseline))
+
+
+if __name__ == '__main__':
+    run()
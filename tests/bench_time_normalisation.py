@@ -0,0 +1,66 @@
+"""Benchmark of parse_into_time (see tests/test_time_normalisation.py), strict
+HH:MM[:SS[:MS]] fast path and verbose form versus regular expressions built
+on every call, which is how it used to be done.
+"""
+import datetime
+import re
+
+from magicarp.tools import datetime_helpers
+
+from . import benchmark
+
+
+def parse_with_search(value):
+    pattern_with_colons = (
+        r'^(?P<hours>\d{2})'
+        r'(:(?P<minutes>\d{2}))'
+        r'(:(?P<seconds>\d{2}))?'
+        r'(:(?P<milliseconds>\d{2}))?$'
+    )
+
+    pattern_verbose = (
+        r'((?=.*?(?P<minutes>\d+)\s*(m(\s|\d|:|$)+|minute(s)*)))?'
+        r'((?=.*?(?P<milliseconds>\d+)\s*(ms(\s|\d|:|$)+|millisecond(s)*)))?'
+        r'((?=.*?(?P<hours>\d+)\s*(h(\s|\d|:|$)+|hour(s)*)))?'
+        r'((?=.*?(?P<seconds>\d+)\s*(s(\s|\d|:|$)+|second(s)*)))?'
+    )
+
+    for pattern in [pattern_with_colons, pattern_verbose]:
+        regexp = re.search(pattern, value)
+
+        if regexp:
+            break
+
+    dct = {}
+
+    for name in ('hours', 'minutes', 'seconds', 'milliseconds'):
+        if regexp.group(name):
+            dct[name] = int(regexp.group(name))
+
+    return datetime.timedelta(**dct)
+
+
+def run(size=1000):
+    print("Parsing {} durations".format(size))
+
+    for label, value in [
+            ('HH:MM', '12:15'),
+            ('HH:MM:SS:MS', '12:15:30:25'),
+            ('verbose', '12h 13m 14s 15ms')]:
+        values = [value] * size
+
+        assert parse_with_search(value) == \
+            datetime_helpers.parse_into_time(value)
+
+        baseline = benchmark.measure(
+            "{}, pattern built on every call".format(label),
+            lambda: [parse_with_search(val) for val in values], number=10)
+        candidate = benchmark.measure(
+            "{}, precompiled".format(label),
+            lambda: [datetime_helpers.parse_into_time(val) for val in values],
+            number=10)
+        benchmark.compare("speed-up", baseline, candidate)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,86 @@
+"""Benchmark of memory (and time) used by populated value tree, full instances
+of fields versus compact nodes (magicarp.schema.compact.FieldValue).
+"""
+import tracemalloc
+
+from magicarp.schema import input_field as field
+
+from . import benchmark
+
+
+class Row(field.SchemaField):
+    fields = (
+        field.IntegerField("uid"),
+        field.StringField("name"),
+        field.BoolField("active"),
+    )
+
+
+def populate(collection_type, payload, compact_values):
+    collection = field.CollectionField(
+        'collection', collection_type, compact_values=compact_values)
+
+    collection.populate(payload)
+
+    return collection
+
+
+def measure_memory(label, func):
+    """Prints memory held by whatever func returns (and peak while doing it).
+    """
+    tracemalloc.start()
+
+    result = func()  # NOQA, keeps result alive while measuring
+
+    current, peak = tracemalloc.get_traced_memory()
+
+    tracemalloc.stop()
+
+    print("{:<50} {:>8.0f} KiB (peak {:.0f} KiB)".format(
+        label, current / 1024, peak / 1024))
+
+    return current
+
+
+def run(size=10000):
+    integers = list(range(size))
+    rows = [
+        {'uid': idx, 'name': 'row {}'.format(idx), 'active': 'yes'}
+        for idx in range(size)
+    ]
+
+    # Row has compact_values unset, so it follows the collection
+    class CompactRow(Row):
+        compact_values = True
+
+    print("Collection of {} elements".format(size))
+
+    for label, collection_type, payload in [
+            ('integers (class)', field.IntegerField, integers),
+            ('integers (instance)', field.IntegerField('uid'), integers),
+            ('rows (schema)', Row, rows)]:
+
+        full = measure_memory(
+            "{}, full instances".format(label),
+            lambda: populate(collection_type, payload, False))
+
+        compact_type = CompactRow if collection_type is Row else \
+            collection_type
+
+        compact = measure_memory(
+            "{}, compact nodes".format(label),
+            lambda: populate(compact_type, payload, True))
+
+        print("{:<50} {:>8.2f} x".format("memory saved", full / compact))
+
+        full = benchmark.measure(
+            "{}, full instances".format(label),
+            lambda: populate(collection_type, payload, False), number=5)
+        compact = benchmark.measure(
+            "{}, compact nodes".format(label),
+            lambda: populate(compact_type, payload, True), number=5)
+        benchmark.compare("speed-up", full, compact)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,24 @@
+"""Helpers for micro-benchmarks kept next to tests (modules bench_*.py).
+
+Benchmarks are not collected by test runner, run them one by one, ie.:
+
+    SETTINGS_MODULE=magicarp.settings.base python -m tests.bench_input_schema
+"""
+import timeit
+
+
+def measure(label, func, number=1000, repeat=5):
+    """Runs func number of times (best of repeat) and prints time per call.
+    Returns time per call in seconds.
+    """
+    best = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+    print("{:<50} {:>12.2f} us".format(label, best * 1e6))
+
+    return best
+
+
+def compare(label, baseline, candidate):
+    """Prints how many times candidate is faster than baseline.
+    """
+    print("{:<50} {:>12.2f} x".format(label, baseline / candidate))
@@ -0,0 +1,42 @@
+from werkzeug.test import EnvironBuilder
+
+from magicarp.tools import api_request
+
+from . import base
+
+
+def make_request(url):
+    return api_request.ApiRequest(EnvironBuilder(path=url).get_environ())
+
+
+class TestApiRequest(base.BaseTest):
+    def test_version_is_parsed_from_path(self):
+        """Name: TestApiRequest.test_version_is_parsed_from_path
+        """
+        request = make_request('/1.0/users/?next=/2.0/orders/')
+
+        self.assertNotIn('api_request', request.__dict__)
+        self.assertEqual(str(request.version), '1.0')
+        self.assertEqual(request.remainder, '/users/')
+        self.assertTrue(request.request_is_versioned(request.path))
+
+    def test_path_without_version(self):
+        """Name: TestApiRequest.test_path_without_version
+        """
+        for url in ('/', '/users/', '/users/1.0/?version=1.0'):
+            request = make_request(url)
+
+            self.assertIsNone(request.version, url)
+            self.assertEqual(request.remainder, url.split('?')[0])
+
+    def test_prefixes_are_remembered(self):
+        """Name: TestApiRequest.test_prefixes_are_remembered
+        """
+        # pylint: disable=protected-access
+        api_request._parse_prefix.cache_clear()
+
+        for url in ('/2/a/', '/2/b/', '/2/c/?d=1', '/3/a/'):
+            self.assertIsNotNone(make_request(url).version)
+
+        self.assertEqual(api_request._parse_prefix.cache_info().misses, 2)
+        self.assertEqual(api_request._parse_prefix.cache_info().hits, 2)
@@ -0,0 +1,191 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+import flask
+
+from magicarp import endpoint, envelope, signals, tools
+from magicarp.tools import cache, invalidation
+
+from . import base
+from .test_response_cache import FakeRedis
+
+
+class TestCacheInvalidation(base.BaseTest):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_format_tags(self):
+        """Name: TestCacheInvalidation.test_format_tags
+        """
+        self.assertEqual(
+            invalidation.format_tags(
+                ['user:{uid}', 'group:{group}', 'catalogue', 'user:{name}'],
+                {'name': 'john', 'uid': 2}, {'uid': 1}),
+            ['user:1', 'catalogue', 'user:john'])
+
+        self.assertEqual(
+            invalidation.format_tags(['user:{uid}'], [1, 2], {}), [])
+
+    def test_log_is_shared_through_file(self):
+        """Name: TestCacheInvalidation.test_log_is_shared_through_file
+        """
+        path = os.path.join(self.directory, 'invalidation.log')
+
+        first = invalidation.InvalidationLog(path)
+        second = invalidation.InvalidationLog(path)
+
+        self.assertFalse(second.is_stale(['user:1'], 10))
+
+        first.invalidate(['user:1', 'user:2'], when=20)
+
+        self.assertTrue(second.is_stale(['user:1'], 10))
+        self.assertTrue(second.is_stale(['user:3', 'user:2'], 20))
+        self.assertFalse(second.is_stale(['user:1'], 21))
+        self.assertFalse(second.is_stale(['user:3'], 10))
+        self.assertFalse(second.is_stale([], 10))
+
+        # half written line is read once it's complete
+        with open(path, 'ab') as handle:
+            handle.write(b'[30, "user:3"')
+
+        self.assertFalse(second.is_stale(['user:3'], 10))
+
+        with open(path, 'ab') as handle:
+            handle.write(b']\n')
+
+        self.assertTrue(second.is_stale(['user:3'], 10))
+
+        # rotated log is read from the start
+        os.truncate(path, 0)
+        invalidation.InvalidationLog(path).invalidate(['user:4'], when=40)
+
+        self.assertTrue(second.is_stale(['user:4'], 10))
+
+    def test_log_is_pruned_and_compacted(self):
+        """Name: TestCacheInvalidation.test_log_is_pruned_and_compacted
+        """
+        path = os.path.join(self.directory, 'invalidation.log')
+
+        first = invalidation.InvalidationLog(path)
+        second = invalidation.InvalidationLog(path)
+
+        now = time.time()
+
+        with mock.patch.object(invalidation, '_retention', 60):
+            for index in range(100):
+                first.invalidate(['old:{}'.format(index)], when=now - 120)
+
+            first.invalidate(['user:1'], when=now)
+
+            self.assertTrue(second.is_stale(['old:1'], now - 130))
+
+            size = os.path.getsize(path)
+
+            with mock.patch.object(invalidation, 'COMPACT_SIZE', 1024):
+                self.assertTrue(first.is_stale(['user:1'], now))
+
+            # only what is still remembered is kept
+            self.assertEqual(first.invalidated, {'user:1': now})
+            self.assertLess(os.path.getsize(path), size)
+
+            # others read the compacted file from the start
+            first.invalidate(['user:2'], when=now)
+
+            self.assertTrue(second.is_stale(['user:2'], now))
+            self.assertTrue(second.is_stale(['user:1'], now))
+
+            # invalidations older than retention are dropped without file
+            log = invalidation.InvalidationLog()
+            log.invalidate(['user:1'], when=now - 120)
+
+            with mock.patch.object(invalidation, 'PRUNE_INTERVAL', 0):
+                log.invalidate(['user:2'], when=now)
+
+            self.assertEqual(log.invalidated, {'user:2': now})
+
+    def test_shared_backend_is_invalidated(self):
+        """Name: TestCacheInvalidation.test_shared_backend_is_invalidated
+        """
+        client = FakeRedis()
+
+        # cache of other host that shares redis
+        response_cache = cache.ResponseCache(
+            ttl=30, backend=cache.RedisBackend(client))
+        backend = cache.RedisBackend(client)
+
+        app = flask.Flask('test')
+
+        with app.test_request_context('/'):
+            entry = cache.make_entry({'uid': 1}, tags=['user:1'])
+
+            response_cache.store('key', entry)
+
+            self.assertIsNotNone(response_cache.lookup('key'))
+
+            # invalidation of this host
+            backend.invalidate(['user:1'], time.time(), 30)
+
+            self.assertIsNone(response_cache.lookup('key'))
+
+            # stale entry is not stored
+            response_cache.store('key', entry)
+
+            self.assertIsNone(response_cache.get_backend().get('key'))
+
+        self.assertEqual(backend.get_invalidated(['user:2']), 0)
+
+        # backends of caches get invalidations sent as signal
+        invalidation.invalidate('user:2')
+
+        self.assertGreater(backend.get_invalidated(['user:1', 'user:2']), 0)
+
+    def test_writes_invalidate_cached_responses(self):
+        """Name: TestCacheInvalidation.test_writes_invalidate_cached_responses
+        """
+        calls = []
+        sent = []
+
+        class User(endpoint.BaseEndpoint):
+            methods = ['GET', 'PUT']
+
+            cache = tools.cache.ResponseCache(tags=['user:{uid}'])
+            invalidates = ['user:{uid}']
+
+            def action(self, uid):  # pylint: disable=arguments-differ
+                calls.append((self.request.method, uid))
+
+                return {'uid': uid}
+
+        class UpdateUser(User):
+            envelope = envelope.Update()
+
+        app = flask.Flask('test')
+        app.add_url_rule(
+            '/user/<int:uid>', 'user', User(), methods=['GET'])
+        app.add_url_rule(
+            '/user/<int:uid>', 'update_user', UpdateUser(), methods=['PUT'])
+
+        def receiver(sender, tags):  # pylint: disable=unused-argument
+            sent.append(tags)
+
+        signals.cache_invalidated.connect(receiver)
+
+        try:
+            client = app.test_client()
+
+            for method, uid in [
+                    ('get', 1), ('get', 2), ('get', 1), ('put', 1),
+                    ('get', 1), ('get', 2)]:
+                getattr(client, method)('/user/{}'.format(uid))
+        finally:
+            signals.cache_invalidated.disconnect(receiver)
+
+        self.assertEqual(calls, [
+            ('GET', 1), ('GET', 2), ('PUT', 1), ('GET', 1)])
+        self.assertEqual(sent, [('user:1', )])
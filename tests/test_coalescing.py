@@ -0,0 +1,187 @@
+import threading
+import time
+from unittest import mock
+
+import flask
+
+from magicarp import endpoint, exceptions, tools
+from magicarp.tools import coalescing
+
+from . import base
+
+
+class TestCoalescing(base.BaseTest):
+    def make_client(self, waiters, response_cache=None, error=None):
+        calls = []
+        errors = []
+        expected = {'waiters': waiters}
+        single_flight = coalescing.SingleFlight(timeout=5)
+
+        class Product(endpoint.BaseEndpoint):
+            coalesce = single_flight
+            cache = response_cache
+
+            def action(self, uid):  # pylint: disable=arguments-differ
+                calls.append(uid)
+
+                # wait until all other requests wait for this one
+                deadline = time.monotonic() + 5
+
+                while time.monotonic() < deadline and sum(
+                        flight.waiters
+                        for flight in single_flight.flights.values()) < \
+                        expected['waiters']:
+                    time.sleep(0.001)
+
+                if error is not None:
+                    raise error
+
+                return {'uid': uid}
+
+        app = flask.Flask('test')
+        app.add_url_rule('/product/<int:uid>', 'product', Product())
+
+        @app.errorhandler(exceptions.NotFoundError)
+        def not_found(err):  # pylint: disable=unused-variable
+            errors.append(err)
+
+            return str(err), 404
+
+        @app.before_request
+        def user_auth():  # pylint: disable=unused-variable
+            flask.request.user = None
+
+        app.errors = errors
+
+        return app, calls, expected
+
+    def get_concurrently(self, app, count):
+        responses = []
+
+        def get():
+            response = app.test_client().get('/product/1')
+
+            responses.append((response.status_code, response.get_data()))
+
+        threads = [threading.Thread(target=get) for _ in range(count)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        return responses
+
+    def test_concurrent_requests_are_coalesced(self):
+        """Name: TestCoalescing.test_concurrent_requests_are_coalesced
+        """
+        coalescing.reset_metrics()
+
+        app, calls, expected = self.make_client(waiters=4)
+
+        responses = self.get_concurrently(app, 5)
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(len(set(responses)), 1)
+        self.assertEqual(responses[0][0], 200)
+        self.assertEqual(coalescing.get_metrics(), {
+            'product': {'executed': 1, 'coalesced': 4, 'timeouts': 0}})
+
+        # once it's done, next request is handled on its own
+        expected['waiters'] = 0
+
+        app.test_client().get('/product/1')
+
+        self.assertEqual(calls, [1, 1])
+
+    def test_error_is_shared(self):
+        """Name: TestCoalescing.test_error_is_shared
+        """
+        app, calls, _ = self.make_client(
+            waiters=2, error=exceptions.NotFoundError("No product"))
+
+        responses = self.get_concurrently(app, 3)
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(responses, [(404, b'No product')] * 3)
+
+        # every request raised own exception
+        self.assertEqual(len(set(map(id, app.errors))), 3)
+        self.assertTrue(all(
+            isinstance(err, exceptions.NotFoundError) for err in app.errors))
+
+    def test_lone_request_hands_nothing_over(self):
+        """Name: TestCoalescing.test_lone_request_hands_nothing_over
+        """
+        flights = []
+
+        class Flight(coalescing._Flight):  # pylint: disable=protected-access
+            def __init__(self):
+                super().__init__()
+
+                flights.append(self)
+
+        single_flight = coalescing.SingleFlight()
+
+        def fail():
+            raise exceptions.NotFoundError("No product")
+
+        with flask.Flask('test').test_request_context(), \
+                mock.patch.object(coalescing, '_Flight', Flight):
+            self.assertEqual(single_flight.run('key', lambda: 1), 1)
+
+            with self.assertRaises(exceptions.NotFoundError):
+                single_flight.run('key', fail)
+
+        self.assertEqual(single_flight.flights, {})
+        self.assertEqual(len(flights), 2)
+
+        for flight in flights:
+            self.assertEqual(flight.waiters, 0)
+            self.assertIsNone(flight.result)
+            self.assertIsNone(flight.error)
+            self.assertFalse(flight.done.is_set())
+
+    def test_error_is_copied(self):
+        """Name: TestCoalescing.test_error_is_copied
+        """
+        error = exceptions.MultipleValidationError(
+            None, {'name': ['Name cannot be empty']})
+
+        # pylint: disable=protected-access
+        copied = coalescing._copy_error(error)
+
+        self.assertIsNot(copied, error)
+        self.assertIsInstance(copied, exceptions.MultipleValidationError)
+        self.assertEqual(copied.errors, error.errors)
+
+        class Unusual(Exception):
+            def __new__(cls, code, reason):
+                return super().__new__(cls, code, reason)
+
+            def __init__(self, code, reason):
+                super().__init__(reason)
+
+                self.code = code
+
+        copied = coalescing._copy_error(Unusual(1, "Failed"))
+
+        self.assertIsInstance(copied, exceptions.CoalescedRequestError)
+
+    def test_coalescing_with_cache(self):
+        """Name: TestCoalescing.test_coalescing_with_cache
+        """
+        app, calls, _ = self.make_client(
+            waiters=2, response_cache=tools.cache.ResponseCache())
+
+        responses = self.get_concurrently(app, 3)
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(len(set(responses)), 1)
+
+        # response was cached by the request that made it
+        response = app.test_client().get('/product/1')
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(response.get_data(), responses[0][1])
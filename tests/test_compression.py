@@ -0,0 +1,141 @@
+import gzip
+import json
+
+import flask
+
+from simple_settings.utils import settings_stub
+
+from magicarp import endpoint
+from magicarp.tools import compression, helpers
+
+from . import base
+
+
+class Large(endpoint.BaseEndpoint):
+    envelope = None
+
+    def action(self):  # pylint: disable=arguments-differ
+        return flask.jsonify(
+            names=['user {}'.format(idx) for idx in range(500)])
+
+
+class Small(Large):
+    def action(self):  # pylint: disable=arguments-differ
+        return flask.jsonify(name='john')
+
+
+class OptedOut(Large):
+    compress = False
+
+
+class Constant(Large):
+    static_response = True
+
+
+class TestCompression(base.BaseTest):
+    def make_app(self):
+        app = flask.Flask('test')
+        app.json_encoder = helpers.JsonEncoder
+
+        for route in (Large, Small, OptedOut, Constant):
+            app.add_url_rule(
+                '/{}'.format(route.__name__.lower()), route.__name__.lower(),
+                route())
+
+        app.after_request(compression.compress_response)
+
+        return app.test_client()
+
+    @settings_stub(COMPRESSION=True)
+    def test_response_is_compressed(self):
+        """Name: TestCompression.test_response_is_compressed
+        """
+        client = self.make_app()
+
+        plain = client.get('/large')
+
+        self.assertIsNone(plain.content_encoding)
+        self.assertIn('Accept-Encoding', plain.vary)
+
+        response = client.get(
+            '/large', headers={'Accept-Encoding': 'gzip, deflate'})
+
+        self.assertEqual(response.content_encoding, 'gzip')
+        self.assertEqual(response.content_length, len(response.get_data()))
+        self.assertEqual(
+            json.loads(gzip.decompress(response.get_data()).decode()),
+            json.loads(plain.get_data()))
+
+        # server prefers codings in order, client quality wins though
+        response = client.get(
+            '/large', headers={'Accept-Encoding': 'gzip, br, zstd'})
+
+        self.assertEqual(
+            response.content_encoding, compression.get_codings()[0])
+
+        response = client.get('/large', headers={
+            'Accept-Encoding': 'gzip, br;q=0.5, zstd;q=0.5'})
+
+        self.assertEqual(response.content_encoding, 'gzip')
+
+        with settings_stub(COMPRESSION_CODINGS=['gzip']):
+            response = client.get(
+                '/large', headers={'Accept-Encoding': 'br, zstd'})
+
+            self.assertIsNone(response.content_encoding)
+
+    @settings_stub(COMPRESSION=True)
+    def test_response_is_not_compressed(self):
+        """Name: TestCompression.test_response_is_not_compressed
+        """
+        client = self.make_app()
+        headers = {'Accept-Encoding': 'gzip'}
+
+        response = client.get('/small', headers=headers)
+
+        self.assertIsNone(response.content_encoding)
+        self.assertNotIn('Accept-Encoding', response.vary)
+
+        response = client.get('/optedout', headers=headers)
+
+        self.assertIsNone(response.content_encoding)
+
+        with settings_stub(COMPRESSION_MIN_SIZE=0):
+            response = client.get('/small', headers=headers)
+
+            self.assertEqual(response.content_encoding, 'gzip')
+
+        with settings_stub(COMPRESSION=False):
+            response = client.get('/large', headers=headers)
+
+            self.assertIsNone(response.content_encoding)
+
+    @settings_stub(COMPRESSION=True)
+    def test_static_response_is_compressed_once(self):
+        """Name: TestCompression.test_static_response_is_compressed_once
+        """
+        client = self.make_app()
+        headers = {'Accept-Encoding': 'gzip'}
+
+        calls = []
+        compress = compression.CODINGS['gzip']
+
+        def counting(data, level):
+            calls.append(level)
+
+            return compress(data, level)
+
+        compression.CODINGS['gzip'] = counting
+
+        try:
+            with settings_stub(COMPRESSION_LEVELS={'gzip': 9}):
+                responses = [
+                    client.get('/constant', headers=headers) for _ in range(3)]
+
+            client.get('/large', headers=headers)
+        finally:
+            compression.CODINGS['gzip'] = compress
+
+        self.assertEqual(calls, [9, 6])
+        self.assertEqual(
+            responses[0].get_data(), responses[2].get_data())
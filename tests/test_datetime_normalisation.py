@@ -0,0 +1,93 @@
+import datetime
+
+import pytz
+
+from dateutil import parser as date_parser
+from simple_settings import settings
+
+from magicarp.schema import input_field
+from magicarp.tools import datetime_helpers
+
+from . import base
+
+
+class TestDatetimeNormalisation(base.BaseTest):
+    def setUp(self):
+        datetime_helpers.clear_cache()
+
+    def test_strings_match_dateutil(self):
+        """Name: TestDatetimeNormalisation.test_strings_match_dateutil
+        """
+        zone = pytz.timezone(settings.DEFAULT_TIMEZONE)
+
+        for value in [
+                '2018-08-20',
+                '2018-08-20T10:15:30',
+                '2018-08-20T10:15:30.123456',
+                '2018-08-20 10:15:30.5',
+                '2018-08-20T10:15:30Z',
+                '2018-08-20T10:15:30+02:00',
+                '2018-08-20T10:15:30.25-05:30',
+                'Aug 20 2018 10:15',
+                'Mon, 20 Aug 2018 10:15:30 GMT']:
+            expected = date_parser.parse(value)
+
+            if expected.tzinfo is None:
+                expected = expected.replace(tzinfo=pytz.utc).astimezone(zone)
+
+            self.assertEqual(
+                datetime_helpers.parse_into_datetime(value), expected)
+            self.assertEqual(
+                datetime_helpers.parse_into_date(value),
+                date_parser.parse(value).date())
+
+            # second time from cache
+            self.assertEqual(
+                datetime_helpers.parse_into_datetime(value), expected)
+
+    def test_rfc_3339_fallback(self):
+        """Name: TestDatetimeNormalisation.test_rfc_3339_fallback
+        """
+        for value in [
+                '2018-08-20',
+                '2018-08-20T10:15:30.1234567z',
+                '2018-08-20T10:15:30-05:30']:
+            self.assertEqual(
+                datetime_helpers._parse_rfc_3339(value),  # NOQA
+                date_parser.parse(value))
+
+        self.assertIsNone(datetime_helpers._parse_rfc_3339('Aug 20'))  # NOQA
+
+        with self.assertRaises(ValueError):
+            datetime_helpers.parse_into_datetime('2018-13-45')
+
+    def test_native_objects_pass_through(self):
+        """Name: TestDatetimeNormalisation.test_native_objects_pass_through
+        """
+        aware = datetime.datetime(2018, 8, 20, 10, tzinfo=pytz.utc)
+
+        self.assertIs(datetime_helpers.parse_into_datetime(aware), aware)
+
+        naive = datetime.datetime(2018, 8, 20, 10)
+
+        self.assertEqual(
+            datetime_helpers.parse_into_datetime(naive),
+            naive.replace(tzinfo=pytz.utc))
+        self.assertEqual(
+            datetime_helpers.parse_into_datetime(naive.date()),
+            datetime.datetime(2018, 8, 20, tzinfo=pytz.utc))
+        self.assertEqual(
+            datetime_helpers.parse_into_date(aware), datetime.date(2018, 8, 20))
+
+        field = input_field.DateTimeField('created')
+
+        field.populate('2018-08-20T10:00:00Z')
+
+        self.assertEqual(field.data, aware)
+
+    def test_timezone_lookup_is_cached(self):
+        """Name: TestDatetimeNormalisation.test_timezone_lookup_is_cached
+        """
+        self.assertIs(
+            datetime_helpers.get_timezone('Europe/London'),
+            datetime_helpers.get_timezone('Europe/London'))
@@ -0,0 +1,154 @@
+from unittest import mock
+
+import flask
+
+from magicarp import endpoint, envelope, router, tools
+from magicarp.common import logic, openapi, routes
+from magicarp.schema import input_field, output_field
+
+from . import base
+
+
+class NewUser(input_field.SchemaField):
+    required = ['name']
+
+    fields = (
+        input_field.StringField("name", description="Name of user"),
+        input_field.CollectionField(
+            "tags", collection_type=input_field.StringField),
+    )
+
+
+class User(output_field.SchemaField):
+    fields = (
+        output_field.IntegerField("uid"),
+        output_field.StringField("name", allow_blank=False),
+        output_field.DateTimeField("created"),
+    )
+
+
+class GetUser(endpoint.BaseEndpoint):
+    """Returns user.
+    """
+    url = '/users/<int:uid>'
+    name = 'get_user'
+
+    output_schema = User
+
+    def action(self, uid):  # pylint: disable=arguments-differ
+        return {'uid': uid, 'name': 'user'}
+
+
+class CreateUser(endpoint.BaseEndpoint):
+    """Creates user.
+
+    Name has to be unique.
+    """
+    url = '/users'
+    name = 'create_user'
+    methods = ['POST']
+
+    input_schema = NewUser
+    output_schema = User
+
+    envelope = envelope.Create()
+
+    def action(self, input_schema):  # pylint: disable=arguments-differ
+        return {'uid': 1, 'name': input_schema.data['name'].data}
+
+
+def make_app():
+    routing = router.Router()
+
+    routing.register_version(None, [router.Blueprint(
+        'common', '/', routes=[routes.UrlMap, routes.OpenApi])])
+    routing.register_version((1, ), [
+        router.Blueprint('v1', '/', routes=[GetUser, CreateUser])])
+
+    routing.lock()
+
+    app = flask.Flask('test')
+    app.request_class = tools.api_request.ApiRequest
+
+    for blueprint, url_prefix in routing.get_normalised_blueprints():
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
+
+    routes.build_documents(app, routing.get_versions())
+
+    return app
+
+
+class TestDocuments(base.BaseTest):
+    def test_url_map_is_prebuilt(self):
+        """Name: TestDocuments.test_url_map_is_prebuilt
+        """
+        client = make_app().test_client()
+
+        with mock.patch.object(logic, 'get_url_map') as get_url_map:
+            response = client.get('/1/')
+
+            self.assertFalse(get_url_map.called)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'(GET,HEAD,OPTIONS) /1/users/<int:uid>/',
+                      response.get_data())
+
+        etag, _ = response.get_etag()
+
+        response = client.get('/1/', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+
+        # binary formats are rendered on demand
+        response = client.get('/1/', headers={'Accept': 'application/cbor'})
+
+        self.assertEqual(response.mimetype, 'application/cbor')
+
+    def test_openapi_document(self):
+        """Name: TestDocuments.test_openapi_document
+        """
+        document = make_app().test_client().get('/1/openapi/').get_json()
+
+        self.assertEqual(document['info']['version'], '1')
+
+        get_user = document['paths']['/1/users/{uid}/']['get']
+
+        self.assertEqual(get_user['parameters'], [{
+            'name': 'uid', 'in': 'path', 'required': True,
+            'schema': {'type': 'integer'}}])
+
+        content = get_user['responses']['200']['content'][
+            'application/json']['schema']['properties']['content']
+
+        self.assertEqual(content, {'$ref': '#/components/schemas/User'})
+
+        create_user = document['paths']['/1/users/']['post']
+
+        self.assertEqual(create_user['description'],
+                         'Creates user.\n\nName has to be unique.')
+        self.assertIn('201', create_user['responses'])
+        self.assertEqual(
+            create_user['requestBody']['content']['application/json'],
+            {'schema': {'$ref': '#/components/schemas/NewUser'}})
+
+        schemas = document['components']['schemas']
+
+        self.assertEqual(schemas['NewUser']['required'], ['name'])
+        self.assertEqual(schemas['NewUser']['properties']['tags'], {
+            'type': 'array', 'items': {'type': 'string'}, 'nullable': True})
+        self.assertEqual(schemas['User']['properties']['name'],
+                         {'type': 'string'})
+        self.assertEqual(schemas['User']['properties']['created'], {
+            'type': 'string', 'format': 'date-time', 'nullable': True})
+
+    def test_openapi_path(self):
+        """Name: TestDocuments.test_openapi_path
+        """
+        path, parameters = openapi._make_path(  # NOQA
+            '/files/<any(a, b):kind>/<path:name>.<ext>')
+
+        self.assertEqual(path, '/files/{kind}/{name}.{ext}')
+        self.assertEqual(
+            [(param['name'], param['schema']) for param in parameters],
+            [('kind', {'type': 'string'}), ('name', {'type': 'string'}),
+             ('ext', {'type': 'string'})])
@@ -0,0 +1,142 @@
+import datetime
+import json
+
+import flask
+
+from magicarp import common, envelope, exceptions, tools
+
+from . import base
+
+
+class TestEnvelope(base.BaseTest):
+    def make_app(self, **config):
+        app = flask.Flask('test')
+        app.json_encoder = tools.helpers.JsonEncoder
+        app.config.update(config)
+
+        return app
+
+    def test_envelope_matches_jsonify(self):
+        """Name: TestEnvelope.test_envelope_matches_jsonify
+        """
+        schema = common.output_schema.ResourceCreated('resource_created')
+        schema.populate({'message': 'Created', 'uid': 1, 'url': '/user/1'})
+
+        content = {
+            'name': 'zażółć',
+            'created': datetime.datetime(2018, 8, 20, 10, 15),
+            'resource': schema,
+            'tags': [1, None, True],
+        }
+
+        for sort_keys in (True, False):
+            app = self.make_app(JSON_SORT_KEYS=sort_keys)
+
+            with app.test_request_context():
+                flask.request.user = None
+
+                for wrapper, payload in [
+                        (envelope.Read(), content),
+                        (envelope.Create(), envelope.Undefined),
+                        (envelope.RawJson(), content)]:
+                    expected, _ = wrapper.wrap(
+                        payload if wrapper.envelope_type is None else
+                        envelope._base(  # pylint: disable=protected-access
+                            wrapper.envelope_type, payload), wrapper.code)
+
+                    for encoder in tools.serializers.JSON_ENCODERS:
+                        wrapper.encoder = encoder
+
+                        response, code = wrapper(payload)
+
+                        self.assertEqual(code, wrapper.code)
+                        self.assertEqual(response.status_code, wrapper.code)
+                        self.assertEqual(
+                            json.loads(response.get_data()),
+                            json.loads(expected.get_data()))
+                        self.assertEqual(
+                            response.content_length,
+                            len(response.get_data()))
+
+                        if encoder == 'json':
+                            self.assertEqual(
+                                response.get_data(), expected.get_data())
+
+    def test_error_envelope(self):
+        """Name: TestEnvelope.test_error_envelope
+        """
+        with self.make_app().test_request_context():
+            response, code = envelope.Error(400)(
+                exceptions.PayloadError(
+                    error_required_field=[('name', 'Missing required field')]))
+
+            self.assertEqual(code, 400)
+            self.assertEqual(json.loads(response.get_data()), {
+                'success': False,
+                'envelope_type': 'error',
+                'content': {'required_fields': 'name'},
+            })
+
+    def test_pretty_printing_is_left_to_flask(self):
+        """Name: TestEnvelope.test_pretty_printing_is_left_to_flask
+        """
+        app = self.make_app(JSONIFY_PRETTYPRINT_REGULAR=True)
+
+        with app.test_request_context():
+            response, _ = envelope.Read()({'name': 'john'})
+
+            self.assertIn(b'\n  ', response.get_data())
+
+
+    def test_binary_formats_are_negotiated(self):
+        """Name: TestEnvelope.test_binary_formats_are_negotiated
+        """
+        tools.serializers.register_binary_format(
+            ('application/x-test', ),
+            lambda obj: json.dumps(obj, sort_keys=True).encode(),
+            json.loads)
+
+        schema = common.output_schema.ResourceCreated('resource_created')
+        schema.populate({'message': 'Created', 'uid': 1, 'url': '/user/1'})
+
+        expected = {
+            'success': True,
+            'envelope_type': 'read',
+            'content': schema.as_dictionary(),
+        }
+
+        try:
+            app = self.make_app()
+
+            for accept, media_type in [
+                    (None, 'application/json'),
+                    ('*/*', 'application/json'),
+                    ('application/x-test', 'application/x-test'),
+                    ('application/json;q=0.5, application/x-test',
+                     'application/x-test'),
+                    ('application/json, application/x-test;q=0.5',
+                     'application/json')]:
+                headers = {} if accept is None else {'Accept': accept}
+
+                with app.test_request_context(headers=headers):
+                    flask.request.user = None
+
+                    response, _ = envelope.Read()(schema)
+
+                    self.assertEqual(response.mimetype, media_type)
+                    self.assertEqual(
+                        json.loads(response.get_data()), expected)
+                    self.assertIn('Accept', response.vary)
+
+                    # binary format that is not enabled is never picked
+                    response, _ = envelope.Read(binary_formats=[])(schema)
+
+                    self.assertEqual(response.mimetype, 'application/json')
+                    self.assertNotIn('Accept', response.vary)
+
+                    response, _ = envelope.RawJson()(expected)
+
+                    self.assertEqual(response.mimetype, 'application/json')
+        finally:
+            tools.serializers.BINARY_ENCODERS.pop('application/x-test')
+            tools.serializers.BINARY_DECODERS.pop('application/x-test')
@@ -0,0 +1,292 @@
+from magicarp import exceptions, tools
+from magicarp.schema import compact, compiler, input_field as field
+
+from . import base
+
+
+class Address(field.SchemaField):
+    required = ['city']
+
+    fields = (
+        field.StringField("city"),
+        field.StringField("post_code"),
+    )
+
+
+class User(field.SchemaField):
+    required = ['name', 'address']
+
+    fields = (
+        field.StringField("name"),
+        field.IntegerField("age"),
+        Address("address"),
+    )
+
+
+class TestInputSchema(base.BaseTest):
+    def test_plan_is_compiled_once(self):
+        """Name: TestInputSchema.test_plan_is_compiled_once
+        """
+        plan = compiler.get_plan(User('user_1'))
+
+        self.assertIs(plan, compiler.get_plan(User('user_2')))
+
+        self.assertEqual(
+            [entry.name for entry in plan], ['name', 'age', 'address'])
+        self.assertEqual(plan.required, frozenset(['name', 'address']))
+
+    def test_populate_uses_plan(self):
+        """Name: TestInputSchema.test_populate_uses_plan
+        """
+        schema = User('user')
+
+        schema.populate({
+            'name': 'John',
+            'age': '23',
+            'address': {
+                'city': 'London',
+            },
+        })
+
+        output = schema.as_dictionary()
+
+        self.assertEqual(output['age'], 23)
+        self.assertEqual(output['address'], {'city': 'London'})
+
+        with self.assertRaises(exceptions.PayloadError) as ctx:
+            User('user').populate({'age': 23})
+
+        self.assertEqual(
+            ctx.exception.get_errors()['required_fields'], 'name, address')
+
+    def test_required_fields_are_cached(self):
+        """Name: TestInputSchema.test_required_fields_are_cached
+        """
+        required = User('user_1').collect_required_fields()
+
+        self.assertIs(required, User('user_2').collect_required_fields())
+        self.assertEqual(
+            required, {'name': None, 'address': {'city': None}})
+
+        # definition on class stays intact
+        self.assertEqual(User.required, ['name', 'address'])
+
+    def test_payload_is_not_modified(self):
+        """Name: TestInputSchema.test_payload_is_not_modified
+        """
+        payload = {
+            'name': 'John',
+            'address': {
+                'city': 'London',
+            },
+            'nickname': 'Johnny',
+            'surname': 'Doe',
+        }
+
+        with self.assertRaises(exceptions.PayloadError) as ctx:
+            User('user').populate(payload)
+
+        self.assertEqual(
+            ctx.exception.get_errors()['payload_error']['payload'],
+            ['Payload specifies fields that do not exist: nickname, surname'])
+
+        self.assertEqual(
+            list(payload.keys()), ['name', 'address', 'nickname', 'surname'])
+        self.assertEqual(payload['address'], {'city': 'London'})
+
+    def test_compact_values(self):
+        """Name: TestInputSchema.test_compact_values
+        """
+        class Order(field.SchemaField):
+            compact_values = True
+
+            fields = (
+                field.IntegerField(
+                    "uid", validators=[tools.validators.IsPositiveInteger()]),
+                field.StringField("comment"),
+                field.CollectionField(
+                    "products", field.IntegerField, compact_values=True),
+            )
+
+        schema = Order('order')
+
+        schema.populate({'uid': '-1', 'products': ['1', 2]})
+
+        self.assertIsInstance(schema.data['uid'], compact.FieldValue)
+        self.assertEqual(schema.data['uid'].name, 'uid')
+        self.assertFalse(schema.data['comment'].is_set())
+
+        products = schema.data['products'].data
+
+        self.assertIsInstance(products[1], compact.FieldValue)
+        self.assertEqual(products[1].name, 'products - instance - 1')
+
+        self.assertEqual(
+            schema.as_dictionary(), {'uid': -1, 'products': [1, 2]})
+
+        with self.assertRaises(exceptions.MultipleValidationError) as ctx:
+            schema.validate()
+
+        self.assertEqual(list(ctx.exception.errors.keys()), ['uid'])
+
+    def test_compact_collection_is_normalised_in_batch(self):
+        """Name: TestInputSchema.test_compact_collection_is_normalised_in_batch
+        """
+        for collection_type, payload, expected in [
+                (field.IntegerField, ['1', 2, 3.0], [1, 2, 3]),
+                (field.BoolField, ['yes', True, 0, 'N'],
+                 [True, True, False, False]),
+                (field.StringField, [1, 'a'], ['1', 'a'])]:
+            for compact_values in (True, False):
+                collection = field.CollectionField(
+                    'ids', collection_type, compact_values=compact_values)
+
+                collection.populate(payload)
+
+                self.assertEqual(collection.as_dictionary(), expected)
+
+        # full instances are made for elements normalised in batch
+        collection = field.CollectionField(
+            'ids', field.IntegerField, compact_values=False)
+
+        collection.populate(['1', None])
+
+        self.assertIsInstance(collection.data[0], field.IntegerField)
+        self.assertEqual(collection.data[1].name, 'ids - instance - 1')
+        self.assertEqual(collection.as_dictionary(), [1, None])
+
+        expected = []
+
+        for idx, value in enumerate(['1', None]):
+            element = collection.make_element(idx)
+            element.populate(value)
+
+            expected.append(element.__dict__)
+
+        self.assertEqual(
+            [element.__dict__ for element in collection.data], expected)
+
+        with self.assertRaises(exceptions.InvalidPayloadError) as ctx:
+            collection.populate(['1', 'one', 3, 'four'])
+
+        self.assertIn('indexes: 1, 3', str(ctx.exception))
+
+        collection = field.CollectionField(
+            'ids', field.IntegerField, compact_values=True)
+
+        collection.populate([1, None, 3])
+
+        self.assertEqual(collection.as_dictionary(), [1, None, 3])
+
+        collection = field.CollectionField(
+            'ids', field.IntegerField('uid', allow_blank=False),
+            compact_values=True)
+
+        with self.assertRaises(exceptions.InvalidPayloadError) as ctx:
+            collection.populate([1, 'one', 3, None, 'five'])
+
+        self.assertIn('indexes: 1, 3, 4', str(ctx.exception))
+
+    def test_codegen_is_equivalent_to_plan(self):
+        """Name: TestInputSchema.test_codegen_is_equivalent_to_plan
+        """
+        def make(codegen, compact_values):
+            class Order(field.SchemaField):
+                required = ['uid', 'user']
+
+                fields = (
+                    field.IntegerField(
+                        "uid",
+                        validators=[tools.validators.IsPositiveInteger()]),
+                    field.BoolField("paid"),
+                    field.StringField("comment"),
+                    User("user"),
+                    field.CollectionField("products", field.IntegerField),
+                )
+
+            Order.codegen = codegen
+            Order.compact_values = compact_values
+
+            return Order
+
+        payloads = [
+            {'uid': '3', 'paid': 'yes', 'user': {
+                'name': 'John', 'address': {'city': 'London'}},
+             'products': ['1', 2]},
+            {'uid': 'three', 'paid': 'maybe', 'products': 1, 'surname': 1},
+            {'uid': -1, 'user': {'name': 'John', 'address': {'city': 'X'}}},
+        ]
+
+        for compact_values in (False, True):
+            plain, generated = [
+                make(codegen, compact_values) for codegen in (False, True)]
+
+            self.assertIsNone(compiler.get_plan(plain('order')).generated)
+            self.assertIsNotNone(
+                compiler.get_plan(generated('order')).generated)
+
+            for payload in payloads:
+                results = []
+
+                for schema_cls in (plain, generated):
+                    schema = schema_cls('order')
+
+                    try:
+                        schema.populate(payload)
+                        schema.validate()
+                    except exceptions.PayloadError as err:
+                        results.append(err.get_errors())
+                    except exceptions.MultipleValidationError as err:
+                        results.append(err.errors)
+                    else:
+                        results.append(schema.as_dictionary())
+
+                self.assertEqual(results[0], results[1])
+
+    def test_plan_follows_instance(self):
+        """Name: TestInputSchema.test_plan_follows_instance
+        """
+        compact_user = User('user', compact_values=True)
+        full = User('user', compact_values=False)
+
+        self.assertIsNot(
+            compiler.get_plan(compact_user), compiler.get_plan(full))
+
+        for schema, node_cls in [
+                (compact_user, compact.FieldValue),
+                (full, field.StringField)]:
+            schema.populate({'name': 'John', 'address': {'city': 'London'}})
+
+            self.assertIsInstance(schema.data['name'], node_cls)
+
+    def test_missing_compact_fields_are_not_shared(self):
+        """Name: TestInputSchema.test_missing_compact_fields_are_not_shared
+        """
+        class Person(field.SchemaField):
+            compact_values = True
+
+            fields = (
+                field.StringField("name"),
+                field.IntegerField("age"),
+            )
+
+        for codegen in (False, True):
+            Person.codegen = codegen
+
+            # flags of schema are resolved once its plan is compiled
+            compiler.clear_cache()
+
+            first, second = Person('person'), Person('person')
+
+            first.populate({'name': 'John'})
+            second.populate({'name': 'Jane'})
+
+            first.data['age'].populate(30)
+
+            self.assertEqual(first.data['age'].as_dictionary(), 30)
+            self.assertFalse(second.data['age'].is_set())
+
+            third = Person('person')
+            third.populate({'name': 'Jim'})
+
+            self.assertFalse(third.data['age'].is_set())
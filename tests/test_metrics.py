@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import flask
+
+from simple_settings.utils import settings_stub
+
+from magicarp import endpoint
+from magicarp.tools import metrics
+
+from . import base
+
+
+class Echo(endpoint.BaseEndpoint):
+    name = 'echo'
+    methods = ['POST']
+
+    def action(self):  # pylint: disable=arguments-differ
+        return self.request.get_data(as_text=True)
+
+
+class TestMetrics(base.BaseTest):
+    def setUp(self):
+        super().setUp()
+
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+        super().tearDown()
+
+    def make_client(self):
+        app = flask.Flask('test')
+        app.add_url_rule('/echo', 'echo', Echo(), methods=['POST'])
+        app.before_request(metrics.start_request)
+        app.after_request(metrics.record_response)
+
+        @app.before_request
+        def user_auth():  # pylint: disable=unused-variable
+            flask.request.user = None
+
+        return app.test_client()
+
+    def test_file_store(self):
+        """Name: TestMetrics.test_file_store
+        """
+        first = metrics.FileStore(os.path.join(self.directory, 'metrics_1.db'))
+        second = metrics.FileStore(
+            os.path.join(self.directory, 'metrics_2.db'))
+
+        # more than fits into initial size of the file
+        keys = [('requests_total', str(index), '', '200')
+                for index in range(metrics.INITIAL_FILE_SIZE // 32)]
+
+        first.update([(key, 1.0) for key in keys])
+        first.update([(keys[0], 2.5)])
+        second.update([(keys[0], 1.0)])
+
+        self.assertEqual(first.read()[keys[0]], 3.5)
+        self.assertEqual(
+            metrics.read_file(first.path), first.read())
+
+        values = metrics.read_directory(self.directory)
+
+        self.assertEqual(len(values), len(keys))
+        self.assertEqual(values[keys[0]], 4.5)
+
+        # store of the same process (id reused) continues where it stopped
+        reopened = metrics.FileStore(first.path)
+        reopened.update([(keys[1], 1.0)])
+
+        self.assertEqual(reopened.read()[keys[1]], 2.0)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "fork is not available")
+    def test_processes_are_aggregated(self):
+        """Name: TestMetrics.test_processes_are_aggregated
+        """
+        key = ('requests_total', 'echo', '', '200')
+
+        with settings_stub(METRICS_DIRECTORY=self.directory):
+            metrics.get_store().update([(key, 1.0)])
+
+            pid = os.fork()
+
+            if pid == 0:  # pragma: no cover
+                metrics.get_store().update([(key, 2.0)])
+
+                os._exit(0)  # pylint: disable=protected-access
+
+            os.waitpid(pid, 0)
+
+            self.assertEqual(metrics.collect()[key], 3.0)
+
+    def test_requests_are_recorded(self):
+        """Name: TestMetrics.test_requests_are_recorded
+        """
+        with settings_stub(METRICS_DIRECTORY=self.directory):
+            client = self.make_client()
+
+            client.post('/echo', data='a' * 150)
+            client.post('/echo', data='b')
+            client.get('/echo')
+
+            text = metrics.render(metrics.collect())
+
+        for line in [
+                'magicarp_requests_total'
+                '{endpoint="echo",version="",status="200"} 2',
+                # method was not allowed, no endpoint was matched
+                'magicarp_request_errors_total'
+                '{endpoint="",version="",status="405"} 1',
+                'magicarp_request_size_bytes_bucket'
+                '{endpoint="echo",version="",le="100"} 1',
+                'magicarp_request_size_bytes_bucket'
+                '{endpoint="echo",version="",le="1000"} 2',
+                'magicarp_request_size_bytes_sum'
+                '{endpoint="echo",version=""} 151',
+                'magicarp_request_duration_seconds_count'
+                '{endpoint="echo",version=""} 2',
+                'magicarp_request_duration_seconds_bucket'
+                '{endpoint="echo",version="",le="+Inf"} 2']:
+            self.assertIn(line + '\n', text)
@@ -1,5 +1,7 @@
-from magicarp import common
-from magicarp.schema import output_field as field
+import flask
+
+from magicarp import common, tools
+from magicarp.schema import output_field as field, serializer
 
 from . import base
 
@@ -245,3 +247,83 @@ class TestOutputSchema(base.BaseTest):
         self.assertEqual(
             output[1]['red']['starting_position'],
             payload[1]['red']['starting_position'])
+
+    def test_serializer_matches_as_dictionary(self):
+        """Name: TestOutputSchema.test_serializer_matches_as_dictionary
+        """
+        class Secret(field.StringField):
+            def as_dictionary(self, user=None):
+                return '***'
+
+        class Row(field.SchemaField):
+            fields = (
+                field.IntegerField("uid"),
+                field.StringField("name"),
+                field.BoolField("active"),
+                field.DateTimeField("created"),
+                Secret("password"),
+                field.CollectionField("tags", field.StringField),
+                field.DocumentField("extra"),
+            )
+
+        def make_page(compact_values):
+            row_cls = type('Row', (Row, ), {'compact_values': compact_values})
+
+            return type('Page', (field.SchemaField, ), {'fields': (
+                field.IntegerField("total"),
+                field.CollectionField("rows", row_cls),
+                field.StringField("next"),
+            )})
+
+        payload = {
+            'total': 2,
+            'rows': [{
+                'uid': '1', 'name': 'zażółć "gęślą"', 'active': 'yes',
+                'created': '2018-08-20T10:15:00Z', 'password': 'secret',
+                'tags': ['a', 1], 'extra': {'b': 1, 'a': [None]},
+            }, {
+                'uid': 2, 'name': None, 'active': False,
+            }],
+        }
+
+        for compact_values in (False, True):
+            schema = make_page(compact_values)('page')
+            schema.populate(payload)
+
+            self.assertEqual(
+                schema.data['rows'].data[0].data['uid'].__class__ is
+                field.IntegerField, not compact_values)
+
+            for sort_keys in (True, False):
+                for as_ascii in (True, False):
+                    app = flask.Flask('test')
+                    app.json_encoder = tools.helpers.JsonEncoder
+                    app.config.update(
+                        JSON_SORT_KEYS=sort_keys, JSON_AS_ASCII=as_ascii)
+
+                    with app.app_context():
+                        self.assertEqual(
+                            serializer.serialize(schema),
+                            flask.json.dumps(
+                                schema.as_dictionary(),
+                                separators=(',', ':')).encode('utf-8'))
+
+    def test_serializer_encodes_keys_as_configured(self):
+        """Name: TestOutputSchema.test_serializer_encodes_keys_as_configured
+        """
+        class User(field.SchemaField):
+            fields = (field.StringField("imię"), )
+
+        schema = User('user')
+        schema.populate({'imię': 'żaba'})
+
+        for as_ascii in (True, False, True):
+            app = flask.Flask('test')
+            app.config.update(JSON_AS_ASCII=as_ascii)
+
+            with app.app_context():
+                self.assertEqual(
+                    serializer.serialize(schema),
+                    flask.json.dumps(
+                        schema.as_dictionary(),
+                        separators=(',', ':')).encode('utf-8'))
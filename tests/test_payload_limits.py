@@ -0,0 +1,212 @@
+import io
+from unittest import mock
+
+import flask
+
+from simple_settings.utils import settings_stub
+
+from werkzeug.datastructures import CombinedMultiDict, MultiDict
+from werkzeug.test import EnvironBuilder
+
+from magicarp import endpoint, exceptions, tools
+from magicarp.schema import input_field as field
+
+from . import base
+
+
+class Node(field.SchemaField):
+    fields = (
+        field.StringField("name"),
+        field.CollectionField("tags", field.StringField),
+    )
+
+
+# schema that can nest itself
+Node.fields += (field.CollectionField("children", Node), )
+
+
+class TestPayloadLimits(base.BaseTest):
+    def make_limits(self, **kwargs):
+        return tools.limits.PayloadLimits(**kwargs)
+
+    def assertExceeded(self, func, *args, **kwargs):
+        with self.assertRaises(exceptions.PayloadError) as ctx:
+            func(*args, **kwargs)
+
+        return ctx.exception.get_errors()['payload_error']['payload'][0]
+
+    def test_form_limits(self):
+        """Name: TestPayloadLimits.test_form_limits
+        """
+        payload = CombinedMultiDict([MultiDict([
+            ('user[{}].name'.format(idx), 'john') for idx in range(20)
+        ])])
+
+        result = tools.helpers.to_json(
+            payload, limits=self.make_limits(
+                max_depth=3, max_keys=20, max_collection_elements=20))
+
+        self.assertEqual(len(result['user']), 20)
+
+        message = self.assertExceeded(
+            tools.helpers.to_json, payload,
+            limits=self.make_limits(max_keys=10))
+        self.assertIn('too many keys', message)
+
+        message = self.assertExceeded(
+            tools.helpers.to_json, payload,
+            limits=self.make_limits(max_depth=2))
+        self.assertIn('nested too deep', message)
+
+        message = self.assertExceeded(
+            tools.helpers.to_json, payload,
+            limits=self.make_limits(max_collection_elements=10))
+        self.assertIn('user[10].name', message)
+
+        payload = CombinedMultiDict([MultiDict([
+            ('tag[]', str(idx)) for idx in range(20)
+        ])])
+
+        self.assertExceeded(
+            tools.helpers.to_json, payload,
+            limits=self.make_limits(max_collection_elements=10))
+
+    def test_schema_limits(self):
+        """Name: TestPayloadLimits.test_schema_limits
+        """
+        payload = {
+            'name': 'root',
+            'children': [{'name': 'child', 'children': [{'name': 'leaf'}]}],
+        }
+
+        schema = Node('node')
+        schema.limits = self.make_limits(max_depth=5, max_keys=5)
+        schema.populate(payload)
+
+        self.assertEqual(
+            schema.as_dictionary()['children'][0]['children'][0]['name'],
+            'leaf')
+
+        for limits, expected in [
+                (self.make_limits(max_depth=4), 'nested too deep'),
+                (self.make_limits(max_keys=4), 'too many keys')]:
+            schema = Node('node')
+            schema.limits = limits
+
+            self.assertIn(
+                expected, self.assertExceeded(schema.populate, payload))
+
+        schema = Node('node')
+        schema.limits = self.make_limits(max_collection_elements=2)
+
+        self.assertIn(
+            'at tags', self.assertExceeded(
+                schema.populate, {'tags': ['a', 'b', 'c']}))
+
+    def test_endpoint_limits(self):
+        """Name: TestPayloadLimits.test_endpoint_limits
+        """
+        class Create(endpoint.BaseEndpoint):
+            max_body_bytes = 10
+            max_keys = 0
+
+        app = flask.Flask('test')
+
+        with app.test_request_context(
+                method='POST', data={'name': 'john'}):
+            self.assertEqual(Create().get_payload(), {'name': 'john'})
+
+        with app.test_request_context(
+                method='POST', data={'name': 'john' * 10}):
+            self.assertIn(
+                'too large', self.assertExceeded(Create().get_payload))
+
+        limits = Create().get_limits()
+
+        self.assertEqual(limits.max_body_bytes, 10)
+        self.assertEqual(limits.max_keys, 0)
+        self.assertEqual(limits.max_depth, 32)
+
+    def test_body_of_unknown_size(self):
+        """Name: TestPayloadLimits.test_body_of_unknown_size
+        """
+        class Create(endpoint.BaseEndpoint):
+            max_body_bytes = 20
+
+        app = flask.Flask('test')
+
+        def make_context(body, content_type):
+            environ = EnvironBuilder(
+                method='POST', input_stream=io.BytesIO(body),
+                content_type=content_type).get_environ()
+
+            # chunked body, there is no Content-Length
+            del environ['CONTENT_LENGTH']
+            environ['wsgi.input_terminated'] = True
+
+            return app.request_context(environ)
+
+        for content_type, small, large in [
+                ('application/json', b'{"name": "john"}',
+                 b'{"name": "' + b'john' * 10 + b'"}'),
+                ('application/x-www-form-urlencoded', b'name=john',
+                 b'name=' + b'john' * 10)]:
+            with make_context(small, content_type):
+                self.assertIsNone(flask.request.content_length)
+                self.assertEqual(Create().get_payload(), {'name': 'john'})
+                # body is still there for anyone else
+                self.assertEqual(flask.request.get_data(), small)
+
+            with make_context(large, content_type):
+                self.assertIn(
+                    'too large', self.assertExceeded(Create().get_payload))
+
+                # body was not read past the limit
+                self.assertEqual(
+                    len(flask.request.stream.read()), len(large) - 21)
+
+    def test_deep_json(self):
+        """Name: TestPayloadLimits.test_deep_json
+        """
+        with self.assertRaises(exceptions.InvalidPayloadError):
+            tools.serializers.decode_json(b'[' * 100000, decoder='json')
+
+    def test_limits_are_made_once(self):
+        """Name: TestPayloadLimits.test_limits_are_made_once
+        """
+        class Read(endpoint.BaseEndpoint):
+            input_schema = Node
+
+            def action(self, input_schema):  # pylint: disable=arguments-differ
+                return input_schema.data['name'].data
+
+        app = flask.Flask('test')
+        app.add_url_rule('/node', 'node', Read())
+
+        limits_cls = tools.limits.PayloadLimits
+
+        with mock.patch.object(
+                limits_cls, 'from_settings',
+                wraps=limits_cls.from_settings) as from_settings, \
+                mock.patch.object(limits_cls, 'read_body') as read_body:
+            response = app.test_client().get('/node?name=john')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(from_settings.call_count, 1)
+
+        # bodyless request is never read
+        read_body.assert_not_called()
+
+    def test_defaults_are_loaded(self):
+        """Name: TestPayloadLimits.test_defaults_are_loaded
+        """
+        with mock.patch.object(tools.limits, '_defaults', None):
+            with settings_stub(PAYLOAD_MAX_DEPTH=3):
+                self.assertEqual(
+                    tools.limits.PayloadLimits.from_settings().max_depth, 3)
+
+                tools.limits.load_defaults()
+
+            # settings are not read anymore
+            self.assertEqual(
+                tools.limits.PayloadLimits.from_settings().max_depth, 3)
@@ -0,0 +1,119 @@
+import os
+import pstats
+import shutil
+import tempfile
+from unittest import mock
+
+import flask
+
+from simple_settings.utils import settings_stub
+
+from magicarp import endpoint, server_factory
+from magicarp.tools import compression, metrics, profiling, timing
+
+from . import base
+
+
+class Echo(endpoint.BaseEndpoint):
+    name = 'echo'
+    methods = ['POST']
+
+    def action(self):  # pylint: disable=arguments-differ
+        return self.request.get_data(as_text=True)
+
+
+def make_client():
+    app = flask.Flask('test')
+    app.add_url_rule('/echo', 'echo', Echo(), methods=['POST'])
+    app.before_request(profiling.start_profiling)
+    app.after_request(profiling.finish_profiling)
+    app.teardown_request(profiling.teardown_profiling)
+
+    @app.before_request
+    def user_auth():  # pylint: disable=unused-variable
+        flask.request.user = None
+
+    return app.test_client()
+
+
+class TestProfiling(base.BaseTest):
+    def setUp(self):
+        super().setUp()
+
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+        super().tearDown()
+
+    def test_secret_is_required(self):
+        """Name: TestProfiling.test_secret_is_required
+        """
+        client = make_client()
+
+        for secret, headers in [
+                (None, {}),
+                (None, {'X-Magicarp-Profile': ''}),
+                ('secret', {}),
+                ('secret', {'X-Magicarp-Profile': 'wrong'})]:
+            with settings_stub(PROFILING_SECRET=secret):
+                response = client.post('/echo', data='a', headers=headers)
+
+            self.assertEqual(response.mimetype, 'application/json')
+
+    def test_report_is_sent(self):
+        """Name: TestProfiling.test_report_is_sent
+        """
+        with settings_stub(PROFILING_SECRET='secret'):
+            response = make_client().post(
+                '/echo', data='a', headers={'X-Magicarp-Profile': 'secret'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/plain')
+        self.assertIn('function calls', response.get_data(as_text=True))
+        self.assertIn('action', response.get_data(as_text=True))
+
+    def test_report_is_saved(self):
+        """Name: TestProfiling.test_report_is_saved
+        """
+        with settings_stub(
+                PROFILING_SECRET='secret', PROFILING_DIRECTORY=self.directory):
+            response = make_client().post(
+                '/echo', data='a', headers={'X-Magicarp-Profile': 'secret'})
+
+        self.assertEqual(response.mimetype, 'application/json')
+
+        directory = os.path.join(self.directory, 'echo')
+        names = os.listdir(directory)
+
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].endswith('.prof'))
+
+        stats = pstats.Stats(os.path.join(directory, names[0]))
+
+        self.assertTrue(any(
+            function == 'action' for _, _, function in stats.stats))
+
+    def test_hooks_order(self):
+        """Name: TestProfiling.test_hooks_order
+        """
+        app = flask.Flask('test')
+
+        with settings_stub(
+                PROFILING=True, ROUTING_ADD_METRICS=True,
+                SLOW_REQUEST_THRESHOLD=None), \
+                mock.patch.object(timing, '_enabled', False):
+            server_factory._setup(app)  # pylint: disable=protected-access
+
+            # metrics need timings
+            # pylint: disable=protected-access
+            self.assertTrue(timing._enabled)
+
+        # after_request hooks run in reverse order of registration
+        hooks = list(reversed(app.after_request_funcs[None]))
+
+        self.assertLess(
+            hooks.index(metrics.record_response),
+            hooks.index(profiling.finish_profiling))
+        self.assertEqual(hooks[-1], compression.compress_response)
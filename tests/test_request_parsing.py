@@ -256,3 +256,79 @@ class TestRequestParsing(base.BaseTest):
 
         with self.assertRaises(exceptions.InvalidPayloadError):
             tools.helpers.to_json(payload)
+
+    def test_multi_digit_indexes(self):
+        """Name: TestRequestParsing.test_multi_digit_indexes
+        """
+        post = MultiDict([
+            ('user[12].name', 'ben'),
+            ('user[2].name', 'josh'),
+            ('user[10].name', 'stefan'),
+            ('tag[101]', 'b'),
+            ('tag[11]', 'a'),
+        ])
+        get = MultiDict([
+        ])
+
+        payload = CombinedMultiDict([get, post])
+
+        result = tools.helpers.to_json(payload)
+
+        self.assertEqual(
+            [user['name'] for user in result['user']],
+            ['josh', 'stefan', 'ben'])
+        self.assertEqual(result['tag'], ['a', 'b'])
+
+    def test_value_and_object_conflict(self):
+        """Name: TestRequestParsing.test_value_and_object_conflict
+        """
+        for items in [
+                [('user', 'sherlock'), ('user.name', 'watson')],
+                [('user.name', 'watson'), ('user', 'sherlock')],
+                [('user', 'sherlock'), ('user[0]', 'watson')],
+                [('user.', 'watson')]]:
+            payload = CombinedMultiDict([MultiDict(items)])
+
+            with self.assertRaises(exceptions.InvalidPayloadError):
+                tools.helpers.to_json(payload)
+
+    def test_repeated_values_and_array(self):
+        """Name: TestRequestParsing.test_repeated_values_and_array
+        """
+        for items, expected in [
+                ([('b', '8'), ('b', '5'), ('b[]', '3')], ['8', '5', '3']),
+                ([('b[]', '3'), ('b', '8'), ('b', '5')], ['8', '5', '3']),
+                ([('b', '8'), ('b', '5'), ('b[0]', '3')], ['3', '5']),
+                ([('b[1]', '3'), ('b', '8'), ('b', '5')], ['8', '3'])]:
+            payload = CombinedMultiDict([MultiDict(items)])
+
+            self.assertEqual(
+                tools.helpers.to_json(payload), {'b': expected}, items)
+
+        payload = CombinedMultiDict([MultiDict([
+            ('user[0].tags[]', 'c'), ('user[0].tags', 'a'),
+            ('user[0].tags', 'b')])])
+
+        self.assertEqual(
+            tools.helpers.to_json(payload),
+            {'user': [{'tags': ['a', 'b', 'c']}]})
+
+    def test_repeated_values_and_indexed_paths(self):
+        """Name: TestRequestParsing.test_repeated_values_and_indexed_paths
+        """
+        for items, expected in [
+                ([('a', '6'), ('a', '5'), ('a[1].c', '0')],
+                 {'a': ['6', {'c': '0'}]}),
+                ([('a[1].c', '0'), ('a', '6'), ('a', '5')],
+                 {'a': ['6', {'c': '0'}]}),
+                ([('a', '6'), ('a', '5'), ('a[2].c', '0')],
+                 {'a': ['6', '5', {'c': '0'}]}),
+                ([('a[5]', 'z'), ('a[]', 'x')], {'a': ['x', 'z']}),
+                ([('a[0]', 'y'), ('a[]', 'x')], {'a': ['y']}),
+                ([('u[0].t[1]', 'c'), ('u[0].t', 'a'), ('u[0].t', 'b')],
+                 {'u': [{'t': ['a', 'c']}]}),
+                ([('u[0].t[]', 'c'), ('u[0].t', 'a'), ('u[0].t', 'b')],
+                 {'u': [{'t': ['a', 'b', 'c']}]})]:
+            payload = CombinedMultiDict([MultiDict(items)])
+
+            self.assertEqual(tools.helpers.to_json(payload), expected, items)
@@ -0,0 +1,251 @@
+import fnmatch
+
+import flask
+
+from simple_settings.utils import settings_stub
+
+from magicarp import endpoint
+from magicarp.schema import input_field, output_field as field
+from magicarp.tools import cache, coalescing, helpers
+
+from . import base
+
+
+class Product(field.SchemaField):
+    fields = (
+        field.IntegerField("uid"),
+        field.StringField("name"),
+    )
+
+
+class FakeRedis(object):
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):  # pylint: disable=unused-argument
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match)]
+
+
+class TestResponseCache(base.BaseTest):
+    def make_client(self, response_cache):
+        calls = []
+
+        class GetProduct(endpoint.BaseEndpoint):
+            url = '/product/<int:uid>'
+            output_schema = Product
+            methods = ['GET', 'POST']
+
+            def action(self, uid):  # pylint: disable=arguments-differ
+                calls.append(uid)
+
+                return {
+                    'uid': uid,
+                    'name': self.request.headers.get('Accept-Language', 'en'),
+                }
+
+        GetProduct.cache = response_cache
+
+        app = flask.Flask('test')
+        app.json_encoder = helpers.JsonEncoder
+        app.add_url_rule(
+            '/product/<int:uid>', 'product', GetProduct(),
+            methods=GetProduct.methods)
+
+        @app.before_request
+        def user_auth():  # pylint: disable=unused-variable
+            flask.request.user = None
+
+        return app.test_client(), calls
+
+    def test_response_is_cached(self):
+        """Name: TestResponseCache.test_response_is_cached
+        """
+        client, calls = self.make_client(cache.ResponseCache())
+
+        first = client.get('/product/1')
+        second = client.get('/product/1')
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(first.get_data(), second.get_data())
+        self.assertEqual(second.mimetype, 'application/json')
+        self.assertEqual(first.get_etag(), second.get_etag())
+        self.assertFalse(first.get_etag()[1])
+
+        # arguments of url and payload are part of the key, so is method
+        client.get('/product/2')
+        client.get('/product/1?page=2')
+        client.get('/product/1?page=2')
+        client.post('/product/1')
+
+        self.assertEqual(calls, [1, 2, 1, 1])
+
+        with settings_stub(RESPONSE_CACHE=False):
+            client.get('/product/1')
+
+        self.assertEqual(calls, [1, 2, 1, 1, 1])
+
+    def test_key_is_made_of_normalised_input(self):
+        """Name: TestResponseCache.test_key_is_made_of_normalised_input
+        """
+        calls = []
+
+        class Page(input_field.SchemaField):
+            fields = (
+                input_field.IntegerField("page"),
+            )
+
+        class ListProducts(endpoint.BaseEndpoint):
+            input_schema = Page
+            cache = cache.ResponseCache()
+
+            def action(self, input_schema):  # pylint: disable=arguments-differ
+                page = input_schema.data['page'].data
+
+                calls.append(page)
+
+                return page
+
+        app = flask.Flask('test')
+        app.add_url_rule('/products', 'products', ListProducts())
+
+        @app.before_request
+        def user_auth():  # pylint: disable=unused-variable
+            flask.request.user = None
+
+        client = app.test_client()
+
+        for query in ('page=1', 'page=01', 'page=1', 'page=2'):
+            self.assertEqual(
+                client.get('/products?' + query).get_json()['content'],
+                int(query[5:]))
+
+        self.assertEqual(calls, [1, 2])
+
+    def test_set_cookie_is_not_shared(self):
+        """Name: TestResponseCache.test_set_cookie_is_not_shared
+        """
+        for response_cache, single_flight in [
+                (cache.ResponseCache(), None),
+                (None, coalescing.SingleFlight())]:
+            class Session(endpoint.BaseEndpoint):
+                coalesce = single_flight
+
+                def action(self):  # pylint: disable=arguments-differ
+                    return 'ok'
+
+                def post_action(self, result):
+                    response = flask.current_app.make_response(result)
+                    response.set_cookie('session', 'secret')
+
+                    return response
+
+            Session.cache = response_cache
+
+            app = flask.Flask('test')
+            app.add_url_rule('/session', 'session', Session())
+
+            @app.before_request
+            def user_auth():  # pylint: disable=unused-variable
+                flask.request.user = None
+
+            client = app.test_client()
+
+            # request that made the response keeps its cookie
+            response = client.get('/session')
+
+            self.assertIn('session=secret', response.headers['Set-Cookie'])
+
+            if response_cache is not None:
+                self.assertIsNotNone(response.get_etag()[0])
+
+                # cached copy does not have it
+                response = client.get('/session')
+
+                self.assertNotIn('Set-Cookie', response.headers)
+                self.assertEqual(response.get_json()['content'], 'ok')
+
+    def test_if_none_match_is_answered_with_304(self):
+        """Name: TestResponseCache.test_if_none_match_is_answered_with_304
+        """
+        client, calls = self.make_client(cache.ResponseCache())
+
+        etag, _ = client.get('/product/1').get_etag()
+
+        for if_none_match in (
+                '"{}"'.format(etag), '"other", "{}-gzip"'.format(etag), '*'):
+            response = client.get(
+                '/product/1', headers={'If-None-Match': if_none_match})
+
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.get_data(), b'')
+
+        response = client.get(
+            '/product/1', headers={'If-None-Match': '"other"'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(calls, [1])
+
+    def test_vary_headers(self):
+        """Name: TestResponseCache.test_vary_headers
+        """
+        client, calls = self.make_client(
+            cache.ResponseCache(vary_headers=['Accept-Language']))
+
+        for language in ('en', 'pl', 'en'):
+            response = client.get(
+                '/product/1', headers={'Accept-Language': language})
+
+            self.assertIn(language.encode(), response.get_data())
+            self.assertIn('Accept-Language', response.vary)
+
+        self.assertEqual(calls, [1, 1])
+
+    def test_local_backend(self):
+        """Name: TestResponseCache.test_local_backend
+        """
+        backend = cache.LocalBackend(max_entries=2)
+        entry = cache.CachedResponse(200, [], b'{}', 'etag', [], 0)
+
+        backend.set('a', entry, 60)
+        backend.set('b', entry, 60)
+        backend.get('a')
+        backend.set('c', entry, 60)
+
+        # b was least recently used
+        self.assertIsNone(backend.get('b'))
+        self.assertIs(backend.get('a'), entry)
+
+        backend.set('d', entry, -1)
+
+        self.assertIsNone(backend.get('d'))
+
+    def test_shared_backend(self):
+        """Name: TestResponseCache.test_shared_backend
+        """
+        redis = FakeRedis()
+
+        first, calls = self.make_client(
+            cache.ResponseCache(backend=cache.RedisBackend(redis)))
+        second, second_calls = self.make_client(
+            cache.ResponseCache(backend=cache.RedisBackend(redis)))
+
+        expected = first.get('/product/1')
+        response = second.get('/product/1')
+
+        self.assertEqual((calls, second_calls), ([1], []))
+        self.assertEqual(response.get_data(), expected.get_data())
+        self.assertEqual(response.headers['Content-Type'],
+                         expected.headers['Content-Type'])
+
+        cache.RedisBackend(redis).clear()
+
+        self.assertEqual(redis.data, {})
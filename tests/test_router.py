@@ -0,0 +1,164 @@
+import flask
+
+from magicarp import endpoint, router
+
+from . import base
+
+
+class Read(endpoint.BaseEndpoint):
+    url = '/read'
+    name = 'read'
+
+    def action(self):  # pylint: disable=arguments-differ
+        return 'read 1'
+
+
+class ReadV2(Read):
+    def action(self):  # pylint: disable=arguments-differ
+        return 'read 2'
+
+
+class Write(endpoint.BaseEndpoint):
+    url = '/write/<int:uid>'
+    name = 'write'
+    methods = ['POST']
+
+    def action(self, uid):  # pylint: disable=arguments-differ
+        return 'write {}'.format(uid)
+
+
+class Common(endpoint.BaseEndpoint):
+    url = '/common'
+    name = 'common'
+
+    def action(self):  # pylint: disable=arguments-differ
+        return 'common'
+
+
+class Users(endpoint.BaseEndpoint):
+    url = '/list'
+    name = 'users'
+
+    def action(self):  # pylint: disable=arguments-differ
+        return 'users'
+
+
+def make_router():
+    routing = router.Router()
+
+    routing.register_version(None, [
+        router.Blueprint('common', '/', routes=[Common])])
+    routing.register_version((1, ), [
+        router.Blueprint('v1', '/', routes=[Read, Write]),
+        router.Blueprint('v1_users', '/users', routes=[Users])])
+    routing.register_version((2, ), [
+        router.Blueprint('v2', '/', routes=[ReadV2]).exclude([Write]),
+        router.Blueprint('v2_users', '/users')])
+    routing.register_version((2, 1), [
+        router.Blueprint('v2_1', '/', routes=[Write])])
+    routing.register_version((3, ), [
+        router.Blueprint('v3_users', '/users').exclude([Users])])
+
+    routing.lock()
+
+    return routing
+
+
+def make_app(dispatcher):
+    app = flask.Flask('test')
+    routing = make_router()
+
+    if dispatcher:
+        app.url_map.converters[router.VERSION_ARGUMENT] = \
+            router.VersionConverter
+
+        for rule, name, view, methods in routing.get_dispatchers():
+            app.add_url_rule(rule, name, view, methods=methods)
+    else:
+        for blueprint, url_prefix in routing.get_normalised_blueprints():
+            app.register_blueprint(blueprint, url_prefix=url_prefix)
+
+    return app
+
+
+def get_allowed(response):
+    return set(response.allow) or None
+
+
+class TestRouter(base.BaseTest):
+    def test_dispatcher_matches_normalised_blueprints(self):
+        """Name: TestRouter.test_dispatcher_matches_normalised_blueprints
+        """
+        cloned, dispatched = make_app(False), make_app(True)
+
+        self.assertLess(
+            len(list(dispatched.url_map.iter_rules())),
+            len(list(cloned.url_map.iter_rules())))
+
+        requests = [
+            (method, '{}{}'.format(prefix, url))
+            for prefix in ('', '/1', '/2', '/2.1', '/3')
+            for url in (
+                '/read/', '/write/1/', '/common/', '/users/list/',
+                '/missing/')
+            for method in ('GET', 'POST')]
+
+        for method, url in requests:
+            expected = cloned.test_client().open(url, method=method)
+            response = dispatched.test_client().open(url, method=method)
+
+            # method no version of the path allows is answered by routing,
+            # even for versions without the path
+            if expected.status_code == 404 and response.status_code == 405:
+                self.assertNotIn(method, get_allowed(response))
+
+                continue
+
+            self.assertEqual(
+                (response.status_code, response.get_data(),
+                 get_allowed(response)),
+                (expected.status_code, expected.get_data(),
+                 get_allowed(expected)),
+                "{} {}".format(method, url))
+
+    def test_dispatcher_methods(self):
+        """Name: TestRouter.test_dispatcher_methods
+        """
+        client = make_app(True).test_client()
+
+        for url, allowed in [
+                ('/1/read/', {'GET', 'HEAD', 'OPTIONS'}),
+                ('/2.1/write/1/', {'OPTIONS', 'POST'}),
+                ('/common/', {'GET', 'HEAD', 'OPTIONS'})]:
+            response = client.open(url, method='OPTIONS')
+
+            self.assertEqual(get_allowed(response), allowed, url)
+
+            response = client.open(url, method='DELETE')
+
+            self.assertEqual(response.status_code, 405, url)
+            self.assertEqual(get_allowed(response), allowed, url)
+
+    def test_latest_version_is_resolved(self):
+        """Name: TestRouter.test_latest_version_is_resolved
+        """
+        client = make_app(True).test_client()
+
+        for url, expected in [
+                ('/1.5/read/', b'read 1'),
+                ('/2.0/read/', b'read 2'),
+                ('/2.0.7/write/1/', None),
+                ('/2.2/write/1/', b'write 1'),
+                ('/2.7/read/', b'read 2'),
+                ('/7/read/', None),
+                ('/2.0.5/users/list/', b'users'),
+                ('/2.5/users/list/', None),
+                ('/3.1/users/list/', None),
+                ('/0.9/read/', None)]:
+            response = client.open(
+                url, method='POST' if 'write' in url else 'GET')
+
+            if expected is None:
+                self.assertEqual(response.status_code, 404, url)
+            else:
+                self.assertIn(expected, response.get_data(), url)
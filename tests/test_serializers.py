@@ -0,0 +1,128 @@
+import json
+
+import flask
+
+from magicarp import endpoint, exceptions
+from magicarp.tools import serializers
+
+from . import base
+
+
+class TestSerializers(base.BaseTest):
+    def test_parse_media_type(self):
+        """Name: TestSerializers.test_parse_media_type
+        """
+        self.assertEqual(
+            serializers.parse_media_type('Application/JSON; charset=UTF-8'),
+            ('application/json', {'charset': 'UTF-8'}))
+        self.assertEqual(serializers.parse_media_type(None), ('', {}))
+
+        self.assertTrue(serializers.is_json('application/json'))
+        self.assertTrue(serializers.is_json('application/vnd.api+json'))
+        self.assertFalse(serializers.is_json('text/json+plain'))
+        self.assertFalse(serializers.is_json('multipart/form-data'))
+
+    def test_json_decoders(self):
+        """Name: TestSerializers.test_json_decoders
+        """
+        payload = {'name': 'zażółć', 'tags': [1, 2.5, None, True]}
+
+        for name in serializers.JSON_DECODERS:
+            for charset in ('utf-8', 'utf-16'):
+                self.assertEqual(
+                    serializers.decode_json(
+                        json.dumps(payload).encode(charset), charset, name),
+                    payload)
+
+            with self.assertRaises(exceptions.InvalidPayloadError):
+                serializers.decode_json(b'{"name": ', None, name)
+
+        # same as flask's get_json
+        with self.assertRaises(exceptions.InvalidPayloadError):
+            serializers.decode_json(b'', None, 'json')
+
+        with self.assertRaises(ValueError):
+            serializers.get_json_decoder('unknown')
+
+    def test_endpoint_decodes_json_with_parameters(self):
+        """Name: TestSerializers.test_endpoint_decodes_json_with_parameters
+        """
+        calls = []
+
+        def decoder(data, charset):
+            calls.append((data, charset))
+
+            return json.loads(data.decode(charset))
+
+        class Create(endpoint.BaseEndpoint):
+            json_decoder = staticmethod(decoder)
+
+        app = flask.Flask('test')
+
+        with app.test_request_context(
+                method='POST', data=b'{"name": "john"}',
+                content_type='application/json; charset=UTF-8'):
+            self.assertEqual(Create().get_payload(), {'name': 'john'})
+
+        self.assertEqual(calls, [(b'{"name": "john"}', 'utf-8')])
+
+    def test_json_encoders(self):
+        """Name: TestSerializers.test_json_encoders
+        """
+        # orjson is not a drop-in replacement, it has to be asked for
+        self.assertIs(
+            serializers.get_json_encoder(), serializers.JSON_ENCODERS['json'])
+
+        payload = {'big': 2 ** 70, 'tags': [1, 2.5, None]}
+
+        with flask.Flask('test').app_context():
+            for name, encoder in serializers.JSON_ENCODERS.items():
+                self.assertEqual(json.loads(encoder(payload)), payload, name)
+
+    def test_binary_formats(self):
+        """Name: TestSerializers.test_binary_formats
+        """
+        payload = {'name': 'zażółć', 'tags': [1, 2.5, None, True]}
+
+        with flask.Flask('test').app_context():
+            for media_type in serializers.BINARY_ENCODERS:
+                self.assertEqual(
+                    serializers.decode_binary(
+                        serializers.BINARY_ENCODERS[media_type](payload),
+                        media_type),
+                    payload)
+
+                with self.assertRaises(exceptions.InvalidPayloadError):
+                    serializers.decode_binary(b'\xc1\xff\x00', media_type)
+
+                self.assertEqual(
+                    serializers.decode_binary(b'', media_type), {})
+
+        self.assertFalse(serializers.is_binary('application/msgpack', []))
+        self.assertFalse(serializers.is_binary('application/x-unknown'))
+
+    def test_endpoint_decodes_binary_payload(self):
+        """Name: TestSerializers.test_endpoint_decodes_binary_payload
+        """
+        serializers.register_binary_format(
+            ('application/x-test', ), lambda obj: json.dumps(obj).encode(),
+            lambda data: json.loads(data.decode()))
+
+        try:
+            app = flask.Flask('test')
+
+            for binary_formats, expected in [
+                    (None, {'name': 'john'}),
+                    ([], {})]:
+                class Create(endpoint.BaseEndpoint):
+                    pass
+
+                Create.binary_formats = binary_formats
+
+                with app.test_request_context(
+                        method='POST', data=b'{"name": "john"}',
+                        content_type='application/x-test'):
+                    self.assertEqual(Create().get_payload(), expected)
+        finally:
+            serializers.BINARY_ENCODERS.pop('application/x-test')
+            serializers.BINARY_DECODERS.pop('application/x-test')
@@ -0,0 +1,188 @@
+import json
+import logging
+import logging.config
+from unittest import mock
+
+import flask
+
+from simple_settings.utils import settings_stub
+
+from magicarp import endpoint, signals
+from magicarp.schema import input_field
+from magicarp.tools import limits, slow_requests
+
+from . import base
+
+
+class Item(input_field.SchemaField):
+    fields = (
+        input_field.StringField("name"),
+        input_field.CollectionField(
+            "tags", collection_type=input_field.StringField),
+    )
+
+
+class Order(input_field.SchemaField):
+    fields = (
+        input_field.CollectionField("items", collection_type=Item),
+        input_field.CollectionField(
+            "notes", collection_type=input_field.StringField),
+    )
+
+
+class CreateOrder(endpoint.BaseEndpoint):
+    name = 'create_order'
+    methods = ['POST']
+
+    input_schema = Order
+
+    def action(self, input_schema):  # pylint: disable=arguments-differ
+        return len(input_schema.data['items'].data)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_client():
+    app = flask.Flask('test')
+    app.add_url_rule(
+        '/orders', 'create_order', CreateOrder(), methods=['POST'])
+    app.after_request(slow_requests.log_response)
+
+    @app.before_request
+    def user_auth():  # pylint: disable=unused-variable
+        flask.request.user = None
+
+    return app.test_client()
+
+
+class TestSlowRequests(base.BaseTest):
+    def setUp(self):
+        super().setUp()
+
+        self.handler = ListHandler()
+
+        slow_requests.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        slow_requests.logger.removeHandler(self.handler)
+
+        super().tearDown()
+
+    def test_collections_are_counted(self):
+        """Name: TestSlowRequests.test_collections_are_counted
+        """
+        self.assertIsNone(limits.PayloadLimits().collections)
+
+        with mock.patch.object(limits, '_count_collections', True):
+            payload_limits = limits.PayloadLimits()
+
+        schema = Order('order')
+        schema.limits = payload_limits
+        schema.populate({
+            'items': [
+                {'name': 'a', 'tags': ['x', 'y']},
+                {'name': 'b', 'tags': ['z']},
+                {'name': 'c'},
+            ],
+        })
+
+        self.assertEqual(
+            payload_limits.collections, {'items': 3, 'items[].tags': 3})
+
+    def test_slow_request_is_logged(self):
+        """Name: TestSlowRequests.test_slow_request_is_logged
+        """
+        payload = json.dumps({'items': [{'tags': ['x', 'y']}], 'notes': []})
+
+        client = make_client()
+
+        with signals.endpoint_timed.connected_to(slow_requests.capture), \
+                mock.patch.object(limits, '_count_collections', True):
+            with settings_stub(
+                    SLOW_REQUEST_THRESHOLD=10.0, ENDPOINT_TIMING=True):
+                client.post('/orders', data=payload,
+                            content_type='application/json')
+
+            self.assertEqual(self.handler.records, [])
+
+            with settings_stub(
+                    SLOW_REQUEST_THRESHOLD=0.0, ENDPOINT_TIMING=True):
+                response = client.post('/orders', data=payload,
+                                       content_type='application/json')
+
+        self.assertEqual(len(self.handler.records), 1)
+
+        record = self.handler.records[0].slow_request
+
+        self.assertEqual(record['endpoint'], 'create_order')
+        self.assertEqual(record['version'], '')
+        self.assertEqual(record['payload_bytes'], len(payload))
+        self.assertEqual(
+            record['collections'], {'items': 1, 'items[].tags': 2, 'notes': 0})
+        self.assertIn('input', record['timings'])
+        self.assertGreaterEqual(
+            record['timings']['total'], record['timings']['action'])
+        self.assertEqual(
+            record['response_bytes'], len(response.get_data()))
+
+        self.assertEqual(
+            json.loads(self.handler.records[0].getMessage().split(' ', 2)[2]),
+            record)
+
+    def test_queue_handler(self):
+        """Name: TestSlowRequests.test_queue_handler
+        """
+        target = ListHandler()
+
+        handler = slow_requests.QueueHandler(target_handlers=[target])
+
+        logger = logging.getLogger('test_slow_requests')
+        logger.propagate = False
+        logger.addHandler(handler)
+
+        try:
+            logger.warning("first %s", 1)
+            logger.warning("second")
+        finally:
+            logger.removeHandler(handler)
+
+            # listener is stopped once everything queued is handled
+            handler.close()
+
+        self.assertEqual(
+            [record.getMessage() for record in target.records],
+            ['first 1', 'second'])
+        self.assertIsNone(handler.listener)
+
+    def test_queue_handler_of_dict_config(self):
+        """Name: TestSlowRequests.test_queue_handler_of_dict_config
+        """
+        target = ListHandler()
+
+        configurator = logging.config.DictConfigurator({'handlers': {
+            'target': target,
+            'slow_requests': {
+                'class': 'magicarp.tools.slow_requests.QueueHandler',
+                'target_handlers': ['cfg://handlers.target'],
+            },
+        }})
+
+        handler = configurator.configure_handler(
+            configurator.config['handlers']['slow_requests'])
+
+        try:
+            handler.handle(logging.makeLogRecord(
+                {'msg': 'first', 'levelno': logging.WARNING}))
+        finally:
+            handler.close()
+
+        self.assertEqual(
+            [record.getMessage() for record in target.records], ['first'])
@@ -1,5 +1,6 @@
 import datetime
 
+from magicarp import exceptions
 from magicarp.schema import input_field
 
 from . import base
@@ -74,3 +75,27 @@ class TestTimeNormalisation(base.BaseTest):
             hours=12, minutes=13, seconds=14, milliseconds=15)
 
         self.assertEqual(field.data.seconds, value.seconds)
+
+    def test_time_normlisation_fast_path(self):
+        """Name: TestTimeNormalisation.test_time_normlisation_fast_path
+        """
+        for value, expected in [
+                ('12:15', datetime.timedelta(hours=12, minutes=15)),
+                ('12:15:30:25', datetime.timedelta(
+                    hours=12, minutes=15, seconds=30, milliseconds=25)),
+                ('2h 5m', datetime.timedelta(hours=2, minutes=5)),
+                (datetime.timedelta(hours=1), datetime.timedelta(hours=1))]:
+            field = input_field.TimeField('time1')
+
+            field.populate(value)
+
+            self.assertEqual(field.data, expected)
+
+    def test_time_rejects_non_strings(self):
+        """Name: TestTimeNormalisation.test_time_rejects_non_strings
+        """
+        for value in [5, ['a'], {'a': 1}]:
+            field = input_field.TimeField('time1')
+
+            with self.assertRaises(exceptions.PayloadError):
+                field.populate(value)
@@ -0,0 +1,117 @@
+from unittest import mock
+
+import flask
+
+from simple_settings.utils import settings_stub
+
+from magicarp import endpoint, signals
+from magicarp.schema import input_field, output_field
+from magicarp.tools import timing
+
+from . import base
+
+
+class Query(input_field.SchemaField):
+    fields = (
+        input_field.IntegerField("page"),
+    )
+
+
+class Page(output_field.SchemaField):
+    fields = (
+        output_field.IntegerField("page"),
+    )
+
+
+class Pages(endpoint.BaseEndpoint):
+    name = 'pages'
+
+    input_schema = Query
+    output_schema = Page
+
+    def action(self, input_schema):  # pylint: disable=arguments-differ
+        return {'page': input_schema.data['page'].data}
+
+
+def make_client():
+    app = flask.Flask('test')
+    app.add_url_rule('/pages', 'pages', Pages())
+
+    @app.before_request
+    def user_auth():  # pylint: disable=unused-variable
+        flask.request.user = None
+
+    return app.test_client()
+
+
+class TestTiming(base.BaseTest):
+    def test_phases_are_recorded(self):
+        """Name: TestTiming.test_phases_are_recorded
+        """
+        timing.reset_histograms()
+
+        received = []
+
+        def receiver(sender, name, version, timings):
+            received.append((sender, name, version, list(timings)))
+
+        client = make_client()
+
+        with signals.endpoint_timed.connected_to(receiver), \
+                settings_stub(ENDPOINT_TIMING=True):
+            client.get('/pages?page=2')
+            client.get('/pages?page=3')
+
+        histograms = timing.get_histograms()
+
+        self.assertEqual(
+            sorted(phase for _, _, phase in histograms),
+            sorted(timing.PHASES))
+
+        for (name, version, _), histogram in histograms.items():
+            self.assertEqual((name, version), ('pages', ''))
+            self.assertEqual(histogram.count, 2)
+            self.assertEqual(list(histogram.cumulative())[-1][1], 2)
+
+        total = histograms['pages', '', 'total']
+
+        self.assertGreaterEqual(total.sum, sum(
+            histogram.sum for (_, _, phase), histogram in histograms.items()
+            if phase != 'total'))
+
+        self.assertEqual(len(received), 2)
+        self.assertIsInstance(received[0][0], Pages)
+        self.assertEqual(received[0][3], list(timing.PHASES))
+
+    def test_timing_can_be_disabled(self):
+        """Name: TestTiming.test_timing_can_be_disabled
+        """
+        timing.reset_histograms()
+
+        with settings_stub(ENDPOINT_TIMING=False):
+            make_client().get('/pages?page=2')
+
+        self.assertEqual(timing.get_histograms(), {})
+
+        # tools that need timings turn it on
+        with settings_stub(ENDPOINT_TIMING=False), \
+                mock.patch.object(timing, '_enabled', False):
+            timing.enable()
+
+            make_client().get('/pages?page=2')
+
+        self.assertEqual(
+            timing.get_histograms()['pages', '', 'total'].count, 1)
+
+    def test_histogram(self):
+        """Name: TestTiming.test_histogram
+        """
+        histogram = timing.Histogram((0.1, 1.0))
+
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(list(histogram.cumulative()), [
+            (0.1, 2), (1.0, 3), (float('inf'), 4)])
+        self.assertAlmostEqual(histogram.sum, 2.65)